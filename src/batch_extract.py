@@ -0,0 +1,278 @@
+"""
+📦 MODULE: BATCH EXTRACTION
+===========================
+
+Extracts many uploaded PDFs (and URLs) at once.
+
+KEY CONCEPTS:
+- Process pool: PyPDF2 is pure Python, so files are extracted in separate
+  processes rather than threads; 20 uploads take about as long as the
+  slowest one (given enough cores)
+- Live progress: workers report "page x/y" through the extraction engine's
+  progress callback into a manager queue; the caller's thread drains it and
+  redraws a per-file status table
+- Statuses: queued → downloading (URLs) → extracting (page x/y) → done | failed
+- One failed file never fails the batch; a worker killed mid-file (OOM,
+  crash in a native decoder) fails the files still running, and the pool is
+  rebuilt for the next batch instead of staying broken for every session
+- The caller's profiling mode (sidebar toggle or RPS_PROFILE) travels with
+  each job, since the per-session toggle is thread-local to the caller
+- Workers come from a fork server (spawn where there is none), never from a
+  fork of the threaded Streamlit server, so they don't inherit its HTTP
+  client, connection pool or held locks; each worker builds its own
+  HttpClient on first use (src.http_client.get_http_client)
+
+Configuration:
+- RPS_EXTRACT_WORKERS: pool size (default: number of CPUs)
+
+Usage:
+    jobs = [ExtractionJob(f.name, data=f.getvalue()) for f in uploaded_files]
+    texts = extract_batch(jobs, on_update=lambda rows: table.dataframe(rows))
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from src.metrics import counter, histogram
+from src.profiling import profiling_modes
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Texts shorter than this are reported as failed (image-only or broken PDFs)
+MIN_TEXT_CHARS = 100
+# How often the status table is redrawn while waiting (seconds)
+UPDATE_INTERVAL = 0.2
+
+BATCH_FILE_SECONDS = histogram(
+    "rps_batch_extract_file_seconds", "Wall time per file in a batch extraction (queue + extract)")
+BATCH_FILES = counter("rps_batch_extract_files_total", "Files extracted in batches", labelnames=("result",))
+
+
+class ExtractionJob:
+    """One file to extract: uploaded bytes or a URL."""
+
+    def __init__(self, name, data=None, url=None):
+        if (data is None) == (url is None):
+            raise ValueError("ExtractionJob needs exactly one of data or url")
+        self.name = name
+        self.data = data
+        self.url = url
+        self.profiling = None  # set by extract_batch from the calling session
+
+
+def _extract_job(job_id, job, progress_queue):
+    """Worker: extract one job, reporting page progress to the parent."""
+    from src.pdf_extractor import extract_text_from_pdf_file, extract_text_from_pdf_url
+    from src.profiling import profile_request, set_profiling
+
+    # Workers are reused across sessions: always apply this job's mode
+    set_profiling(job.profiling)
+
+    def progress(done, total):
+        progress_queue.put((job_id, "extracting", done, total))
+
+    if job.url is not None:
+        progress_queue.put((job_id, "downloading", 0, 0))
+        return extract_text_from_pdf_url(job.url, progress=progress)
+    progress_queue.put((job_id, "extracting", 0, 0))
+    with profile_request("extract", file=job.name):
+        return extract_text_from_pdf_file(BytesIO(job.data), source=job.name, progress=progress)
+
+
+_pool = None
+_manager = None
+_pool_lock = threading.Lock()
+
+
+def _mp_context():
+    """Fork server where available: workers fork from a clean, single-threaded process."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _get_pool():
+    """Process pool + progress manager, started once and shared by all sessions."""
+    global _pool, _manager
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.environ.get("RPS_EXTRACT_WORKERS", os.cpu_count() or 2))
+            ctx = _mp_context()
+            if _manager is None:
+                _manager = ctx.Manager()
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+        return _pool, _manager
+
+
+def _reset_pool(broken):
+    """Drop a pool whose worker died; the next _get_pool() starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit_all(jobs, worker, progress_queue):
+    """Submit every job; a pool broken by an earlier batch is replaced once."""
+    for attempt in range(2):
+        pool, _ = _get_pool()
+        try:
+            return pool, {pool.submit(worker, i, job, progress_queue): i for i, job in enumerate(jobs)}
+        except BrokenProcessPool:
+            logger.warning("⚠️ Extraction pool was broken, restarting it")
+            _reset_pool(pool)
+    raise RuntimeError("Extraction pool could not be restarted")
+
+
+def _row(job):
+    return {'file': job.name, 'status': "queued", 'pages': "", 'characters': 0, 'seconds': 0.0, 'error': ""}
+
+
+def extract_batch(jobs, on_update=None, worker=_extract_job):
+    """
+    Extract all jobs concurrently.
+
+    Args:
+        jobs (list): ExtractionJob objects.
+        on_update: Optional callable(rows) called from this thread whenever
+            a status changes; rows are dicts (file, status, pages, characters,
+            seconds, error) in job order.
+        worker: Picklable callable(job_id, job, progress_queue) -> text.
+
+    Returns:
+        list: Extracted text per job (None for failed jobs), in job order.
+    """
+    if not jobs:
+        return []
+    _, manager = _get_pool()
+    progress_queue = manager.Queue()
+    # Thread-local sidebar toggle → explicit per-job mode for the worker processes
+    profiling = ','.join(sorted(profiling_modes())) or "off"
+    for job in jobs:
+        job.profiling = profiling
+    rows = [_row(job) for job in jobs]
+    texts = [None] * len(jobs)
+    start = time.perf_counter()
+
+    def notify():
+        if on_update is not None:
+            on_update([dict(row) for row in rows])
+
+    logger.info(f"📦 Extracting {len(jobs)} file(s) in parallel")
+    pool, futures = _submit_all(jobs, worker, progress_queue)
+    pending = set(futures)
+    crashed = False
+    notify()
+    while pending:
+        done, pending = wait(pending, timeout=UPDATE_INTERVAL, return_when=FIRST_COMPLETED)
+
+        # Page progress first, so a finished file never shows an older status
+        changed = bool(done)
+        while True:
+            try:
+                job_id, status, pages_done, pages_total = progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            if rows[job_id]['status'] in ("done", "failed"):
+                continue
+            rows[job_id]['status'] = status
+            rows[job_id]['pages'] = f"{pages_done}/{pages_total}" if pages_total else ""
+            changed = True
+
+        for future in done:
+            i = futures[future]
+            row = rows[i]
+            row['seconds'] = round(time.perf_counter() - start, 1)
+            BATCH_FILE_SECONDS.observe(time.perf_counter() - start)
+            try:
+                text = future.result()
+            except BrokenProcessPool:
+                # A worker died; every file still running in this pool is lost with it
+                crashed = True
+                row['status'], row['error'] = "failed", "extraction worker crashed"
+                BATCH_FILES.inc(result="crashed")
+                continue
+            except Exception as e:
+                row['status'], row['error'] = "failed", str(e)
+                BATCH_FILES.inc(result="failed")
+                logger.warning(f"⚠️ Could not extract {jobs[i].name}: {e}")
+                continue
+            if text and len(text) > MIN_TEXT_CHARS:
+                texts[i] = text
+                row['status'], row['characters'] = "done", len(text)
+                BATCH_FILES.inc(result="done")
+            else:
+                row['status'], row['error'] = "failed", "insufficient text extracted"
+                BATCH_FILES.inc(result="empty")
+        if changed:
+            notify()
+
+    if crashed:
+        logger.error("❌ An extraction worker died; restarting the pool")
+        _reset_pool(pool)
+    logger.info(f"✅ Batch of {len(jobs)} extracted in {time.perf_counter() - start:.1f}s "
+                f"({sum(t is not None for t in texts)} ok)")
+    return texts
+
+
+def _sleepy_worker(job_id, job, progress_queue):
+    """Test worker: 'extracts' one page per 0.1s of job.data (b'<pages>')."""
+    pages = int(job.data)
+    if pages == -2:
+        os._exit(1)  # killed mid-file (e.g. OOM)
+    if pages < 0:
+        raise ValueError("broken PDF")
+    for page in range(1, pages + 1):
+        time.sleep(0.1)
+        progress_queue.put((job_id, "extracting", page, pages))
+    return f"{job.name} " + "text " * 50 * pages
+
+
+def test_batch_extract():
+    """
+    Run 8 fake 5-page files in parallel and check progress and failures.
+
+    Usage: python -m src.batch_extract
+    """
+    print("\n" + "="*70)
+    print("TEST: Batch extraction")
+    print("="*70)
+
+    jobs = [ExtractionJob(f"paper{i}.pdf", data=b"5") for i in range(8)]
+    jobs.append(ExtractionJob("broken.pdf", data=b"-1"))
+    jobs.append(ExtractionJob("empty.pdf", data=b"0"))
+    updates = []
+
+    start = time.perf_counter()
+    texts = extract_batch(jobs, on_update=updates.append, worker=_sleepy_worker)
+    seconds = time.perf_counter() - start
+
+    final = updates[-1]
+    assert all(t.startswith(f"paper{i}.pdf") for i, t in enumerate(texts[:8]))
+    assert [row['status'] for row in final] == ["done"] * 8 + ["failed", "failed"]
+    assert final[8]['error'] == "broken PDF"
+    assert any(row['pages'] == "3/5" for rows in updates for row in rows)
+
+    # A dead worker fails its batch's files, not every later batch
+    crashed = extract_batch([ExtractionJob("oom.pdf", data=b"-2")], worker=_sleepy_worker)
+    assert crashed == [None]
+    again = extract_batch([ExtractionJob("after.pdf", data=b"1")], worker=_sleepy_worker)
+    assert again[0].startswith("after.pdf")
+    pool = _get_pool()[0]
+    assert pool._mp_context.get_start_method() != "fork"  # never a copy of this process
+    workers = pool._max_workers
+    print(f"✅ {len(jobs)} files in {seconds:.2f}s with {workers} workers "
+          f"(serial would take {8 * 0.5:.1f}s), {len(updates)} status updates")
+
+
+if __name__ == "__main__":
+    test_batch_extract()
@@ -0,0 +1,209 @@
+"""
+🧺 MODULE: BATCHING
+===================
+
+Dynamic micro-batching of concurrent summarize requests.
+
+KEY CONCEPTS:
+- Callers submit single texts and get a Future back (or block in summarize())
+- Requests wait at most max_wait_ms so others can join them
+- Buckets: only requests with the same generation parameters and a similar
+  input length are batched together (less padding, same beam settings)
+- One padded generate() call per batch via PaperSummarizer.summarize_batch
+- Texts beyond the PEGASUS window bypass batching when long routes are
+  configured (RPS_MAX_CHUNKS / RPS_LONG_MODEL): they go to summarize(),
+  which chunks them or picks the long-context model
+- Queue depth / batch size / wait time are exported through src.metrics
+
+Usage:
+    scheduler = BatchScheduler(PaperSummarizer(), max_batch_size=8, max_wait_ms=10)
+    summary = scheduler.summarize(text)   # same signature as PaperSummarizer
+"""
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from src.metrics import LATENCY_BUCKETS, QUEUE_DEPTH, histogram
+from src.latency_budget import choose_plan, extractive_summary
+from src.summarizer import MAX_INPUT_CHARS, summarize_meta
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+BATCH_SIZE = histogram(
+    "rps_batch_size", "Requests per generate() batch", buckets=(1, 2, 4, 8, 16, 32, 64))
+BATCH_WAIT_SECONDS = histogram(
+    "rps_batch_wait_seconds", "Time a request waited in the batching queue", buckets=LATENCY_BUCKETS)
+
+
+class _Request:
+    __slots__ = ("text", "future", "enqueued")
+
+    def __init__(self, text):
+        self.text = text
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class BatchScheduler:
+    """Collects concurrent summarize calls and runs them as batches."""
+
+    def __init__(self, summarizer, max_batch_size=8, max_wait_ms=10,
+                 length_bucket_chars=1000, concurrency=1):
+        """
+        Args:
+            summarizer: Anything with summarize_batch(texts, max_length, min_length)
+                (PaperSummarizer or SummarizerPool).
+            max_batch_size (int): Largest batch passed to generate().
+            max_wait_ms (float): Longest time a request waits for company.
+            length_bucket_chars (int): Width of the input-length buckets.
+            concurrency (int): Batches allowed in flight (1 per pool worker).
+        """
+        self.summarizer = summarizer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.length_bucket_chars = length_bucket_chars
+        self._buckets = {}  # (max_length, min_length, num_beams, length bucket) -> [_Request]
+        self._cond = threading.Condition()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-run")
+        # Long texts routed around batching (see submit)
+        self._direct = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-direct")
+        self._slots = threading.Semaphore(concurrency)
+        self.concurrency = concurrency
+        self._running = 0  # requests in batches being generated
+        self._thread = threading.Thread(target=self._loop, name="batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def _bucket_key(self, text, max_length, min_length, num_beams):
+        length = min(len(text or ""), MAX_INPUT_CHARS)
+        return (max_length, min_length, num_beams, length // self.length_bucket_chars)
+
+    def queue_depth(self):
+        """Batch rounds ahead of a new request: queued + running requests, per batch slot."""
+        with self._cond:
+            pending = sum(len(requests) for requests in self._buckets.values()) + self._running
+        return math.ceil(pending / self.max_batch_size) // self.concurrency
+
+    def submit(self, text, max_length=200, min_length=80, deadline_ms=None):
+        """
+        Queue one text for summarization.
+
+        With deadline_ms, the generation settings are chosen from the latency
+        budget and the current queue depth (see src.latency_budget); requests
+        that can only make it extractively are answered right away.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the summary string.
+        """
+        num_beams = None
+        if (deadline_ms is None and text and len(text) > MAX_INPUT_CHARS
+                and getattr(self.summarizer, "routes_long_texts", False)):
+            # Chunked / long-context routes don't fit a shared padded batch
+            return self._direct.submit(self.summarizer.summarize, text, max_length, min_length)
+        if deadline_ms is not None and text:
+            plan = choose_plan(
+                len(text), max_length, min_length, deadline_ms - self.max_wait * 1000,
+                MAX_INPUT_CHARS, queue_depth=self.queue_depth()
+            )
+            if plan.extractive:
+                request = _Request(text)
+                request.future.set_result(extractive_summary(text, max_words=int(max_length * 0.75)))
+                return request.future
+            text = text[:plan.input_chars]
+            num_beams, max_length, min_length = plan.num_beams, plan.max_length, plan.min_length
+
+        request = _Request(text)
+        key = self._bucket_key(text, max_length, min_length, num_beams)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Batch scheduler is closed")
+            self._buckets.setdefault(key, []).append(request)
+            QUEUE_DEPTH.inc()
+            self._cond.notify()
+        return request.future
+
+    def summarize(self, text, max_length=200, min_length=80, deadline_ms=None):
+        """Summarize one text, sharing a generate() call with concurrent callers."""
+        return self.submit(text, max_length=max_length, min_length=min_length, deadline_ms=deadline_ms).result()
+
+    def summarize_multiple(self, texts, deadline_ms=None):
+        """Summarize papers (batched together), then build the meta-summary."""
+        futures = [self.submit(text, deadline_ms=deadline_ms) for text in texts]
+        summaries = [future.result() for future in futures]
+        return summaries, summarize_meta(self.summarize, summaries, deadline_ms)
+
+    def _next_batch(self):
+        """
+        Pick the bucket to run: a full one, else the one whose oldest request
+        has waited max_wait. Returns (key, requests) or None and the time to
+        sleep until the next deadline.
+        """
+        now = time.perf_counter()
+        next_deadline = None
+        for key, requests in self._buckets.items():
+            deadline = requests[0].enqueued + self.max_wait
+            if len(requests) >= self.max_batch_size or deadline <= now or self._closed:
+                batch = requests[:self.max_batch_size]
+                remaining = requests[self.max_batch_size:]
+                if remaining:
+                    self._buckets[key] = remaining
+                else:
+                    del self._buckets[key]
+                return (key, batch), 0.0
+            if next_deadline is None or deadline < next_deadline:
+                next_deadline = deadline
+        timeout = None if next_deadline is None else max(next_deadline - now, 0.0)
+        return None, timeout
+
+    def _loop(self):
+        while True:
+            self._slots.acquire()  # don't form a batch until one can run
+            with self._cond:
+                while True:
+                    picked, timeout = self._next_batch()
+                    if picked is not None:
+                        break
+                    if self._closed:
+                        self._slots.release()
+                        return
+                    self._cond.wait(timeout)
+                QUEUE_DEPTH.dec(len(picked[1]))
+                self._running += len(picked[1])
+            self._executor.submit(self._run_batch, *picked)
+
+    def _run_batch(self, key, requests):
+        max_length, min_length, num_beams, _ = key
+        now = time.perf_counter()
+        for request in requests:
+            BATCH_WAIT_SECONDS.observe(now - request.enqueued)
+        BATCH_SIZE.observe(len(requests))
+
+        try:
+            summaries = self.summarizer.summarize_batch(
+                [r.text for r in requests], max_length=max_length, min_length=min_length,
+                num_beams=num_beams
+            )
+            for request, summary in zip(requests, summaries):
+                request.future.set_result(summary)
+        except Exception as e:
+            logger.error(f"❌ Batch of {len(requests)} failed: {e}")
+            for request in requests:
+                request.future.set_exception(e)
+        finally:
+            with self._cond:
+                self._running -= len(requests)
+            self._slots.release()
+
+    def close(self):
+        """Flush queued requests, then stop the scheduler."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        self._direct.shutdown(wait=True)
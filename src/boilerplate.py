@@ -0,0 +1,164 @@
+"""
+🧾 MODULE: BOILERPLATE DETECTION
+================================
+
+Finds lines that repeat across the pages of one document (running heads,
+page footers, arXiv stamps, licence lines) so they can be dropped before
+tokenization.
+
+KEY CONCEPTS:
+- Line hashing: every line is reduced to a key (normalized, lowercased; in
+  short lines digits are masked so "4 Vaswani et al." and "5 Vaswani et al."
+  match) and hashed; numbered captions ("Table 1", "Figure 2: ...") are
+  content and never counted
+- A key is boilerplate if it occurs on at least `min_fraction` of the pages
+  (and on at least `min_pages` pages)
+- Line n-grams: very short lines ("Proof.", "Results", a lone number) repeat
+  by chance, so they only count when the run of consecutive lines around
+  them repeats as well (e.g. part of a multi-line footer)
+- Statistics: lines and estimated tokens removed per document
+
+Usage:
+    boilerplate = detect_boilerplate(page_texts)
+    text = normalize_text(page_texts, drop_line=boilerplate.matches)
+    boilerplate.stats   # {'lines_removed': ..., 'tokens_saved': ...}
+"""
+import hashlib
+import re
+from collections import Counter
+
+from src.metrics import histogram
+from src.utils import normalize_line
+
+
+BOILERPLATE_TOKENS_SAVED = histogram(
+    "rps_boilerplate_tokens_saved", "Estimated tokens removed as boilerplate per document",
+    buckets=(0, 10, 50, 100, 250, 500, 1000, 2500, 5000))
+
+# Longer lines are body text, however often they repeat
+MAX_LINE_CHARS = 200
+# Digits are masked only in lines this short (running heads with page numbers);
+# longer lines that differ only in numbers are body text
+MASK_DIGITS_MAX_WORDS = 5
+# Lines of at most this many words need a repeated block around them
+SHORT_LINE_WORDS = 2
+_DIGITS = re.compile(r'\d+')
+# "Table 3", "Fig. 2:", "Algorithm 1" - numbered captions are content, never boilerplate
+_CAPTION = re.compile(r'^(?:table|fig(?:ure)?\.?|algorithm|listing|eq(?:uation)?\.?)\s*\d', re.IGNORECASE)
+
+
+def _line_key(line):
+    key = line.lower()
+    if key.count(' ') < MASK_DIGITS_MAX_WORDS:
+        key = _DIGITS.sub('#', key)
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+
+
+class Boilerplate:
+    """Set of repeated line hashes for one document, plus removal statistics."""
+
+    def __init__(self, keys=()):
+        self.keys = set(keys)
+        self.stats = {'lines_removed': 0, 'chars_removed': 0, 'tokens_saved': 0}
+
+    def matches(self, line):
+        """
+        True if a normalized line is boilerplate (counted in stats).
+
+        Use as the drop_line callback of src.utils.normalize_text.
+        """
+        if not self.keys or len(line) > MAX_LINE_CHARS or _line_key(line) not in self.keys:
+            return False
+        self.stats['lines_removed'] += 1
+        self.stats['chars_removed'] += len(line) + 1
+        self.stats['tokens_saved'] = self.stats['chars_removed'] // 4  # 1 token ≈ 4 characters
+        return True
+
+    def record(self):
+        """Export the token savings of a finished document to the metrics registry."""
+        BOILERPLATE_TOKENS_SAVED.observe(self.stats['tokens_saved'])
+
+
+def detect_boilerplate(pages, min_fraction=0.5, min_pages=3, ngram=2):
+    """
+    Find lines repeated across pages.
+
+    Args:
+        pages (list): Page texts (lines separated by newlines).
+        min_fraction (float): Share of pages a line must appear on.
+        min_pages (int): Never flag anything in documents shorter than this.
+        ngram (int): Longest run of consecutive lines hashed as one block.
+
+    Returns:
+        Boilerplate: Use .matches as a line filter.
+    """
+    pages = [page for page in pages if page]
+    if len(pages) < min_pages:
+        return Boilerplate()
+    threshold = max(min_pages, int(len(pages) * min_fraction + 0.5))
+
+    line_pages = Counter()   # line key -> pages it appears on
+    block_pages = Counter()  # (key, key, ...) -> pages the run appears on
+    short = set()            # keys of lines that need block context
+    for page in pages:
+        lines = [line for line in map(normalize_line, page.splitlines())
+                 if line and len(line) <= MAX_LINE_CHARS and not _CAPTION.match(line)]
+        keys = [_line_key(line) for line in lines]
+        short.update(key for key, line in zip(keys, lines) if line.count(' ') < SHORT_LINE_WORDS)
+        line_pages.update(set(keys))
+        blocks = set()
+        for n in range(2, ngram + 1):
+            blocks.update(tuple(keys[i:i + n]) for i in range(len(keys) - n + 1))
+        block_pages.update(blocks)
+
+    repeated = {key for key, count in line_pages.items() if count >= threshold and key not in short}
+    in_blocks = set()
+    for block, count in block_pages.items():
+        if count >= threshold:
+            in_blocks.update(block)
+    repeated.update(key for key in short if key in in_blocks)
+    return Boilerplate(repeated)
+
+
+def test_boilerplate():
+    """
+    Strip running heads and footers from a synthetic 10-page paper.
+
+    Usage: python -m src.boilerplate
+    """
+    from src.utils import normalize_text
+
+    print("\n" + "="*70)
+    print("TEST: Boilerplate detection")
+    print("="*70)
+
+    pages = [
+        "Published as a conference paper at ICLR 2024\n"
+        f"Section {i} discusses result {i} in detail and compares it with prior work.\n"
+        f"The measured improvement on benchmark {i} is substantial.\n"
+        "arXiv:2401.01234v2 [cs.CL] 12 Jan 2024\n"
+        f"{i + 1} A. Author et al."
+        for i in range(10)
+    ]
+    boilerplate = detect_boilerplate(pages)
+    text = normalize_text(pages, drop_line=boilerplate.matches)
+
+    assert "ICLR" not in text and "arXiv:" not in text and "et al." not in text
+    assert "Section 3 discusses" in text
+    assert boilerplate.stats['lines_removed'] == 30
+
+    # A short line repeated in varying context, and numbered captions, stay
+    pages = [
+        f"Running head of the paper\nTable {i % 2 + 1}\nBody line {i} with its own words.\n"
+        f"Results\nMore body text number {i} follows here."
+        for i in range(6)
+    ]
+    text = normalize_text(pages, drop_line=detect_boilerplate(pages).matches)
+    assert "Running head" not in text
+    assert text.count("Results") == 6 and text.count("Table 1") == 3
+    print(f"✅ Removed {boilerplate.stats['lines_removed']} lines, "
+          f"~{boilerplate.stats['tokens_saved']} tokens saved")
+
+
+if __name__ == "__main__":
+    test_boilerplate()
@@ -0,0 +1,490 @@
+"""
+🛰️ MODULE: DISTRIBUTED CAMPAIGNS
+================================
+
+Bulk download → extract → summarize runs spread over many worker processes
+on any number of machines.
+
+KEY CONCEPTS:
+- Work queue with leases: a worker claims a task for `lease_s` seconds and
+  renews the lease while it works (heartbeat); a crashed or partitioned
+  worker's lease expires and another worker picks the task up
+- Idempotent, content-hashed task ids: an extract task is identified by its
+  URL, a summarize task by the hash of the extracted text + parameters, so
+  re-enqueueing a URL list, mirrors of the same PDF, or a task finished
+  twice after a lost lease all collapse into one result
+- Shared result store: extracted texts are stored once per content hash
+  (zlib-compressed blobs), summaries per task; exports go through src.export
+- Broker: one SQLite file (rollback journal, so it also works on a shared
+  filesystem with working locks); TaskQueue is the whole broker interface,
+  so a real broker can replace it
+- Retries: failed tasks go back to the queue until max_attempts
+
+Usage:
+    python -m src.distributed enqueue --db data/campaign.sqlite urls.txt
+    python -m src.distributed worker --db data/campaign.sqlite     # on every node
+    python -m src.distributed status --db data/campaign.sqlite
+    python -m src.distributed export --db data/campaign.sqlite --format jsonl > summaries.jsonl
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+from src.metrics import counter, histogram
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_QUEUE_PATH = os.path.join("data", "campaign.sqlite")
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+EXTRACT = "extract"
+SUMMARIZE = "summarize"
+
+TASKS_PROCESSED = counter(
+    "rps_campaign_tasks_total", "Campaign tasks finished by this process", labelnames=("kind", "result"))
+TASK_SECONDS = histogram("rps_campaign_task_seconds", "Campaign task run time", labelnames=("kind",))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    created REAL,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_claim ON tasks(status, kind, created);
+CREATE TABLE IF NOT EXISTS results (
+    task_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    output TEXT,
+    worker TEXT,
+    seconds REAL,
+    created REAL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+"""
+
+
+def content_hash(text):
+    """sha256 of a text (the id of a stored blob)."""
+    return hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+
+
+def task_id(kind, key, params=None):
+    """
+    Deterministic task id: same kind, content key and parameters → same task.
+
+    Args:
+        kind (str): EXTRACT or SUMMARIZE.
+        key (str): URL for extract tasks, text content hash for summarize tasks.
+        params (dict): Parameters that change the result.
+    """
+    canonical = json.dumps([kind, key, params or {}], sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+class TaskQueue:
+    """SQLite-backed lease queue + result store shared by all workers."""
+
+    def __init__(self, path=None, lease_s=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path or os.environ.get("RPS_QUEUE_PATH", DEFAULT_QUEUE_PATH)
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: transactions are explicit (BEGIN IMMEDIATE in claim)
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            # Rollback journal rather than WAL: WAL needs shared memory, i.e. one host
+            conn.execute("PRAGMA journal_mode=DELETE")
+            self._local.conn = conn
+        return conn
+
+    # ----------------------------------------------------------------- enqueue
+    def enqueue(self, kind, key, payload, params=None):
+        """
+        Add a task unless it already exists (idempotent).
+
+        Returns:
+            tuple: (task id, True if newly added).
+        """
+        tid = task_id(kind, key, params)
+        now = time.time()
+        cursor = self._conn().execute(
+            "INSERT OR IGNORE INTO tasks (id, kind, payload, created, updated) VALUES (?, ?, ?, ?, ?)",
+            (tid, kind, json.dumps(payload), now, now)
+        )
+        return tid, cursor.rowcount == 1
+
+    def enqueue_urls(self, urls, params=None):
+        """Extract (then summarize) every URL once. Returns the number of new tasks."""
+        params = params or {}
+        added = 0
+        for url in urls:
+            url = url.strip()
+            if url:
+                added += self.enqueue(EXTRACT, url, {'url': url, 'params': params})[1]
+        return added
+
+    # ------------------------------------------------------------------ leases
+    def claim(self, worker_id, kinds=(EXTRACT, SUMMARIZE)):
+        """
+        Lease the next runnable task: queued, or leased with an expired lease.
+        Summarize tasks go first so finished extractions don't pile up.
+
+        Returns:
+            dict: {'id', 'kind', 'payload', 'attempts'} or None if nothing is runnable.
+        """
+        conn = self._conn()
+        now = time.time()
+        placeholders = ','.join('?' * len(kinds))
+        conn.execute("BEGIN IMMEDIATE")  # one claimer at a time: no task is leased twice
+        try:
+            row = conn.execute(
+                f"SELECT id, kind, payload, attempts FROM tasks "
+                f"WHERE kind IN ({placeholders}) "
+                f"AND (status = 'queued' OR (status = 'leased' AND lease_expires < ?)) "
+                f"ORDER BY kind = '{SUMMARIZE}' DESC, created LIMIT 1",
+                (*kinds, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            tid, kind, payload, attempts = row
+            if attempts >= self.max_attempts:
+                # Its last lease expired too: the task keeps killing workers
+                conn.execute("UPDATE tasks SET status = 'failed', error = COALESCE(error, 'lease expired'), "
+                             "updated = ? WHERE id = ?", (now, tid))
+                conn.execute("COMMIT")
+                return self.claim(worker_id, kinds)
+            conn.execute(
+                "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                (worker_id, now + self.lease_s, now, tid)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return {'id': tid, 'kind': kind, 'payload': json.loads(payload), 'attempts': attempts + 1}
+
+    def heartbeat(self, tid, worker_id):
+        """Extend a lease. Returns False if the lease was lost (expired and re-claimed)."""
+        cursor = self._conn().execute(
+            "UPDATE tasks SET lease_expires = ?, updated = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (time.time() + self.lease_s, time.time(), tid, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, tid, worker_id, kind, output, seconds):
+        """
+        Store a result and mark the task done. A result from a worker that
+        lost its lease is still kept if none exists yet (the work is identical).
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO results (task_id, kind, output, worker, seconds, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (tid, kind, json.dumps(output), worker_id, seconds, time.time())
+            )
+            conn.execute(
+                "UPDATE tasks SET status = 'done', lease_owner = NULL, error = NULL, updated = ? WHERE id = ?",
+                (time.time(), tid)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def fail(self, tid, worker_id, error):
+        """Release a failed task for a retry, or mark it failed after max_attempts."""
+        self._conn().execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+            "lease_owner = NULL, error = ?, updated = ? WHERE id = ? AND lease_owner = ?",
+            (self.max_attempts, str(error)[:500], time.time(), tid, worker_id)
+        )
+
+    # ------------------------------------------------------------ result store
+    def put_text(self, text):
+        """Store a text once per content hash. Returns the hash."""
+        digest = content_hash(text)
+        self._conn().execute("INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)",
+                             (digest, zlib.compress(text.encode("utf-8"), 6)))
+        return digest
+
+    def get_text(self, digest):
+        row = self._conn().execute("SELECT data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def result(self, tid):
+        row = self._conn().execute("SELECT output FROM results WHERE task_id = ?", (tid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def stats(self):
+        """Task counts: {kind: {status: n}}."""
+        stats = {}
+        for kind, status, n in self._conn().execute(
+                "SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status"):
+            stats.setdefault(kind, {})[status] = n
+        return stats
+
+    def iter_summaries(self):
+        """(paper dict, summary) for every finished URL, in enqueue order."""
+        rows = self._conn().execute(
+            "SELECT t.payload, r.output FROM tasks t JOIN results r ON r.task_id = t.id "
+            "WHERE t.kind = ? ORDER BY t.created", (EXTRACT,)
+        ).fetchall()
+        for payload, output in rows:
+            payload, output = json.loads(payload), json.loads(output)
+            if not output.get('summary_task'):
+                continue
+            summary = self.result(output['summary_task'])
+            if summary is not None:
+                yield {'title': payload['url'].rsplit('/', 1)[-1], 'pdf_url': payload['url']}, summary['summary']
+
+
+# ------------------------------------------------------------------------------
+# Workers
+# ------------------------------------------------------------------------------
+def default_extract(url):
+    """Download + extract one PDF (the app's extraction path)."""
+    from src.pdf_extractor import extract_text_from_pdf_url
+    return extract_text_from_pdf_url(url)
+
+
+_summarizer = None
+
+
+def default_summarize(text, params):
+    """
+    Summarize with this worker's model (loaded once per process).
+
+    Raises:
+        ValueError: The summarizer returned a placeholder instead of a summary,
+            so the task is retried / failed rather than stored as done.
+    """
+    from src.summarizer import PLACEHOLDER_SUMMARIES, load_summarizer
+
+    global _summarizer
+    if _summarizer is None:
+        _summarizer = load_summarizer()
+    summary = _summarizer.summarize(text, **params)
+    if summary in PLACEHOLDER_SUMMARIES:
+        raise ValueError(summary)
+    return summary
+
+
+def _run_task(queue, task, worker_id, extract, summarize):
+    """Execute one task; returns the output to store."""
+    payload = task['payload']
+    if task['kind'] == EXTRACT:
+        text = extract(payload['url'])
+        if not text:
+            raise ValueError("no text extracted")
+        digest = queue.put_text(text)
+        # Same text (mirrors, re-uploads) + same parameters → the same summarize task
+        summary_task, _ = queue.enqueue(SUMMARIZE, digest, {'text': digest, 'params': payload['params']},
+                                        params=payload['params'])
+        return {'text': digest, 'chars': len(text), 'summary_task': summary_task}
+    text = queue.get_text(payload['text'])
+    if text is None:
+        raise ValueError(f"text {payload['text'][:12]} missing from the store")
+    return {'summary': summarize(text, payload['params'])}
+
+
+def run_worker(path=None, worker_id=None, kinds=(EXTRACT, SUMMARIZE), lease_s=DEFAULT_LEASE_SECONDS,
+               idle_exit_s=None, poll_s=2.0, extract=default_extract, summarize=default_summarize):
+    """
+    Claim and run tasks until the queue stays empty for idle_exit_s (forever if None).
+
+    Args:
+        path (str): Queue database (default RPS_QUEUE_PATH or data/campaign.sqlite).
+        worker_id (str): Unique name (default host:pid).
+        kinds (tuple): Task kinds this worker runs (e.g. only SUMMARIZE on GPU nodes).
+        extract, summarize: Task handlers (the app's pipeline by default).
+
+    Returns:
+        int: Tasks completed by this worker.
+    """
+    queue = TaskQueue(path, lease_s=lease_s)
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"🛰️ Worker {worker_id} on {queue.path} ({', '.join(kinds)})")
+    completed, idle_since = 0, time.monotonic()
+    while True:
+        task = queue.claim(worker_id, kinds)
+        if task is None:
+            if idle_exit_s is not None and time.monotonic() - idle_since >= idle_exit_s:
+                return completed
+            time.sleep(poll_s)
+            continue
+
+        # Renew the lease at a third of its length while the task runs
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(lease_s / 3):
+                if not queue.heartbeat(task['id'], worker_id):
+                    logger.warning(f"⚠️ Lost lease on {task['id'][:12]}")
+                    return
+
+        heart = threading.Thread(target=beat, daemon=True)
+        heart.start()
+        start = time.perf_counter()
+        try:
+            output = _run_task(queue, task, worker_id, extract, summarize)
+        except Exception as e:
+            done.set()
+            queue.fail(task['id'], worker_id, e)
+            TASKS_PROCESSED.inc(kind=task['kind'], result="failed")
+            logger.warning(f"⚠️ {task['kind']} {task['id'][:12]} failed (attempt {task['attempts']}): {e}")
+        else:
+            done.set()
+            seconds = time.perf_counter() - start
+            queue.complete(task['id'], worker_id, task['kind'], output, seconds)
+            TASK_SECONDS.observe(seconds, kind=task['kind'])
+            TASKS_PROCESSED.inc(kind=task['kind'], result="done")
+            completed += 1
+        heart.join()
+        idle_since = time.monotonic()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed summarization campaigns")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("enqueue", "worker", "status", "export"):
+        command = sub.add_parser(name)
+        command.add_argument("--db", help="Queue database (default: RPS_QUEUE_PATH or data/campaign.sqlite)")
+    sub.choices["enqueue"].add_argument("urls", help="File with one PDF URL per line ('-' for stdin)")
+    sub.choices["enqueue"].add_argument("--max-length", type=int, default=200)
+    sub.choices["enqueue"].add_argument("--min-length", type=int, default=80)
+    sub.choices["worker"].add_argument("--kinds", nargs="*", default=[EXTRACT, SUMMARIZE])
+    sub.choices["worker"].add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS)
+    sub.choices["worker"].add_argument("--idle-exit", type=float, help="Exit after this many idle seconds")
+    sub.choices["export"].add_argument("--format", default="jsonl")
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        run_worker(args.db, kinds=tuple(args.kinds), lease_s=args.lease, idle_exit_s=args.idle_exit)
+        return
+    queue = TaskQueue(args.db)
+    if args.command == "enqueue":
+        source = sys.stdin if args.urls == "-" else open(args.urls, encoding="utf-8")
+        with source:
+            added = queue.enqueue_urls(source, {'max_length': args.max_length, 'min_length': args.min_length})
+        print(f"✅ {added} new task(s)")
+    elif args.command == "status":
+        print(json.dumps(queue.stats(), indent=2))
+    else:
+        from src.export import export_records, write_export
+        pairs = list(queue.iter_summaries())
+        write_export(export_records([p for p, _ in pairs], [s for _, s in pairs]), args.format, sys.stdout)
+
+
+# ------------------------------------------------------------------------------
+# Local test: several worker processes on one queue file
+# ------------------------------------------------------------------------------
+def _fake_extract(url):
+    """Test handler: mirrors share a text, 'flaky' fails on its first try, 'broken' always."""
+    time.sleep(0.05)
+    if "broken" in url:
+        raise ValueError("not a PDF")
+    if "flaky" in url:
+        marker = os.path.join(os.environ["RPS_TEST_DIR"], "flaky-seen")
+        if not os.path.exists(marker):
+            open(marker, "w").close()
+            raise ConnectionError("connection reset")
+    paper = url.rsplit('/', 1)[-1].replace("mirror-", "")
+    return f"Full text of {paper}. " * 50
+
+
+def _fake_summarize(text, params):
+    time.sleep(0.05)
+    return f"Summary of {text.split()[3].rstrip('.')} ({params['max_length']})"
+
+
+def _test_worker(path, worker_id, crash):
+    if crash:
+        # Claims a task and dies holding the lease
+        TaskQueue(path, lease_s=0.5).claim(worker_id)
+        os._exit(1)
+    run_worker(path, worker_id, lease_s=0.5, idle_exit_s=1.5, poll_s=0.1,
+               extract=_fake_extract, summarize=_fake_summarize)
+
+
+def test_distributed():
+    """
+    Four worker processes (one crashing) drain a queue with duplicates,
+    mirrors, a flaky and a broken URL.
+
+    Usage: python -c "from src.distributed import test_distributed; test_distributed()"
+    """
+    import multiprocessing
+    import tempfile
+
+    print("\n" + "="*70)
+    print("TEST: Distributed campaign")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["RPS_TEST_DIR"] = tmp
+        path = os.path.join(tmp, "campaign.sqlite")
+        queue = TaskQueue(path, lease_s=0.5, max_attempts=3)
+        urls = [f"https://example.org/paper{i}.pdf" for i in range(20)]
+        urls += [urls[0], urls[1],                                  # duplicates
+                 "https://mirror.example.org/mirror-paper2.pdf",    # same text as paper2
+                 "https://example.org/flaky.pdf", "https://example.org/broken.pdf"]
+        params = {'max_length': 120, 'min_length': 40}
+        assert queue.enqueue_urls(urls, params) == 23
+        assert queue.enqueue_urls(urls, params) == 0  # idempotent
+
+        start = time.perf_counter()
+        workers = [multiprocessing.Process(target=_test_worker, args=(path, f"w{i}", i == 0))
+                   for i in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=60)
+        seconds = time.perf_counter() - start
+
+        stats = queue.stats()
+        assert stats[EXTRACT] == {'done': 22, 'failed': 1}, stats
+        assert stats[SUMMARIZE] == {'done': 21}, stats  # 20 papers + flaky; the mirror shares paper2's
+        summaries = dict((p['pdf_url'], s) for p, s in queue.iter_summaries())
+        assert summaries["https://mirror.example.org/mirror-paper2.pdf"] == "Summary of paper2.pdf (120)"
+        assert len(summaries) == 22
+
+    print(f"✅ {len(summaries)} URLs → {stats[SUMMARIZE]['done']} summaries with 4 workers "
+          f"(one crashed holding a lease) in {seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+"""
+🌐 MODULE: HTTP CLIENT
+======================
+
+Shared, resilient HTTP layer for PDF downloads and search APIs.
+
+KEY CONCEPTS:
+- Connection pooling: one requests.Session with a sized HTTPAdapter, reused
+  by every download and API call (no TCP/TLS handshake per request)
+- Retries: connection errors, timeouts and 5xx responses are retried with
+  exponential backoff and jitter
+- Circuit breaker (per host): after repeated failures a host is skipped for a
+  cool-down period instead of making every request wait for its timeout
+- Hedged requests: if a mirror (arxiv.org ↔ export.arxiv.org) hasn't answered
+  within hedge_delay, the same request goes to the next one; first answer wins
+- Range-resume: a download interrupted mid-body continues from the last byte
+  received (Range: bytes=N-) instead of starting over
+- Early abort: downloads can validate the first chunk (type / magic bytes)
+  and stop as soon as Content-Length or the bytes received pass max_bytes
+- FakeServer: local server with scripted failures for tests
+
+Usage:
+    client = get_http_client()
+    buffer = client.download(pdf_url, mirrors=arxiv_mirrors(pdf_url))
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import urlparse
+
+from src.metrics import counter
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+RETRY_STATUSES = (500, 502, 503, 504)
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+HTTP_RETRIES = counter("rps_http_retries_total", "HTTP attempts retried", labelnames=("host",))
+HTTP_HEDGES = counter("rps_http_hedged_total", "Hedged requests sent to a mirror", labelnames=("host",))
+CIRCUIT_OPEN = counter("rps_http_circuit_open_total", "Requests rejected by an open circuit", labelnames=("host",))
+
+_ARXIV_HOSTS = ("arxiv.org", "export.arxiv.org")
+
+
+class CircuitOpenError(Exception):
+    """The host's circuit breaker is open; the request was not sent."""
+
+
+class DownloadRejected(Exception):
+    """A download was aborted: too large ('size'), or the content failed validation."""
+
+    def __init__(self, message, reason="invalid"):
+        super().__init__(message)
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """Closed → open after `failure_threshold` consecutive failures → half-open after `reset_timeout`."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """True if a request may be sent (closed, or a half-open probe)."""
+        with self._lock:
+            state = self.state
+            if state == "half-open":
+                # Let one probe through; re-arm the timer for everyone else
+                self.opened_at = time.monotonic()
+                return True
+            return state == "closed"
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def arxiv_mirrors(url):
+    """
+    Equivalent URLs for an arXiv link, primary first.
+
+    Returns:
+        list: [url] for non-arXiv links, [url, mirror] for arxiv.org / export.arxiv.org
+    """
+    host = urlparse(url).netloc
+    if host not in _ARXIV_HOSTS:
+        return [url]
+    other = _ARXIV_HOSTS[1] if host == _ARXIV_HOSTS[0] else _ARXIV_HOSTS[0]
+    return [url, url.replace(host, other, 1)]
+
+
+class HttpClient:
+    """Pooled requests session with retries, per-host circuit breakers, hedging and resume."""
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=8.0, timeout=30, pool_size=16,
+                 failure_threshold=5, reset_timeout=30.0, hedge_delay=1.0):
+        """
+        Args:
+            retries (int): Extra attempts after the first one.
+            backoff (float): First retry delay in seconds (doubles per attempt).
+            max_backoff (float): Cap on a single retry delay.
+            timeout (float): Default per-request timeout.
+            pool_size (int): Keep-alive connections per host.
+            failure_threshold (int): Consecutive failures that open a host's circuit.
+            reset_timeout (float): Seconds before an open circuit lets a probe through.
+            hedge_delay (float): Seconds to wait before asking the next mirror.
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._requests = requests
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="http-hedge")
+
+    @property
+    def headers(self):
+        """Default headers of the pooled session."""
+        return self.session.headers
+
+    def breaker(self, host):
+        """Circuit breaker for `host` (created on first use)."""
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def _sleep_before_retry(self, attempt, host):
+        HTTP_RETRIES.inc(host=host)
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        time.sleep(delay * random.uniform(0.5, 1.0))  # jitter: don't retry in lockstep
+
+    def call(self, host, fn, *args, **kwargs):
+        """
+        Run `fn` (e.g. a third-party client call) under `host`'s breaker with retries.
+
+        Any exception counts as a failure; the last one is re-raised.
+        """
+        breaker = self.breaker(host)
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                CIRCUIT_OPEN.inc(host=host)
+                raise CircuitOpenError(f"Circuit open for {host}")
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                breaker.record_failure()
+                if attempt == self.retries:
+                    raise
+                logger.warning(f"⚠️ {host}: {e!r}, retry {attempt + 1}/{self.retries}")
+                self._sleep_before_retry(attempt, host)
+                continue
+            breaker.record_success()
+            return result
+
+    def request(self, method, url, retry_statuses=RETRY_STATUSES, **kwargs):
+        """
+        Send a request with retries and the host's circuit breaker.
+
+        Statuses outside `retry_statuses` (including 4xx) are returned as is;
+        the caller decides what they mean.
+
+        Raises:
+            CircuitOpenError: The host is failing; nothing was sent.
+            requests.RequestException: All attempts failed.
+        """
+        host = urlparse(url).netloc
+        breaker = self.breaker(host)
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                CIRCUIT_OPEN.inc(host=host)
+                raise CircuitOpenError(f"Circuit open for {host}")
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (self._requests.ConnectionError, self._requests.Timeout) as e:
+                breaker.record_failure()
+                if attempt == self.retries:
+                    raise
+                logger.warning(f"⚠️ {method} {url}: {e.__class__.__name__}, retry {attempt + 1}/{self.retries}")
+                self._sleep_before_retry(attempt, host)
+                continue
+
+            if response.status_code in retry_statuses:
+                breaker.record_failure()
+                if attempt < self.retries:
+                    response.close()
+                    logger.warning(f"⚠️ {method} {url}: HTTP {response.status_code}, "
+                                   f"retry {attempt + 1}/{self.retries}")
+                    self._sleep_before_retry(attempt, host)
+                    continue
+            else:
+                breaker.record_success()
+            return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def hedged(self, method, urls, hedge_delay=None, **kwargs):
+        """
+        Send the request to urls[0]; if it hasn't succeeded after hedge_delay
+        (or failed outright), also send it to the next mirror. The first
+        successful (< 400) response wins, the others are closed.
+
+        Returns:
+            requests.Response: Winning response (the last one if none succeeded).
+        """
+        hedge_delay = self.hedge_delay if hedge_delay is None else hedge_delay
+        pending, launched = set(), 0
+        last_error, last_response = None, None
+
+        def launch():
+            nonlocal launched
+            if launched:
+                HTTP_HEDGES.inc(host=urlparse(urls[launched]).netloc)
+            pending.add(self._hedge_pool.submit(self.request, method, urls[launched], **kwargs))
+            launched += 1
+
+        def close_when_done(future):
+            if future.exception() is None:
+                future.result().close()
+
+        launch()
+        while pending:
+            done, _ = wait(pending, timeout=hedge_delay if launched < len(urls) else None,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if response.status_code < 400:
+                    for loser in pending:
+                        loser.add_done_callback(close_when_done)
+                    return response
+                if last_response is not None:
+                    last_response.close()
+                last_response = response
+            if launched < len(urls) and (not done or not pending):
+                launch()  # slow (timer fired) or everything in flight failed
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+    def download(self, url, mirrors=None, into=None, chunk_size=DOWNLOAD_CHUNK_BYTES,
+                 max_bytes=None, validate=None, **kwargs):
+        """
+        Stream a (large) file, resuming from the last byte after a dropped connection.
+
+        Args:
+            url (str): File URL.
+            mirrors (list): Equivalent URLs, url first (hedged); default [url].
+            into: Writable binary file object (default: a new BytesIO).
+            chunk_size (int): Bytes per read.
+            max_bytes (int): Abort once the file is known to be larger.
+            validate: Optional callable(response, first_chunk) that raises
+                DownloadRejected to abort before the rest is read.
+
+        Returns:
+            File object positioned at 0.
+
+        Raises:
+            requests.HTTPError: Final non-2xx status.
+            DownloadRejected: Size limit exceeded or validation failed.
+        """
+        urls = mirrors or [url]
+        into = into if into is not None else BytesIO()
+        headers = dict(kwargs.pop("headers", None) or {})
+        if len(urls) > 1:
+            response = self.hedged("GET", urls, stream=True, headers=headers, **kwargs)
+        else:
+            response = self.request("GET", url, stream=True, headers=headers, **kwargs)
+        response.raise_for_status()
+        source_url = response.url or url
+        length = response.headers.get("Content-Length")
+        if max_bytes and length and length.isdigit() and int(length) > max_bytes:
+            response.close()
+            raise DownloadRejected(f"{url}: {int(length):,} bytes exceeds the {max_bytes:,} byte limit", "size")
+        received = 0
+
+        for attempt in range(self.retries + 1):
+            try:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if validate and received == 0 and chunk:
+                        try:
+                            validate(response, chunk)
+                        except DownloadRejected:
+                            response.close()
+                            raise
+                    received += len(chunk)
+                    if max_bytes and received > max_bytes:
+                        response.close()
+                        raise DownloadRejected(f"{url}: more than {max_bytes:,} bytes", "size")
+                    into.write(chunk)
+                break
+            except (self._requests.ConnectionError, self._requests.Timeout,
+                    self._requests.exceptions.ChunkedEncodingError) as e:
+                response.close()
+                if attempt == self.retries:
+                    raise
+                logger.warning(f"⚠️ Download interrupted at {received} bytes ({e.__class__.__name__}), resuming")
+                self._sleep_before_retry(attempt, urlparse(source_url).netloc)
+                response = self.request("GET", source_url, stream=True,
+                                        headers={**headers, "Range": f"bytes={received}-"}, **kwargs)
+                if response.status_code == 200:
+                    # Server ignored the range: start over
+                    into.seek(0)
+                    into.truncate()
+                    received = 0
+                elif response.status_code != 206:
+                    response.raise_for_status()
+        response.close()
+        into.seek(0)
+        return into
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Process-wide HttpClient (one connection pool for the whole app)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+# ------------------------------------------------------------------------------
+# Local fake server (tests): scripted failures, delays and dropped bodies
+# ------------------------------------------------------------------------------
+class FakeServer:
+    """
+    Serves scripted routes on 127.0.0.1.
+
+    Each route is a dict:
+        body (bytes)      response body
+        fail_times (int)  answer 503 this many times first
+        delay (float)     seconds to wait before answering
+        drop_after (int)  first full-body response is cut after this many bytes
+        ranges (bool)     honour Range requests (default True)
+
+    Usage:
+        with FakeServer({"/a.pdf": {"body": data, "fail_times": 2}}) as server:
+            client.get(server.url + "/a.pdf")
+    """
+
+    def __init__(self, routes, port=0):
+        self.routes = routes
+        self.hits = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        # Clients hang up on purpose (hedging losers); don't print tracebacks for it
+        self._server.handle_error = lambda request, client_address: None
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                route = fake.routes.get(path)
+                with fake._lock:
+                    fake.hits[path] = fake.hits.get(path, 0) + 1
+                    hit = fake.hits[path]
+                if route is None:
+                    return self._reply(404, b"")
+                time.sleep(route.get("delay", 0))
+                if hit <= route.get("fail_times", 0):
+                    return self._reply(503, b"busy")
+
+                body = route["body"]
+                range_header = self.headers.get("Range")
+                if range_header and route.get("ranges", True):
+                    start = int(range_header.split("=")[1].split("-")[0])
+                    return self._reply(206, body[start:], {
+                        "Content-Range": f"bytes {start}-{len(body) - 1}/{len(body)}"})
+                drop_after = route.pop("drop_after", None)
+                if drop_after is not None:
+                    # Promise the whole body, send part of it, hang up
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.send_header("Accept-Ranges", "bytes")
+                    self.end_headers()
+                    self.wfile.write(body[:drop_after])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self._reply(200, body, {"Accept-Ranges": "bytes"})
+
+            def _reply(self, status, body, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def test_http_client():
+    """
+    Retries, circuit breaker, hedging and range-resume against the fake server.
+
+    Usage: python -m src.http_client
+    """
+    print("\n" + "="*70)
+    print("TEST: Resilient HTTP client (local fake server)")
+    print("="*70)
+
+    payload = bytes(range(256)) * 4096  # 1 MiB
+    routes = {
+        "/flaky.pdf": {"body": payload, "fail_times": 2},
+        "/slow.pdf": {"body": payload, "delay": 2.0},
+        "/fast.pdf": {"body": payload},
+        "/dropped.pdf": {"body": payload, "drop_after": 300_000},
+        "/down": {"body": b"", "fail_times": 100},
+    }
+    client = HttpClient(retries=2, backoff=0.01, failure_threshold=3, reset_timeout=60, hedge_delay=0.2)
+
+    with FakeServer(routes) as server:
+        assert client.get(server.url + "/flaky.pdf").content == payload
+        print("✅ Retried through two 503s")
+
+        start = time.perf_counter()
+        buffer = client.download(server.url + "/slow.pdf",
+                                 mirrors=[server.url + "/slow.pdf", server.url + "/fast.pdf"])
+        assert buffer.read() == payload and time.perf_counter() - start < 1.5
+        print(f"✅ Hedged to the fast mirror in {time.perf_counter() - start:.2f}s")
+
+        assert client.download(server.url + "/dropped.pdf").read() == payload
+        print("✅ Resumed a dropped download with a Range request")
+
+        try:
+            client.download(server.url + "/fast.pdf", max_bytes=1000)
+            raise AssertionError("oversized download should be rejected")
+        except DownloadRejected as e:
+            assert e.reason == "size"
+        print("✅ Oversized download rejected from Content-Length")
+
+        with FakeServer(routes) as other:
+            # Separate host (port) so the breaker state is isolated
+            assert client.get(other.url + "/down").status_code == 503
+            try:
+                client.get(other.url + "/down")
+                raise AssertionError("circuit should be open")
+            except CircuitOpenError:
+                pass
+            assert other.hits["/down"] == 3
+        print("✅ Circuit opened after 3 failures; later calls fail fast")
+
+
+if __name__ == "__main__":
+    test_http_client()
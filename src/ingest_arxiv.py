@@ -0,0 +1,232 @@
+"""
+📥 MODULE: ARXIV DUMP INGESTION
+===============================
+
+Bulk-loads the arXiv metadata snapshot (one JSON object per line, as
+published on Kaggle / the arXiv S3 bucket) into the local index.
+
+KEY CONCEPTS:
+- Streaming: the file (plain or .gz) is read line by line, never whole
+- Bounded memory: at most 2 chunks per worker are in flight at any time
+- Parallel parsing: JSON decoding + category filtering run in a process pool
+- Batched inserts: one executemany() transaction per chunk
+- Coverage: ingested categories and their newest date are recorded, so
+  PaperRetriever can answer those categories locally and only ask the
+  arXiv API for papers submitted after the dump
+
+Usage:
+    python -m src.ingest_arxiv arxiv-metadata-oai-snapshot.json --categories cs.CL cs.LG
+"""
+import argparse
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+from src.local_index import LocalIndex
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CHUNK_LINES = 5000
+
+
+def _open_dump(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _iter_chunks(path, chunk_lines):
+    """Yield lists of raw lines from the dump."""
+    chunk = []
+    with _open_dump(path) as f:
+        for line in f:
+            chunk.append(line)
+            if len(chunk) >= chunk_lines:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _matches(paper_categories, wanted):
+    return any(c == w or c.startswith(w + '.') for c in paper_categories for w in wanted)
+
+
+def _to_paper(record):
+    """Map one snapshot record onto our paper dictionary."""
+    arxiv_id = record['id']
+    year = None
+    versions = record.get('versions') or []
+    if versions and versions[0].get('created'):
+        try:
+            year = parsedate_to_datetime(versions[0]['created']).year
+        except (TypeError, ValueError):
+            pass
+    if year is None and record.get('update_date'):
+        year = int(record['update_date'][:4])
+
+    parsed = record.get('authors_parsed')
+    if parsed:
+        authors = [' '.join(part for part in (first, last) if part) for last, first, *_ in parsed]
+    else:
+        authors = [a.strip() for a in (record.get('authors') or '').replace(' and ', ', ').split(',') if a.strip()]
+
+    return {
+        'title': ' '.join((record.get('title') or '').split()),
+        'authors': authors,
+        'abstract': ' '.join((record.get('abstract') or '').split()),
+        'year': year or 'N/A',
+        'pdf_url': f"https://arxiv.org/pdf/{arxiv_id}",
+        'paper_url': f"https://arxiv.org/abs/{arxiv_id}",
+        'source': 'arXiv',
+        'categories': record.get('categories', ''),
+    }
+
+
+def _parse_chunk(lines, categories):
+    """
+    Worker: decode and filter one chunk.
+
+    Returns:
+        tuple: (papers, {category: (count, newest update_date)}, malformed lines)
+    """
+    papers, coverage, malformed = [], {}, 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            malformed += 1
+            continue
+        paper_categories = (record.get('categories') or '').split()
+        if categories and not _matches(paper_categories, categories):
+            continue
+        try:
+            papers.append(_to_paper(record))
+        except (KeyError, ValueError):
+            malformed += 1
+            continue
+        updated = record.get('update_date') or ''
+        for category in (categories or ['*']):
+            if category == '*' or _matches(paper_categories, [category]):
+                count, newest = coverage.get(category, (0, ''))
+                coverage[category] = (count + 1, max(newest, updated))
+    return papers, coverage, malformed
+
+
+def ingest_dump(path, categories=None, index=None, workers=None, chunk_lines=DEFAULT_CHUNK_LINES):
+    """
+    Stream an arXiv metadata dump into the local index.
+
+    Args:
+        path (str): Snapshot file (.json lines, optionally .gz).
+        categories (list): Keep only these categories ('cs' keeps all cs.*);
+            None keeps everything.
+        index (LocalIndex): Target index (default: RPS_INDEX_PATH).
+        workers (int): Parser processes (default: CPU count).
+        chunk_lines (int): Lines per parse task and per insert transaction.
+
+    Returns:
+        dict: Stats (lines, papers, malformed, seconds).
+    """
+    index = index or LocalIndex()
+    workers = workers or os.cpu_count() or 1
+    categories = list(categories) if categories else None
+    coverage = {}
+    stats = {'lines': 0, 'papers': 0, 'malformed': 0, 'seconds': 0.0}
+    start = time.perf_counter()
+    log_every = chunk_lines * 20
+
+    def store(result, lines):
+        papers, chunk_coverage, malformed = result
+        index.add_papers(papers)
+        if (stats['lines'] + lines) // log_every > stats['lines'] // log_every:
+            logger.info(f"📥 {stats['lines'] + lines:,} lines, {stats['papers'] + len(papers):,} papers")
+        stats['lines'] += lines
+        stats['papers'] += len(papers)
+        stats['malformed'] += malformed
+        for category, (count, newest) in chunk_coverage.items():
+            total, latest = coverage.get(category, (0, ''))
+            coverage[category] = (total + count, max(latest, newest))
+
+    with multiprocessing.Pool(workers) as pool:
+        in_flight = deque()
+        for chunk in _iter_chunks(path, chunk_lines):
+            in_flight.append((pool.apply_async(_parse_chunk, (chunk, categories)), len(chunk)))
+            # Keep at most two chunks per worker in memory; insert in file order
+            while len(in_flight) >= 2 * workers:
+                result, lines = in_flight.popleft()
+                store(result.get(), lines)
+        while in_flight:
+            result, lines = in_flight.popleft()
+            store(result.get(), lines)
+
+    index.record_dump(coverage or {category: (0, '') for category in (categories or ['*'])})
+    stats['seconds'] = time.perf_counter() - start
+    logger.info(f"✅ Ingested {stats['papers']:,} papers from {stats['lines']:,} lines "
+                f"in {stats['seconds']:.1f}s ({stats['malformed']} malformed)")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load an arXiv metadata snapshot into the local index")
+    parser.add_argument("path", help="arxiv-metadata-oai-snapshot.json (or .json.gz)")
+    parser.add_argument("--categories", nargs="*", help="e.g. cs.CL cs.LG stat (default: all)")
+    parser.add_argument("--index", help="Index database (default: RPS_INDEX_PATH or data/index.sqlite)")
+    parser.add_argument("--workers", type=int, help="Parser processes (default: CPU count)")
+    parser.add_argument("--chunk-lines", type=int, default=DEFAULT_CHUNK_LINES)
+    args = parser.parse_args(argv)
+
+    ingest_dump(args.path, categories=args.categories, index=LocalIndex(args.index),
+                workers=args.workers, chunk_lines=args.chunk_lines)
+
+
+def test_ingest():
+    """
+    Ingest a small synthetic snapshot and query the result.
+
+    Usage: python -c "from src.ingest_arxiv import test_ingest; test_ingest()"
+    """
+    import tempfile
+
+    print("\n" + "="*70)
+    print("TEST: arXiv dump ingestion")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = os.path.join(tmp, "snapshot.json")
+        with open(dump, "w") as f:
+            for i in range(2000):
+                f.write(json.dumps({
+                    'id': f"2101.{i:05d}",
+                    'authors': "A. Author, B. Author",
+                    'title': f"Paper {i} on {'transformers' if i % 2 else 'galaxies'}",
+                    'categories': "cs.CL cs.LG" if i % 2 else "astro-ph.GA",
+                    'abstract': "  An abstract\n spread over lines. ",
+                    'versions': [{'version': 'v1', 'created': "Mon, 4 Jan 2021 10:00:00 GMT"}],
+                    'update_date': f"2021-01-{1 + i % 28:02d}",
+                    'authors_parsed': [["Author", "A.", ""], ["Author", "B.", ""]],
+                }) + "\n")
+            f.write("{not json\n")
+
+        index = LocalIndex(os.path.join(tmp, "index.sqlite"))
+        stats = ingest_dump(dump, categories=["cs"], index=index, workers=2, chunk_lines=300)
+        assert stats['papers'] == 1000 and stats['malformed'] == 1
+        assert index.count() == 1000
+        assert index.dump_coverage(["cs.CL"]) == "2021-01-28"
+        assert index.dump_coverage(["astro-ph"]) is None
+        hits = index.search("transformers", categories=["cs.CL"])
+        assert hits and hits[0]['authors'] == ["A. Author", "B. Author"] and hits[0]['year'] == 2021
+
+    print(f"✅ {stats['papers']} papers in {stats['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+⏱️ MODULE: LATENCY BUDGET
+=========================
+
+Picks generation settings that fit a per-request deadline.
+
+KEY CONCEPTS:
+- CostModel: online linear model of generate() time, one per beam count,
+  learned from every summary this process has produced
+      seconds ≈ c0 + c1 * input_tokens + c2 * output_tokens
+- choose_plan(): walks a ladder of presets from best quality to cheapest
+      4 beams → 2 beams → greedy → greedy with shorter output / input → extractive
+  and returns the first one predicted to finish in time
+- Queue depth shrinks the budget: requests waiting ahead of us eat into it
+- Worker processes learn locally and send their timings back with each
+  result (drain()), so the parent's model learns too
+- extractive_summary(): model-free fallback when nothing else fits
+"""
+import logging
+import re
+import threading
+from collections import Counter, deque
+
+from src.utils import SENTENCE_SPLIT, STOPWORDS
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Beam counts tried in order of preference (quality first)
+BEAM_LADDER = (4, 2, 1)
+# Output lengths never shrink below this many tokens before going extractive
+MIN_GENERATED_TOKENS = 64
+# Feature scaling keeps the normal equations well conditioned
+_INPUT_SCALE = 1000.0
+_OUTPUT_SCALE = 100.0
+# Forgetting factor: recent timings matter more (load changes over time)
+_DECAY = 0.98
+# Weight of the prior, in pseudo-observations
+_PRIOR_WEIGHT = 2.0
+
+
+def _prior(num_beams):
+    """Rough CPU timings for PEGASUS-large, used until real samples arrive."""
+    # (intercept s, s per 1000 input tokens, s per 100 output tokens)
+    return [0.2, 1.0, 1.5 + 0.75 * num_beams]
+
+
+def _solve3(a, b):
+    """Solve a 3x3 linear system with Gaussian elimination (partial pivoting)."""
+    m = [row[:] + [rhs] for row, rhs in zip(a, b)]
+    for col in range(3):
+        pivot = max(range(col, 3), key=lambda r: abs(m[r][col]))
+        m[col], m[pivot] = m[pivot], m[col]
+        if abs(m[col][col]) < 1e-12:
+            return None
+        for r in range(col + 1, 3):
+            factor = m[r][col] / m[col][col]
+            for c in range(col, 4):
+                m[r][c] -= factor * m[col][c]
+    x = [0.0, 0.0, 0.0]
+    for r in (2, 1, 0):
+        x[r] = (m[r][3] - sum(m[r][c] * x[c] for c in range(r + 1, 3))) / m[r][r]
+    return x
+
+
+class CostModel:
+    """Online ridge regression of generate() time per beam count."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._normal = {}  # num_beams -> (XtX 3x3, Xty 3)
+        self.samples = {}
+        # Raw timings since the last drain(): worker processes ship them to the parent
+        self._journal = deque(maxlen=1000)
+
+    def _equations(self, num_beams):
+        """Decayed normal equations of the observed timings only (no prior)."""
+        if num_beams not in self._normal:
+            self._normal[num_beams] = ([[0.0] * 3 for _ in range(3)], [0.0] * 3)
+        return self._normal[num_beams]
+
+    @staticmethod
+    def _features(input_tokens, output_tokens):
+        return [1.0, input_tokens / _INPUT_SCALE, output_tokens / _OUTPUT_SCALE]
+
+    def observe(self, num_beams, input_tokens, output_tokens, seconds):
+        """Learn from one finished generate() call."""
+        x = self._features(input_tokens, output_tokens)
+        with self._lock:
+            xtx, xty = self._equations(num_beams)
+            for i in range(3):
+                xty[i] = _DECAY * xty[i] + x[i] * seconds
+                for j in range(3):
+                    xtx[i][j] = _DECAY * xtx[i][j] + x[i] * x[j]
+            self.samples[num_beams] = self.samples.get(num_beams, 0) + 1
+            self._journal.append((num_beams, input_tokens, output_tokens, seconds))
+
+    def drain(self):
+        """Timings observed since the last call, as observe() argument tuples."""
+        with self._lock:
+            timings = list(self._journal)
+            self._journal.clear()
+        return timings
+
+    def _raw_predict(self, num_beams, x):
+        prior = _prior(num_beams)
+        with self._lock:
+            xtx, xty = self._equations(num_beams)
+            # The prior is added at solve time so decay never wears it away: with
+            # inputs of nearly one length (truncated papers) it still pins the slopes
+            a = [[xtx[i][j] + (_PRIOR_WEIGHT if i == j else 0.0) for j in range(3)] for i in range(3)]
+            b = [xty[i] + _PRIOR_WEIGHT * prior[i] for i in range(3)]
+        coef = _solve3(a, b) or prior
+        # More tokens never take less time
+        coef = [coef[0], max(coef[1], 0.0), max(coef[2], 0.0)]
+        return max(sum(c * v for c, v in zip(coef, x)), 0.0)
+
+    def predict(self, num_beams, input_tokens, output_tokens):
+        """Predicted seconds for one generate() call."""
+        x = self._features(input_tokens, output_tokens)
+        trained = [b for b, n in self.samples.items() if n]
+        if num_beams in trained or not trained:
+            return self._raw_predict(num_beams, x)
+
+        # Never ran with this beam count: scale the closest trained one by the
+        # ratio of the priors (the host's speed carries over, the shape doesn't change)
+        nearest = min(trained, key=lambda b: abs(b - num_beams))
+        prior_ratio = (sum(c * v for c, v in zip(_prior(num_beams), x))
+                       / sum(c * v for c, v in zip(_prior(nearest), x)))
+        return self._raw_predict(nearest, x) * prior_ratio
+
+
+# Process-wide model fed by PaperSummarizer._generate
+COST_MODEL = CostModel()
+
+
+class Plan:
+    """Generation settings chosen for one request."""
+
+    def __init__(self, num_beams, max_length, min_length, input_chars, predicted_s, extractive=False):
+        self.num_beams = num_beams
+        self.max_length = max_length
+        self.min_length = min_length
+        self.input_chars = input_chars
+        self.predicted_s = predicted_s
+        self.extractive = extractive
+
+    def __repr__(self):
+        if self.extractive:
+            return "Plan(extractive)"
+        return (f"Plan(beams={self.num_beams}, max_length={self.max_length}, "
+                f"input_chars={self.input_chars}, predicted={self.predicted_s:.2f}s)")
+
+
+def choose_plan(text_chars, max_length, min_length, deadline_ms, max_input_chars,
+                queue_depth=0, cost_model=COST_MODEL):
+    """
+    Pick the best-quality generation settings predicted to meet the deadline.
+
+    Args:
+        text_chars (int): Length of the input text in characters.
+        max_length, min_length (int): Requested summary length (tokens).
+        deadline_ms (float): Time budget for this request.
+        max_input_chars (int): Input window of the model, in characters.
+        queue_depth (int): Requests queued ahead of this one.
+        cost_model (CostModel): Timing model to consult.
+
+    Returns:
+        Plan: Settings to use (plan.extractive means skip the model).
+    """
+    # Requests ahead of us run first; assume they cost about as much as we do
+    budget_s = deadline_ms / 1000.0 / (queue_depth + 1)
+
+    def tokens(chars):
+        return min(chars, max_input_chars) / 4  # 1 token ≈ 4 characters
+
+    input_chars = min(text_chars, max_input_chars)
+
+    # 1) full length, fewer beams
+    for beams in BEAM_LADDER:
+        predicted = cost_model.predict(beams, tokens(input_chars), max_length)
+        if predicted <= budget_s:
+            return Plan(beams, max_length, min_length, input_chars, predicted)
+
+    # 2) greedy with shorter output, then a shorter input window
+    for chars in (input_chars, input_chars // 2):
+        length = max_length
+        while length >= MIN_GENERATED_TOKENS:
+            predicted = cost_model.predict(1, tokens(chars), length)
+            if predicted <= budget_s:
+                return Plan(1, length, min(min_length, length), chars, predicted)
+            length = int(length * 0.75)
+
+    # 3) nothing fits
+    return Plan(0, max_length, min_length, input_chars, 0.0, extractive=True)
+
+
+_WORD = re.compile(r'[a-z][a-z\-]+')
+
+
+def extractive_summary(text, max_words=200):
+    """
+    Frequency-based extractive summary (no model, linear time).
+
+    Sentences are scored by the average document frequency of their content
+    words and the best ones are returned in their original order.
+    """
+    sentences = [s.strip() for s in SENTENCE_SPLIT.split(text) if len(s.split()) >= 5]
+    if not sentences:
+        return ' '.join(text.split()[:max_words])
+
+    freq = Counter(w for w in _WORD.findall(text.lower()) if w not in STOPWORDS)
+
+    def score(sentence):
+        words = [w for w in _WORD.findall(sentence.lower()) if w not in STOPWORDS]
+        return sum(freq[w] for w in words) / (len(words) + 1)
+
+    ranked = sorted(range(len(sentences)), key=lambda i: score(sentences[i]), reverse=True)
+    chosen, words = [], 0
+    for i in ranked:
+        length = len(sentences[i].split())
+        if words + length > max_words and chosen:
+            continue
+        chosen.append(i)
+        words += length
+        if words >= max_words:
+            break
+    return ' '.join(sentences[i] for i in sorted(chosen))
+
+
+def test_cost_model():
+    """
+    Learn from truncated inputs only (a narrow token range) and check that
+    predictions still grow with input length, so a shorter window can help.
+
+    Usage: python -m src.latency_budget
+    """
+    import random
+
+    print("\n" + "="*70)
+    print("TEST: Cost model")
+    print("="*70)
+
+    rng = random.Random(0)
+    model = CostModel()
+    for _ in range(600):
+        tokens_in = rng.uniform(860, 890)
+        tokens_out = rng.uniform(150, 250)
+        seconds = 0.5 + 2.0 * tokens_in / 1000 + 3.0 * tokens_out / 100
+        model.observe(4, tokens_in, tokens_out, seconds * rng.uniform(0.9, 1.1))
+
+    predictions = [model.predict(4, tokens, 200) for tokens in (25, 437, 875)]
+    assert predictions == sorted(predictions), predictions
+    assert abs(predictions[2] - (0.5 + 2.0 * 0.875 + 6.0)) < 1.0, predictions
+    plan = choose_plan(3500, 200, 80, deadline_ms=1000 * model.predict(1, 437.5, 84) * 1.01,
+                       max_input_chars=3500, cost_model=model)
+    assert plan.input_chars == 1750 and not plan.extractive, plan
+    print(f"✅ predict(4, ·, 200): 25 → {predictions[0]:.1f}s, 437 → {predictions[1]:.1f}s, "
+          f"875 → {predictions[2]:.1f}s; shorter-window rung chosen: {plan}")
+
+
+if __name__ == "__main__":
+    test_cost_model()
@@ -0,0 +1,660 @@
+"""
+📈 MODULE: LOAD TEST
+====================
+
+How many concurrent users can one app.py instance serve? Simulated sessions
+drive the search, upload and summarize flows against recorded API responses
+and fixture PDFs, with a stepped ramp of concurrency, until latency or
+throughput stops scaling.
+
+KEY CONCEPTS:
+- In-process sessions: Streamlit runs every browser session as a thread of
+  one server process, sharing its caches, model, extraction pool and text
+  store; each simulated session is such a thread calling the same code the
+  app's buttons call (PaperRetriever.iter_search, extract_batch +
+  text_store, load_summarizer().summarize[_multiple]). Page rendering and
+  websocket traffic are not simulated (see the rerun metrics in /metrics)
+- Recorded responses: Semantic Scholar is answered by its stand-in server
+  (S2_API_URL), arXiv by a recorded Atom feed (ARXIV_API_URL), URL uploads by
+  a local file server; the local index and text store live in a temp dir.
+  Nothing leaves the machine, so results measure this instance, not the APIs
+- Fixture PDFs: generated text PDFs by default, or a directory of real ones
+- Ramp: steps of N concurrent sessions (1, 2, 4, ...), each for a fixed time;
+  sessions loop search → upload → summarize with randomized think time
+- Per step: p50/p95/p99 latency per stage and per flow (exact, from every
+  sample), flows/s, errors, and process + worker-process RSS sampled over time
+- Saturation: the first step where flow throughput grows by less than
+  `min_gain` while sessions grow, p95 exceeds `latency_factor` × the
+  single-session p95 (or the --p95-slo), or more than 5% of flows fail;
+  capacity is the step before it
+
+Usage:
+    python -m src.loadtest --sessions 1,2,4,8,16 --step-seconds 30
+    python -m src.loadtest --flows search,summarize --summarizer extractive --think 0
+    python -m src.loadtest --pdf-dir fixtures/ --s2-papers recorded_search.json --json report.json
+"""
+import argparse
+import contextlib
+import glob
+import json
+import logging
+import math
+import os
+import random
+import tempfile
+import textwrap
+import threading
+import time
+from xml.sax.saxutils import escape
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+FLOWS = ("search", "upload", "summarize")
+# A step with more failed flows than this is saturated whatever its latency
+MAX_ERROR_RATE = 0.05
+# p95 growth smaller than this (seconds) is noise, not saturation
+MIN_LATENCY_GROWTH = 0.05
+# Memory is sampled this often (seconds)
+SAMPLE_INTERVAL = 0.5
+
+_TOPICS = ["graph neural networks", "sparse attention", "protein folding", "speech recognition",
+           "reinforcement learning", "image segmentation", "retrieval augmentation", "federated learning"]
+_SENTENCES = [
+    "We propose a new method for {t} that improves accuracy on standard benchmarks.",
+    "Our experiments on {t} show consistent gains over strong baselines across {n} datasets.",
+    "The approach to {t} reduces training cost by {n} percent without loss of quality.",
+    "We analyse failure cases of {t} and identify {n} recurring error patterns.",
+    "Ablations show that each component of the {t} pipeline contributes to the final result.",
+    "Code and pretrained models for {t} are released to support reproducibility.",
+    "Compared with prior work on {t}, our model needs {n} times fewer parameters.",
+]
+
+
+# ------------------------------------------------------------------------------
+# Fixtures: papers, a recorded arXiv feed, text PDFs
+# ------------------------------------------------------------------------------
+def fixture_text(rng, topic, sentences):
+    """Plausible paper prose about `topic`."""
+    return ' '.join(rng.choice(_SENTENCES).format(t=topic, n=rng.randint(2, 90)) for _ in range(sentences))
+
+
+def fixture_papers(count=200, seed=0):
+    """Graph API shaped papers (what StandInServer serves), a few per topic."""
+    rng = random.Random(seed)
+    papers = []
+    for i in range(count):
+        topic = _TOPICS[i % len(_TOPICS)]
+        papers.append({
+            'paperId': f"{i:040x}",
+            'title': f"{topic.title()}: study {i}",
+            'abstract': fixture_text(rng, topic, 6),
+            'year': 2015 + i % 10,
+            'authors': [{'authorId': str(i * 3 + k), 'name': f"Author {i * 3 + k}"} for k in range(3)],
+            'url': f"https://www.semanticscholar.org/paper/{i:040x}",
+            'openAccessPdf': {'url': f"https://example.org/{i}.pdf", 'status': 'GREEN'},
+        })
+    return papers
+
+
+def fixture_arxiv_feed(papers):
+    """An arXiv API Atom response listing `papers` (StandInServer format)."""
+    entries = []
+    for i, paper in enumerate(papers):
+        arxiv_id = f"2401.{i:05d}v1"
+        authors = ''.join(f"<author><name>{escape(a['name'])}</name></author>" for a in paper['authors'])
+        entries.append(f"""  <entry>
+    <id>http://arxiv.org/abs/{arxiv_id}</id>
+    <updated>{paper['year']}-01-02T00:00:00Z</updated>
+    <published>{paper['year']}-01-02T00:00:00Z</published>
+    <title>{escape(paper['title'])}</title>
+    <summary>{escape(paper['abstract'])}</summary>
+    {authors}
+    <link href="http://arxiv.org/abs/{arxiv_id}" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/{arxiv_id}" rel="related" type="application/pdf"/>
+    <arxiv:primary_category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>""")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" xmlns:arxiv="http://arxiv.org/schemas/atom">
+  <id>http://arxiv.org/api/loadtest</id>
+  <title>ArXiv Query</title>
+  <updated>2024-01-01T00:00:00-05:00</updated>
+  <opensearch:totalResults>{len(papers)}</opensearch:totalResults>
+  <opensearch:startIndex>0</opensearch:startIndex>
+  <opensearch:itemsPerPage>{len(papers)}</opensearch:itemsPerPage>
+{chr(10).join(entries)}
+</feed>
+""".encode("utf-8")
+
+
+def _pdf_escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def fixture_pdf(text, lines_per_page=50, chars_per_line=95):
+    """
+    A minimal text PDF (Helvetica, one content stream per page).
+
+    Returns:
+        bytes: PDF file contents
+    """
+    lines = textwrap.wrap(text, chars_per_line)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    # 1 catalog, 2 page tree, 3 font, then a (page, contents) pair per page
+    kids = ' '.join(f"{4 + 2 * i} 0 R" for i in range(len(pages)))
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>",
+               f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode(),
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for i, page_lines in enumerate(pages):
+        content = ("BT /F1 10 Tf 12 TL 50 800 Td "
+                   + ' '.join(f"({_pdf_escape(line)}) Tj T*" for line in page_lines)
+                   + " ET").encode("latin-1", "replace")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode())
+        objects.append(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b''.join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def fixture_pdfs(count=6, pages=8, seed=0):
+    """(filename, bytes) pairs of generated papers, ~50 lines of text per page."""
+    rng = random.Random(seed)
+    return [(f"fixture_{i}.pdf", fixture_pdf(fixture_text(rng, _TOPICS[i % len(_TOPICS)], 45 * pages)))
+            for i in range(count)]
+
+
+def load_pdf_dir(path):
+    """(filename, bytes) pairs for the PDFs in a directory."""
+    pdfs = []
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(".pdf"):
+            with open(os.path.join(path, name), "rb") as f:
+                pdfs.append((name, f.read()))
+    if not pdfs:
+        raise ValueError(f"No PDFs in {path}")
+    return pdfs
+
+
+@contextlib.contextmanager
+def stand_ins(papers, arxiv_feed, remote_pdf, api_delay=0.0, local_index=True):
+    """
+    Serve recorded responses locally and point the app's clients at them.
+
+    Sets S2_API_URL, ARXIV_API_URL, a temp RPS_INDEX_PATH / RPS_TEXT_STORE_DIR and
+    (unless set) a high S2_RATE_LIMIT and no arXiv request delay for the duration;
+    yields the URL of the remote fixture PDF.
+    """
+    from src.http_client import FakeServer
+    from src.semantic_scholar import StandInServer
+
+    routes = {"/api/query": {'body': arxiv_feed, 'delay': api_delay},
+              "/fixtures/remote.pdf": {'body': remote_pdf, 'delay': api_delay}}
+    saved = dict(os.environ)
+    with tempfile.TemporaryDirectory(prefix="rps-loadtest-") as tmp, \
+            StandInServer(papers) as s2, FakeServer(routes) as files:
+        os.environ.update({
+            'S2_API_URL': s2.url,
+            'ARXIV_API_URL': files.url,
+            'RPS_INDEX_PATH': os.path.join(tmp, "index.sqlite"),
+            'RPS_TEXT_STORE_DIR': os.path.join(tmp, "text_store"),
+            'RPS_LOCAL_INDEX': "1" if local_index else "0",
+        })
+        # The stand-in is not the public API: its 1 request/s limit would only
+        # measure the shared rate limiter (set S2_RATE_LIMIT to keep one)
+        os.environ.setdefault('S2_RATE_LIMIT', "1000")
+        os.environ.setdefault('RPS_ARXIV_DELAY_S', "0")
+        try:
+            yield files.url + "/fixtures/remote.pdf"
+        finally:
+            os.environ.clear()
+            os.environ.update(saved)
+
+
+# ------------------------------------------------------------------------------
+# Measurements
+# ------------------------------------------------------------------------------
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0..100) of a list, None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def _rss_mb(pid="self"):
+    """Current resident set size of a process in MB (Linux /proc; peak RSS elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid == "self":
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+    return 0.0
+
+
+def _children_rss_mb():
+    """RSS of direct child processes (extraction / summary pools, the progress manager)."""
+    pids = set()
+    for path in glob.glob("/proc/self/task/*/children"):
+        try:
+            with open(path) as f:
+                pids.update(f.read().split())
+        except OSError:
+            pass
+    return sum(_rss_mb(pid) for pid in pids)
+
+
+class MemorySampler:
+    """Background thread recording RSS over time, tagged with the current step."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.sessions = 0
+        self.samples = []
+        self._stop = threading.Event()
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="loadtest-memory", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.samples.append({
+                't': round(time.perf_counter() - self._start, 2),
+                'sessions': self.sessions,
+                'rss_mb': round(_rss_mb(), 1),
+                'children_mb': round(_children_rss_mb(), 1),
+            })
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class _ExtractiveStandIn:
+    """Summarizer with the app's interface but no model (measures everything around it)."""
+
+    def summarize(self, text, max_length=200, min_length=80, deadline_ms=None):
+        from src.latency_budget import extractive_summary
+        return extractive_summary(text, max_words=max_length)
+
+    def summarize_multiple(self, texts, deadline_ms=None):
+        from src.summarizer import summarize_meta
+        summaries = [self.summarize(text) for text in texts]
+        return summaries, summarize_meta(self.summarize, summaries, deadline_ms)
+
+
+# ------------------------------------------------------------------------------
+# Sessions and ramp
+# ------------------------------------------------------------------------------
+class LoadTest:
+    """Simulated sessions for one app instance; run() ramps them up step by step."""
+
+    def __init__(self, pdfs, pdf_url=None, flows=FLOWS, summarizer="model", think=1.0,
+                 papers=3, uploads=2, page_size=10, deadline_ms=None, queries=None):
+        """
+        Args:
+            pdfs (list): (filename, bytes) fixture PDFs for uploads.
+            pdf_url (str): Also extract this URL in every upload (the URL field).
+            flows (tuple): Stages each session runs, in order.
+            summarizer (str): 'model' (load_summarizer, honours RPS_SUMMARY_WORKERS /
+                RPS_BATCH_MAX_SIZE) or 'extractive' (no model).
+            think (float): Mean pause between a session's stages, in seconds.
+            papers (int): Papers summarized per summarize stage.
+            uploads (int): Fixture PDFs per upload.
+            page_size (int): Results per search page.
+            deadline_ms (float): Time budget per summary (the app's slider).
+            queries (list): Search queries (default: the fixture topics).
+        """
+        unknown = set(flows) - set(FLOWS)
+        if unknown:
+            raise ValueError(f"Unknown flow(s) {', '.join(sorted(unknown))} (choose from {', '.join(FLOWS)})")
+        self.pdfs = pdfs
+        self.pdf_url = pdf_url
+        self.flows = tuple(flows)
+        self.summarizer = summarizer
+        self.think = think
+        self.papers = papers
+        self.uploads = uploads
+        self.page_size = page_size
+        self.deadline_ms = deadline_ms
+        self.queries = queries or _TOPICS
+        self.samples = []  # (sessions, stage, seconds, error, finished_at)
+        self._stand_in = _ExtractiveStandIn()
+
+    def _get_summarizer(self):
+        if self.summarizer == "extractive":
+            return self._stand_in
+        from src.summarizer import load_summarizer
+        return load_summarizer(use_cache=True)
+
+    # --- stages: the calls app.py makes for each button ------------------------
+    def _search(self, rng):
+        from src.paper_retrieval import PaperRetriever
+        papers = list(PaperRetriever().iter_search(rng.choice(self.queries), page_size=self.page_size))
+        if not papers:
+            raise RuntimeError("no results")
+        return papers
+
+    def _upload(self, session_id, rng):
+        from src.batch_extract import ExtractionJob, extract_batch
+        from src.session_store import get_text_store
+
+        chosen = rng.sample(self.pdfs, min(self.uploads, len(self.pdfs)))
+        jobs = [ExtractionJob(name, data=data) for name, data in chosen]
+        if self.pdf_url:
+            jobs.append(ExtractionJob(self.pdf_url.split('/')[-1], url=self.pdf_url))
+        store = get_text_store()
+        papers = [{'filename': job.name, 'text_key': store.put(session_id, text)}
+                  for job, text in zip(jobs, extract_batch(jobs)) if text]
+        store.retain(session_id, [paper['text_key'] for paper in papers])
+        if not papers:
+            raise RuntimeError("no text extracted")
+        return papers
+
+    def _summarize(self, session_id, papers):
+        from src.session_store import paper_text
+
+        texts = [t for t in (paper_text(paper, session_id) for paper in papers[:self.papers]) if t]
+        if not texts:
+            raise RuntimeError("nothing to summarize")
+        summarizer = self._get_summarizer()
+        if len(texts) == 1:
+            summarizer.summarize(texts[0], deadline_ms=self.deadline_ms)
+        else:
+            summarizer.summarize_multiple(texts, deadline_ms=self.deadline_ms)
+
+    def _flow(self, session_id, rng, sessions, stop=None):
+        """One pass through the flows; records every stage and the flow as a whole."""
+        papers, busy, error = [], 0.0, None
+        for i, name in enumerate(self.flows):
+            if i and self.think and stop is not None and stop.wait(self.think * rng.uniform(0.5, 1.5)):
+                return  # step over during think time: the flow is not counted
+            start = time.perf_counter()
+            try:
+                if name == "search":
+                    papers = self._search(rng)
+                elif name == "upload":
+                    papers = self._upload(session_id, rng)
+                else:
+                    self._summarize(session_id, papers)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            seconds = time.perf_counter() - start
+            busy += seconds
+            self.samples.append((sessions, name, seconds, error, time.perf_counter()))
+            if error:
+                break
+        self.samples.append((sessions, "flow", busy, error, time.perf_counter()))
+
+    def _session(self, session_id, sessions, stop):
+        rng = random.Random(session_id)
+        while not stop.is_set():
+            self._flow(session_id, rng, sessions, stop)
+            if self.think:
+                stop.wait(self.think * rng.uniform(0.5, 1.5))
+
+    def warm_up(self):
+        """One unrecorded flow: model load, pool start-up and first imports are not load."""
+        logger.info("🔥 Warm-up flow (model load, worker pools)")
+        samples, self.samples = self.samples, []
+        self._flow("loadtest-warmup", random.Random(0), 0)
+        warm, self.samples = self.samples, samples
+        errors = [f"{stage}: {error}" for _, stage, _, error, _ in warm if error and stage != "flow"]
+        if errors:
+            logger.warning(f"⚠️ Warm-up failed ({errors[0]}); measuring anyway")
+
+    def run_step(self, sessions, seconds):
+        """Run `sessions` concurrent sessions for `seconds`; returns the step's statistics."""
+        stop = threading.Event()
+        threads = [threading.Thread(target=self._session, args=(f"loadtest-{sessions}-{i}", sessions, stop),
+                                    name=f"loadtest-session-{i}", daemon=True) for i in range(sessions)]
+        start = time.perf_counter()
+        for i, thread in enumerate(threads):
+            thread.start()
+            # Arrivals spread over the first second, not one burst
+            time.sleep(min(1.0, seconds / 10) / sessions)
+        time.sleep(max(0.0, seconds - (time.perf_counter() - start)))
+        stop.set()
+        for thread in threads:
+            thread.join()  # sessions finish the stage they are in
+        return self.step_stats(sessions, start, start + seconds)
+
+    def step_stats(self, sessions, start, end):
+        """Latency percentiles, throughput and errors of one step."""
+        samples = [s for s in self.samples if s[0] == sessions]
+        stats = {'sessions': sessions, 'seconds': round(end - start, 1), 'stages': {}}
+        for name in self.flows + ("flow",):
+            rows = [s for s in samples if s[1] == name]
+            ok = [s[2] for s in rows if not s[3]]
+            errors = [s[3] for s in rows if s[3]]
+            stats['stages'][name] = {
+                'count': len(rows),
+                'errors': len(errors),
+                'first_error': errors[0] if errors else None,
+                'p50': percentile(ok, 50),
+                'p95': percentile(ok, 95),
+                'p99': percentile(ok, 99),
+                'per_s': sum(1 for s in rows if not s[3] and s[4] <= end) / (end - start),
+            }
+        flow = stats['stages']['flow']
+        stats['throughput'] = flow['per_s']
+        stats['error_rate'] = flow['errors'] / flow['count'] if flow['count'] else 0.0
+        return stats
+
+    def run(self, levels, seconds, min_gain=0.1, latency_factor=2.0, p95_slo=None, stop_at_saturation=True):
+        """
+        Ramp through `levels` concurrent sessions.
+
+        Returns:
+            dict: {'steps': [...], 'saturation': {...}, 'memory': [...]}
+        """
+        self.warm_up()
+        steps = []
+        with MemorySampler() as sampler:
+            for sessions in levels:
+                sampler.sessions = sessions
+                logger.info(f"📈 {sessions} concurrent session(s) for {seconds}s")
+                step = self.run_step(sessions, seconds)
+                memory = [m for m in sampler.samples if m['sessions'] == sessions]
+                step['rss_mb'] = max((m['rss_mb'] for m in memory), default=round(_rss_mb(), 1))
+                step['children_mb'] = max((m['children_mb'] for m in memory), default=0.0)
+                steps.append(step)
+                saturation = find_saturation(steps, min_gain, latency_factor, p95_slo)
+                logger.info(f"   {step['throughput']:.2f} flows/s, p95 {_fmt(step['stages']['flow']['p95'])}, "
+                            f"{step['stages']['flow']['errors']} failed, RSS {step['rss_mb']:.0f} MB")
+                if saturation['saturated_at'] is not None and stop_at_saturation:
+                    logger.info(f"🛑 Saturated at {sessions} sessions: {'; '.join(saturation['reasons'])}")
+                    break
+        return {'steps': steps, 'saturation': find_saturation(steps, min_gain, latency_factor, p95_slo),
+                'memory': sampler.samples}
+
+
+def find_saturation(steps, min_gain=0.1, latency_factor=2.0, p95_slo=None):
+    """
+    First step where the instance stops scaling.
+
+    A step is saturated when flow throughput grows by less than `min_gain`
+    over the previous step, its flow p95 exceeds `latency_factor` × the first
+    step's (or `p95_slo` seconds), or more than MAX_ERROR_RATE of flows fail.
+
+    Returns:
+        dict: saturated_at (sessions or None), capacity (sessions of the last
+        healthy step, 0 if none), reasons (list of str)
+    """
+    baseline = steps[0]['stages']['flow']['p95'] if steps else None
+    previous = None
+    for step in steps:
+        p95 = step['stages']['flow']['p95']
+        reasons = []
+        if step['error_rate'] > MAX_ERROR_RATE:
+            reasons.append(f"{step['error_rate']:.0%} of flows failed")
+        if p95 is not None and p95_slo is not None and p95 > p95_slo:
+            reasons.append(f"p95 {p95:.2f}s over the {p95_slo:.2f}s SLO")
+        if p95 is not None and baseline and p95 > max(latency_factor * baseline, baseline + MIN_LATENCY_GROWTH):
+            reasons.append(f"p95 {p95:.2f}s is {p95 / baseline:.1f}× the single-step {baseline:.2f}s")
+        if previous is not None and step['throughput'] < previous['throughput'] * (1 + min_gain):
+            reasons.append(f"throughput {previous['throughput']:.2f} → {step['throughput']:.2f} flows/s "
+                           f"for {step['sessions'] / previous['sessions']:.1f}× the sessions")
+        if reasons:
+            return {'saturated_at': step['sessions'],
+                    'capacity': previous['sessions'] if previous else 0, 'reasons': reasons}
+        previous = step
+    return {'saturated_at': None, 'capacity': previous['sessions'] if previous else 0, 'reasons': []}
+
+
+def _fmt(seconds):
+    return "-" if seconds is None else f"{seconds:.2f}s"
+
+
+def print_report(report, flows=FLOWS):
+    """Per-step table, per-stage percentiles and the capacity verdict."""
+    print("\n" + "="*70)
+    print("LOAD TEST")
+    print("="*70)
+    print(f"\n{'sessions':>8} {'flows/s':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'failed':>7} "
+          f"{'RSS MB':>7} {'workers MB':>10}")
+    for step in report['steps']:
+        flow = step['stages']['flow']
+        print(f"{step['sessions']:>8} {step['throughput']:>8.2f} {_fmt(flow['p50']):>7} {_fmt(flow['p95']):>7} "
+              f"{_fmt(flow['p99']):>7} {flow['errors']:>7} {step['rss_mb']:>7.0f} {step['children_mb']:>10.0f}")
+
+    for name in flows:
+        print(f"\n{name}:")
+        print(f"{'sessions':>8} {'count':>6} {'per s':>7} {'p50':>7} {'p95':>7} {'p99':>7}  errors")
+        for step in report['steps']:
+            stage = step['stages'][name]
+            errors = f"{stage['errors']} ({stage['first_error']})" if stage['errors'] else "0"
+            print(f"{step['sessions']:>8} {stage['count']:>6} {stage['per_s']:>7.2f} {_fmt(stage['p50']):>7} "
+                  f"{_fmt(stage['p95']):>7} {_fmt(stage['p99']):>7}  {errors[:60]}")
+
+    saturation = report['saturation']
+    print()
+    if saturation['saturated_at'] is None:
+        print(f"✅ No saturation up to {saturation['capacity']} sessions; extend the ramp to find the limit")
+    else:
+        print(f"🛑 Saturated at {saturation['saturated_at']} sessions: {'; '.join(saturation['reasons'])}")
+        print(f"📐 Capacity: ~{saturation['capacity']} concurrent sessions per instance")
+
+
+def main(argv=None):
+    """Run a load test from the command line."""
+    parser = argparse.ArgumentParser(description="Load-test the app's search, upload and summarize flows")
+    parser.add_argument("--sessions", default="1,2,4,8,16,32", help="Concurrent sessions per step")
+    parser.add_argument("--step-seconds", type=float, default=30.0, help="Duration of each step")
+    parser.add_argument("--flows", default=",".join(FLOWS), help="Stages each session runs, in order")
+    parser.add_argument("--summarizer", choices=("model", "extractive"), default="model",
+                        help="'extractive' measures the app without the model")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean think time between stages (s)")
+    parser.add_argument("--papers", type=int, default=3, help="Papers per summarize")
+    parser.add_argument("--uploads", type=int, default=2, help="Fixture PDFs per upload")
+    parser.add_argument("--pdf-url", action="store_true", help="Also extract a served PDF URL per upload")
+    parser.add_argument("--pdf-pages", type=int, default=8, help="Pages per generated fixture PDF")
+    parser.add_argument("--pdf-dir", help="Use the PDFs in this directory as fixtures")
+    parser.add_argument("--s2-papers", help="Recorded Semantic Scholar papers (JSON list or {'data': [...]})")
+    parser.add_argument("--arxiv-feed", help="Recorded arXiv API response (Atom XML)")
+    parser.add_argument("--api-delay", type=float, default=0.1, help="Latency of the arXiv / PDF stand-ins (s)")
+    parser.add_argument("--deadline-ms", type=float, help="Time budget per summary")
+    parser.add_argument("--no-local-index", action="store_true", help="Send every search to the stand-ins")
+    parser.add_argument("--min-gain", type=float, default=0.1, help="Throughput growth below this saturates")
+    parser.add_argument("--latency-factor", type=float, default=2.0, help="p95 growth above this saturates")
+    parser.add_argument("--p95-slo", type=float, help="Flow p95 above this (s) saturates")
+    parser.add_argument("--keep-going", action="store_true", help="Run all steps past saturation")
+    parser.add_argument("--json", help="Write the full report (steps, memory timeline) here")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's INFO logs")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logger.setLevel(logging.INFO)
+
+    papers = fixture_papers()
+    if args.s2_papers:
+        with open(args.s2_papers, encoding="utf-8") as f:
+            recorded = json.load(f)
+        papers = recorded.get('data', recorded) if isinstance(recorded, dict) else recorded
+    if args.arxiv_feed:
+        with open(args.arxiv_feed, "rb") as f:
+            feed = f.read()
+    else:
+        feed = fixture_arxiv_feed(papers[:50])
+    pdfs = load_pdf_dir(args.pdf_dir) if args.pdf_dir else fixture_pdfs(pages=args.pdf_pages)
+
+    with stand_ins(papers, feed, pdfs[0][1], args.api_delay, local_index=not args.no_local_index) as pdf_url:
+        test = LoadTest(pdfs, pdf_url=pdf_url if args.pdf_url else None,
+                        flows=[f.strip() for f in args.flows.split(",") if f.strip()],
+                        summarizer=args.summarizer, think=args.think, papers=args.papers,
+                        uploads=args.uploads, deadline_ms=args.deadline_ms)
+        report = test.run([int(n) for n in args.sessions.split(",")], args.step_seconds,
+                          args.min_gain, args.latency_factor, args.p95_slo,
+                          stop_at_saturation=not args.keep_going)
+    print_report(report, test.flows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({'config': vars(args), **report}, f, indent=2)
+        print(f"💾 Report written to {args.json}")
+
+
+def test_loadtest():
+    """
+    Short ramp without the model; saturation detection on synthetic steps.
+
+    Usage: python -c "from src.loadtest import test_loadtest; test_loadtest()"
+    """
+    import importlib.util
+
+    print("\n" + "="*70)
+    print("TEST: Load test harness")
+    print("="*70)
+
+    def step(sessions, throughput, p95, errors=0):
+        return {'sessions': sessions, 'throughput': throughput, 'error_rate': errors,
+                'stages': {'flow': {'p95': p95}}}
+
+    assert find_saturation([step(1, 1.0, 1.0), step(2, 1.9, 1.1), step(4, 3.5, 1.2)])['saturated_at'] is None
+    plateau = find_saturation([step(1, 1.0, 1.0), step(2, 1.9, 1.1), step(4, 2.0, 2.1)])
+    assert plateau['saturated_at'] == 4 and plateau['capacity'] == 2 and len(plateau['reasons']) == 2
+    assert find_saturation([step(1, 1.0, 1.0), step(2, 1.9, 1.1)], p95_slo=1.05)['capacity'] == 1
+    assert percentile([3, 1, 2, 4], 50) == 2 and percentile([3, 1, 2, 4], 99) == 4
+
+    pdf = fixture_pdf("The quick brown fox (and friends) jumps. " * 200)
+    assert pdf.startswith(b"%PDF-1.4") and pdf.rstrip().endswith(b"%%EOF") and b"\\(and friends\\)" in pdf
+
+    # Uploads need PyPDF2; without it, search + summarize still exercise the harness
+    flows = FLOWS if importlib.util.find_spec("PyPDF2") else ("search", "summarize")
+    papers = fixture_papers(40)
+    pdfs = fixture_pdfs(count=2, pages=2)
+    with stand_ins(papers, fixture_arxiv_feed(papers), pdfs[0][1]) as pdf_url:
+        test = LoadTest(pdfs, pdf_url=pdf_url, flows=flows, summarizer="extractive", think=0.05)
+        report = test.run([1, 2, 4], seconds=1.5, stop_at_saturation=False)
+    print_report(report, flows)
+
+    assert [s['sessions'] for s in report['steps']] == [1, 2, 4]
+    for s in report['steps']:
+        assert s['stages']['flow']['count'] > 0 and s['stages']['flow']['errors'] == 0, s['stages']
+        assert s['stages']['flow']['p50'] <= s['stages']['flow']['p99']
+    assert report['memory'] and report['memory'][-1]['rss_mb'] > 0
+    print(f"\n✅ {sum(s['stages']['flow']['count'] for s in report['steps'])} flows over "
+          f"{len(report['steps'])} steps ({', '.join(flows)}), {len(report['memory'])} memory samples")
+
+
+if __name__ == "__main__":
+    main()
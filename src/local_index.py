@@ -0,0 +1,348 @@
+"""
+🗂️ MODULE: LOCAL INDEX
+======================
+
+Embedded full-text index over every paper we have seen or extracted.
+
+KEY CONCEPTS:
+- SQLite FTS5 (ships with Python's sqlite3): inverted index with BM25 ranking
+- External-content table: paper rows live once in `papers`, triggers keep the
+  FTS index in sync on every insert/update (incremental indexing)
+- Weighted BM25: title matches count more than abstract, abstract more than body
+- One connection per thread, WAL mode: concurrent readers while a search or
+  an extraction writes new papers
+- Dump coverage: categories bulk-loaded from an arXiv metadata snapshot
+  (src.ingest_arxiv) are recorded with their newest date, so searches in
+  those categories can be served locally
+
+Configuration:
+- RPS_INDEX_PATH: database file (default: data/index.sqlite)
+- RPS_LOCAL_INDEX=0: disable the local source entirely
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_INDEX_PATH = os.path.join("data", "index.sqlite")
+LOCAL_SOURCE = "Local index"
+
+# BM25 column weights: title, authors, abstract, body
+_BM25_WEIGHTS = (10.0, 2.0, 5.0, 1.0)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    title TEXT,
+    authors TEXT,
+    abstract TEXT,
+    year TEXT,
+    pdf_url TEXT,
+    paper_url TEXT,
+    source TEXT,
+    categories TEXT,
+    body TEXT,
+    added REAL
+);
+CREATE TABLE IF NOT EXISTS dumps (
+    category TEXT PRIMARY KEY,
+    papers INTEGER,
+    newest TEXT,
+    ingested REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, authors, abstract, body,
+    content='papers', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts(rowid, title, authors, abstract, body)
+    VALUES (new.id, new.title, new.authors, new.abstract, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, authors, abstract, body)
+    VALUES ('delete', old.id, old.title, old.authors, old.abstract, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, authors, abstract, body)
+    VALUES ('delete', old.id, old.title, old.authors, old.abstract, old.body);
+    INSERT INTO papers_fts(rowid, title, authors, abstract, body)
+    VALUES (new.id, new.title, new.authors, new.abstract, new.body);
+END;
+"""
+
+_ARXIV_ID = re.compile(r'arxiv\.org/(?:abs|pdf)/([^\s?#]+?)(?:v\d+)?(?:\.pdf)?$', re.IGNORECASE)
+_QUERY_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def paper_key(paper=None, pdf_url=None):
+    """
+    Stable identity for a paper across sources.
+
+    arXiv abs/pdf links (any version) map to the arXiv id, other papers to
+    their PDF or landing-page URL, and as a last resort the lowercased title.
+    """
+    urls = [pdf_url] if pdf_url else [paper.get('pdf_url'), paper.get('paper_url')]
+    for url in urls:
+        if url:
+            match = _ARXIV_ID.search(url.replace("export.arxiv.org", "arxiv.org"))
+            if match:
+                return f"arxiv:{match.group(1)}"
+    for url in urls:
+        if url:
+            return url
+    return "title:" + ' '.join((paper.get('title') or '').lower().split())
+
+
+def _fts_query(query, any_term=False):
+    """Quote each word so user input can't break FTS5 syntax."""
+    terms = [f'"{t}"' for t in _QUERY_TERM.findall(query)]
+    return (" OR " if any_term else " ").join(terms)
+
+
+class LocalIndex:
+    """SQLite FTS5 index of papers (metadata + extracted full text)."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("RPS_INDEX_PATH", DEFAULT_INDEX_PATH)
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add_papers(self, papers):
+        """
+        Insert or refresh paper metadata (extracted bodies are kept).
+
+        Returns:
+            int: Number of papers written.
+        """
+        rows = []
+        now = time.time()
+        for paper in papers:
+            authors = paper.get('authors')
+            rows.append((
+                paper_key(paper),
+                paper.get('title'),
+                ', '.join(authors) if isinstance(authors, list) else authors,
+                paper.get('abstract'),
+                str(paper.get('year', '')),
+                paper.get('pdf_url'),
+                paper.get('paper_url'),
+                paper.get('source'),
+                paper.get('categories'),
+                now,
+            ))
+        with self._conn() as conn:
+            conn.executemany("""
+                INSERT INTO papers (key, title, authors, abstract, year, pdf_url, paper_url,
+                                    source, categories, added)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    title = excluded.title,
+                    authors = excluded.authors,
+                    abstract = COALESCE(excluded.abstract, papers.abstract),
+                    year = excluded.year,
+                    pdf_url = COALESCE(excluded.pdf_url, papers.pdf_url),
+                    paper_url = COALESCE(excluded.paper_url, papers.paper_url),
+                    categories = COALESCE(excluded.categories, papers.categories)
+            """, rows)
+        return len(rows)
+
+    def add_text(self, pdf_url, text, title=None):
+        """Store the extracted full text of a PDF (creates the row if unseen)."""
+        key = paper_key(pdf_url=pdf_url)
+        with self._conn() as conn:
+            conn.execute("""
+                INSERT INTO papers (key, title, pdf_url, source, body, added)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    body = excluded.body,
+                    title = COALESCE(papers.title, excluded.title)
+            """, (key, title or pdf_url.split('/')[-1], pdf_url, "PDF", text, time.time()))
+
+    def search(self, query, limit=10, offset=0, categories=None, any_term=False):
+        """
+        BM25-ranked full-text search.
+
+        All query words must match, or with `any_term` any one of them.
+        With `categories`, papers in one of them (or a sub-category: 'cs'
+        matches 'cs.LG') are returned, plus papers whose categories are
+        unknown (extracted PDFs, Semantic Scholar results).
+
+        Returns:
+            list: Paper dictionaries (same keys as search_papers, source 'Local index')
+        """
+        match = _fts_query(query, any_term)
+        if not match:
+            return []
+        category_sql, category_args = "", []
+        if categories:
+            clauses = ["p.categories IS NULL", "p.categories = ''"]
+            for category in categories:
+                clauses.append("(' ' || p.categories || ' ') LIKE ? OR (' ' || p.categories) LIKE ?")
+                category_args += [f"% {category} %", f"% {category}.%"]
+            category_sql = f"AND ({' OR '.join(clauses)})"
+        rows = self._conn().execute(f"""
+            SELECT p.title, p.authors, p.abstract, p.year, p.pdf_url, p.paper_url
+            FROM papers_fts JOIN papers p ON p.id = papers_fts.rowid
+            WHERE papers_fts MATCH ? {category_sql}
+            ORDER BY bm25(papers_fts, {', '.join(map(str, _BM25_WEIGHTS))})
+            LIMIT ? OFFSET ?
+        """, (match, *category_args, limit, offset)).fetchall()
+
+        return [{
+            'title': title,
+            'authors': authors.split(', ') if authors else [],
+            'abstract': abstract or 'No abstract available',
+            'year': int(year) if year and year.isdigit() else (year or 'N/A'),
+            'pdf_url': pdf_url,
+            'paper_url': paper_url,
+            'source': LOCAL_SOURCE,
+        } for title, authors, abstract, year, pdf_url, paper_url in rows]
+
+    def record_dump(self, coverage):
+        """
+        Remember which categories a bulk ingestion covered.
+
+        Args:
+            coverage (dict): category -> (papers ingested, newest date 'YYYY-MM-DD')
+        """
+        now = time.time()
+        with self._conn() as conn:
+            conn.executemany("""
+                INSERT INTO dumps (category, papers, newest, ingested) VALUES (?, ?, ?, ?)
+                ON CONFLICT(category) DO UPDATE SET
+                    papers = excluded.papers,
+                    newest = MAX(COALESCE(dumps.newest, ''), excluded.newest),
+                    ingested = excluded.ingested
+            """, [(category, papers, newest, now) for category, (papers, newest) in coverage.items()])
+
+    def dump_coverage(self, categories):
+        """
+        Date up to which a dump covers all `categories`.
+
+        Returns:
+            str: Oldest 'newest' date among the covering dumps, or None if any
+            category was never ingested (then remote sources must be searched).
+        """
+        dumps = dict(self._conn().execute("SELECT category, newest FROM dumps").fetchall())
+        if not dumps or not categories:
+            return None
+        dates = []
+        for category in categories:
+            covering = [newest for dumped, newest in dumps.items()
+                        if dumped == '*' or category == dumped or category.startswith(dumped + '.')]
+            if not covering:
+                return None
+            dates.append(max(covering))
+        return min(dates)
+
+    def count(self):
+        """Number of indexed papers."""
+        return self._conn().execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide LocalIndex, or None when RPS_LOCAL_INDEX=0 or it can't be opened."""
+    global _index
+    if os.environ.get("RPS_LOCAL_INDEX", "1") == "0":
+        return None
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = LocalIndex()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Local index unavailable: {e}")
+                return None
+        return _index
+
+
+def index_papers(papers):
+    """Add search results to the local index (errors are logged, never raised)."""
+    index = get_index()
+    if index is None or not papers:
+        return
+    try:
+        index.add_papers([p for p in papers if p.get('source') != LOCAL_SOURCE])
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Could not index papers: {e}")
+
+
+def index_text(pdf_url, text):
+    """Add an extracted PDF text to the local index (errors are logged, never raised)."""
+    index = get_index()
+    if index is None or not text:
+        return
+    try:
+        index.add_text(pdf_url, text)
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Could not index text for {pdf_url}: {e}")
+
+
+def test_local_index():
+    """
+    Index a few papers in a temporary database and query them.
+
+    Usage: python -m src.local_index
+    """
+    import tempfile
+
+    print("\n" + "="*70)
+    print("TEST: Local full-text index")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = LocalIndex(os.path.join(tmp, "index.sqlite"))
+        index.add_papers([
+            {'title': "Attention Is All You Need", 'authors': ["Vaswani"],
+             'abstract': "We propose the Transformer, based solely on attention mechanisms.",
+             'year': 2017, 'pdf_url': "http://arxiv.org/pdf/1706.03762v7", 'source': 'arXiv'},
+            {'title': "Deep Residual Learning", 'authors': ["He"],
+             'abstract': "Residual networks ease the training of very deep networks.",
+             'year': 2016, 'pdf_url': None, 'paper_url': "https://example.org/resnet",
+             'source': 'Semantic Scholar'},
+        ])
+        # Same paper under another URL form: extracted text lands on the same row
+        index.add_text("https://arxiv.org/pdf/1706.03762.pdf", "Scaled dot-product attention ...")
+
+        assert index.count() == 2
+        hits = index.search("transformer attention")
+        assert hits and hits[0]['title'] == "Attention Is All You Need"
+        assert index.search("dot-product")[0]['title'] == "Attention Is All You Need"
+        assert not index.search("residual nonsense")  # all words must match ...
+        assert index.search("residual nonsense", any_term=True)  # ... unless any_term
+        # Categories: arXiv rows are filtered, rows of unknown category are kept
+        index.add_papers([{'title': "Residual Flows for Vision", 'abstract': "Residual flows.",
+                           'pdf_url': "http://arxiv.org/pdf/2001.00001v1", 'source': 'arXiv',
+                           'categories': "cs.CV stat.ML"}])
+        titles = {hit['title'] for hit in index.search("residual", categories=["cs.LG"])}
+        assert titles == {"Deep Residual Learning"}
+        assert len(index.search("residual", categories=["cs"])) == 2
+
+    print("✅ Local index search works")
+
+
+if __name__ == "__main__":
+    test_local_index()
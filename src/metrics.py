@@ -0,0 +1,346 @@
+"""
+📈 MODULE: METRICS
+==================
+
+Lightweight in-process metrics for the retrieval, extraction and
+summarization stages.
+
+KEY CONCEPTS:
+- Histograms and counters keyed by metric name + label values
+- timed(): context manager that records how long a stage took
+- Prometheus text exposition format, served from a small HTTP endpoint
+- summary_rows(): flat view of every series for the Streamlit sidebar
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Bucket upper bounds (seconds) - from a single page extraction up to a full beam search
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Bucket upper bounds (bytes) - from an HTML error page up to a very large PDF
+BYTES_BUCKETS = (10_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000, 50_000_000)
+
+DEFAULT_METRICS_PORT = 9464
+DEFAULT_METRICS_HOST = "127.0.0.1"
+
+_registry = {}
+_registry_lock = threading.Lock()
+_server = None
+
+
+class Histogram:
+    """Cumulative histogram with one series per combination of label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Record one observation."""
+        key = _label_key(self.labelnames, labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # bucket counts (+Inf last), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def series(self):
+        """Return a snapshot: list of (label_values, bucket_counts, sum, count)."""
+        with self._lock:
+            return [(key, list(s[0]), s[1], s[2]) for key, s in self._series.items()]
+
+    def quantile(self, q, counts, total):
+        """Approximate a quantile from bucket counts (upper bound of the bucket)."""
+        if not total:
+            return 0.0
+        target = q * total
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+
+class Counter:
+    """Monotonic counter with one series per combination of label values."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Increase the counter."""
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def series(self):
+        """Return a snapshot: list of (label_values, value)."""
+        with self._lock:
+            return list(self._series.items())
+
+
+class Gauge(Counter):
+    """Value that can go up and down (queue depth, memory in use)."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        """Set the current value."""
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._series[key] = value
+
+    def dec(self, amount=1, **labels):
+        """Decrease the value."""
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        """Current value (0 if never set)."""
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            return self._series.get(key, 0)
+
+
+def _label_key(labelnames, labels):
+    """Turn keyword labels into a hashable tuple ordered like labelnames."""
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _register(cls, name, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        return metric
+
+
+def histogram(name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+    """Get or create a histogram in the global registry."""
+    return _register(Histogram, name, help_text, labelnames, buckets)
+
+
+def counter(name, help_text, labelnames=()):
+    """Get or create a counter in the global registry."""
+    return _register(Counter, name, help_text, labelnames)
+
+
+def gauge(name, help_text, labelnames=()):
+    """Get or create a gauge in the global registry."""
+    return _register(Gauge, name, help_text, labelnames)
+
+
+@contextmanager
+def timed(metric, **labels):
+    """
+    Time the enclosed block and record the duration (seconds) on a histogram.
+
+    Usage:
+        with timed(SEARCH_LATENCY, source="arXiv"):
+            ...
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.observe(time.perf_counter() - start, **labels)
+
+
+# ------------------------------------------------------------------------------
+# Stage metrics shared by paper_retrieval, pdf_extractor and summarizer
+# ------------------------------------------------------------------------------
+SEARCH_LATENCY = histogram(
+    "rps_search_latency_seconds", "Search latency per source", ("source",))
+SEARCH_RESULTS = counter(
+    "rps_search_results_total", "Papers returned per source", ("source",))
+SEARCH_ERRORS = counter(
+    "rps_search_errors_total", "Failed searches per source", ("source",))
+DOWNLOAD_SECONDS = histogram(
+    "rps_pdf_download_seconds", "PDF download time")
+DOWNLOAD_BYTES = histogram(
+    "rps_pdf_download_bytes", "PDF download size", buckets=BYTES_BUCKETS)
+PAGE_EXTRACT_SECONDS = histogram(
+    "rps_pdf_page_extract_seconds", "Text extraction time per PDF page")
+TOKENIZE_SECONDS = histogram(
+    "rps_tokenize_seconds", "Tokenization time per summarize call")
+GENERATE_SECONDS = histogram(
+    "rps_generate_seconds", "model.generate time per summarize call")
+QUEUE_DEPTH = gauge(
+    "rps_batch_queue_depth", "Summarize requests waiting to be batched")
+IN_FLIGHT = gauge(
+    "rps_summaries_in_flight", "Summarize requests running or waiting for a model/worker")
+CACHE_REQUESTS = counter(
+    "rps_cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result"))
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup as a hit or a miss."""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# ------------------------------------------------------------------------------
+# Exposition
+# ------------------------------------------------------------------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + inner + "}"
+
+
+def render_prometheus():
+    """Render every registered metric in the Prometheus text exposition format."""
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry.values())
+
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if metric.kind in ("counter", "gauge"):
+            for values, value in metric.series():
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, values)} {value}")
+            continue
+
+        for values, counts, total_sum, count in metric.series():
+            running = 0
+            for bound, bucket_count in zip(metric.buckets, counts):
+                running += bucket_count
+                labels = _format_labels(metric.labelnames, values, ("le", repr(float(bound))))
+                lines.append(f"{metric.name}_bucket{labels} {running}")
+            labels = _format_labels(metric.labelnames, values, ("le", "+Inf"))
+            lines.append(f"{metric.name}_bucket{labels} {count}")
+            labels = _format_labels(metric.labelnames, values)
+            lines.append(f"{metric.name}_sum{labels} {total_sum}")
+            lines.append(f"{metric.name}_count{labels} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def summary_rows():
+    """
+    Flatten all series into rows for display.
+
+    Returns:
+        list: dicts with 'metric', 'labels', 'count', 'mean', 'p95' (histograms)
+        or 'metric', 'labels', 'count' (counters and gauges; mean/p95 are None)
+    """
+    rows = []
+    with _registry_lock:
+        metrics = list(_registry.values())
+
+    for metric in metrics:
+        if metric.kind in ("counter", "gauge"):
+            for values, value in metric.series():
+                rows.append({
+                    'metric': metric.name,
+                    'labels': ", ".join(values),
+                    'count': value,
+                    'mean': None,
+                    'p95': None,
+                })
+            continue
+
+        for values, counts, total_sum, count in metric.series():
+            rows.append({
+                'metric': metric.name,
+                'labels': ", ".join(values),
+                'count': count,
+                'mean': round(total_sum / count, 4) if count else 0.0,
+                'p95': metric.quantile(0.95, counts, count),
+            })
+    return rows
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the app log
+        pass
+
+
+def start_metrics_server(port=None, host=None):
+    """
+    Serve /metrics in a background thread (idempotent).
+
+    The port comes from the argument, then RPS_METRICS_PORT, then 9464.
+    A port of 0 disables the endpoint. The host comes from the argument,
+    then RPS_METRICS_HOST, then 127.0.0.1 (set 0.0.0.0 to expose it).
+
+    Returns:
+        int: The port being served, or None if disabled / unavailable.
+    """
+    global _server
+    with _registry_lock:
+        if _server is not None:
+            return _server.server_address[1]
+
+        if port is None:
+            port = int(os.environ.get("RPS_METRICS_PORT", DEFAULT_METRICS_PORT))
+        if port == 0:
+            return None
+        if host is None:
+            host = os.environ.get("RPS_METRICS_HOST", DEFAULT_METRICS_HOST)
+
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            # Another process (e.g. a second Streamlit worker) owns the port
+            logger.warning(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+            return None
+
+        thread = threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True)
+        thread.start()
+        logger.info(f"📈 Metrics available at http://{host}:{port}/metrics")
+        return port
+
+
+if __name__ == "__main__":
+    with timed(SEARCH_LATENCY, source="demo"):
+        time.sleep(0.01)
+    record_cache("demo", hit=True)
+    print(render_prometheus())
@@ -0,0 +1,325 @@
+"""
+📦 MODULE: MODEL STORE
+======================
+
+Pre-baked local model snapshots and memory-mapped weight loading.
+
+KEY CONCEPTS:
+- prebake_model(): download once, save tokenizer + safetensors weights to a folder
+- load_snapshot(): load that folder fully offline (no HF hub lookups)
+- Memory-mapped weights: the model is built on the meta device (no weight
+  memory at all) and its parameters are then assigned tensors that point
+  straight into the mmapped .safetensors files, so every worker process on
+  the host shares the same page-cache pages and never holds a private copy,
+  not even while loading
+
+Usage:
+    python -m src.model_store --output models/pegasus-arxiv
+    python -m src.model_store --output models/pegasus-arxiv-bf16 --dtype bfloat16
+    python -m src.model_store --test
+"""
+import argparse
+import glob
+import itertools
+import json
+import logging
+import os
+import struct
+import time
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MODEL = "google/pegasus-arxiv"
+DEFAULT_SNAPSHOT_DIR = os.path.join("models", "pegasus-arxiv")
+MANIFEST_FILE = "snapshot.json"
+
+# safetensors header dtype -> torch dtype attribute
+_SAFETENSORS_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+
+def resolve_snapshot_dir(model_path=None):
+    """
+    Find a pre-baked snapshot to load.
+
+    Order: explicit argument, RPS_MODEL_DIR env var, models/pegasus-arxiv.
+
+    Returns:
+        str: Snapshot directory, or None if no snapshot exists.
+    """
+    candidates = [model_path, os.environ.get("RPS_MODEL_DIR"), DEFAULT_SNAPSHOT_DIR]
+    for path in candidates:
+        if path and os.path.isfile(os.path.join(path, MANIFEST_FILE)):
+            return path
+    if model_path:
+        raise FileNotFoundError(f"No model snapshot ({MANIFEST_FILE}) in {model_path}")
+    return None
+
+
+def prebake_model(model_name=DEFAULT_MODEL, output_dir=DEFAULT_SNAPSHOT_DIR,
+                  dtype="float32", quantize=None):
+    """
+    Save a model as a local, offline-loadable safetensors snapshot.
+
+    Args:
+        model_name (str): HF hub model id.
+        output_dir (str): Where to write the snapshot.
+        dtype (str): Stored weight dtype ("float32", "bfloat16", "float16").
+            Lower precision halves the snapshot size and the shared memory.
+        quantize (str): "int8" to apply dynamic int8 quantization of Linear
+            layers at load time. int8 weights are rebuilt in each process, so
+            they trade page sharing for faster CPU matmuls.
+
+    Returns:
+        str: The snapshot directory.
+    """
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+    import transformers
+
+    if quantize not in (None, "int8"):
+        raise ValueError(f"Unsupported quantization: {quantize}")
+
+    logger.info(f"📦 Pre-baking {model_name} → {output_dir} ({dtype})")
+    start = time.perf_counter()
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name, torch_dtype=getattr(torch, dtype))
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer.save_pretrained(output_dir)
+    # One large shard: fewer files to map, and header offsets stay aligned
+    model.save_pretrained(output_dir, safe_serialization=True, max_shard_size="20GB")
+
+    manifest = {
+        'model_name': model_name,
+        'dtype': dtype,
+        'quantize': quantize,
+        'transformers_version': transformers.__version__,
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"✅ Snapshot written in {time.perf_counter() - start:.1f}s")
+    return output_dir
+
+
+def mmap_safetensors(path):
+    """
+    Map a .safetensors file and return zero-copy tensors backed by it.
+
+    The file is mapped privately and read-only in practice (inference never
+    writes weights), so pages stay shared with other processes mapping it.
+
+    Returns:
+        dict: tensor name -> torch.Tensor
+    """
+    import torch
+
+    with open(path, "rb") as f:
+        header_len = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_len))
+    data_start = 8 + header_len
+
+    raw = torch.from_file(path, shared=False, size=os.path.getsize(path), dtype=torch.uint8)
+
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = getattr(torch, _SAFETENSORS_DTYPES[info["dtype"]])
+        begin, end = info["data_offsets"]
+        chunk = raw[data_start + begin:data_start + end]
+        itemsize = torch.empty((), dtype=dtype).element_size()
+        if (data_start + begin) % itemsize == 0:
+            tensors[name] = chunk.view(dtype).reshape(info["shape"])
+        else:
+            # Misaligned tensor cannot be viewed in place - fall back to a copy
+            tensors[name] = chunk.clone().view(dtype).reshape(info["shape"])
+    return tensors
+
+
+def _attach_mmap_weights(model, snapshot_dir):
+    """
+    Assign memory-mapped snapshot tensors to a model built on the meta device.
+
+    Raises:
+        ValueError: The snapshot lacks a tensor the model needs.
+
+    Returns:
+        int: Bytes of weights backed by the mapping.
+    """
+    mapped = {}
+    for shard in sorted(glob.glob(os.path.join(snapshot_dir, "*.safetensors"))):
+        mapped.update(mmap_safetensors(shard))
+
+    # assign=True keeps the mapped tensors themselves instead of copying into the model's
+    model.load_state_dict(mapped, strict=False, assign=True)
+    if hasattr(model, "tie_weights"):
+        model.tie_weights()  # lm_head shares the (mapped) input embeddings
+    missing = [name for name, tensor in itertools.chain(model.named_parameters(), model.named_buffers())
+               if tensor.is_meta]
+    if missing:
+        raise ValueError(f"Snapshot {snapshot_dir} lacks {len(missing)} tensor(s), e.g. {missing[0]}")
+
+    shared_bytes = sum(tensor.numel() * tensor.element_size() for tensor in mapped.values())
+    logger.info(f"🗺️ Memory-mapped {shared_bytes / 1e6:.0f} MB of weights from {snapshot_dir}")
+    return shared_bytes
+
+
+def _load_mapped(snapshot_dir, dtype):
+    """Build the model without weights (meta device), then attach the mapped ones."""
+    import torch
+    from transformers import AutoConfig, AutoModelForSeq2SeqLM, GenerationConfig
+
+    config = AutoConfig.from_pretrained(snapshot_dir, local_files_only=True)
+    with torch.device("meta"):
+        model = AutoModelForSeq2SeqLM.from_config(config, torch_dtype=dtype)
+    _attach_mmap_weights(model, snapshot_dir)
+    if os.path.isfile(os.path.join(snapshot_dir, "generation_config.json")):
+        # from_config() does not read it; from_pretrained() would
+        model.generation_config = GenerationConfig.from_pretrained(snapshot_dir, local_files_only=True)
+    return model
+
+
+def load_snapshot(snapshot_dir, mmap=True):
+    """
+    Load a pre-baked snapshot fully offline.
+
+    Args:
+        snapshot_dir (str): Directory written by prebake_model().
+        mmap (bool): Back parameters by the mmapped safetensors files.
+
+    Returns:
+        tuple: (model, tokenizer)
+    """
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    logger.info(f"📦 Loading snapshot {snapshot_dir} ({manifest['model_name']}, {manifest['dtype']})")
+    tokenizer = AutoTokenizer.from_pretrained(snapshot_dir, local_files_only=True)
+    dtype = getattr(torch, manifest['dtype'])
+
+    model = None
+    # int8 weights are rebuilt per process anyway: load them the ordinary way
+    if mmap and manifest.get('quantize') != "int8":
+        try:
+            model = _load_mapped(snapshot_dir, dtype)
+        except ValueError as e:
+            logger.warning(f"⚠️ {e}; loading a private copy instead")
+    if model is None:
+        model = AutoModelForSeq2SeqLM.from_pretrained(
+            snapshot_dir,
+            local_files_only=True,
+            use_safetensors=True,
+            low_cpu_mem_usage=True,
+            torch_dtype=dtype
+        )
+    model.eval()
+
+    if manifest.get('quantize') == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    return model, tokenizer
+
+
+def _write_safetensors(path, tensors):
+    """Minimal safetensors writer for the self-test (no safetensors package needed)."""
+    import torch
+
+    names = {dtype: name for name, dtype in _SAFETENSORS_DTYPES.items()}
+    header, blobs, offset = {}, [], 0
+    for name, tensor in tensors.items():
+        blob = tensor.contiguous().view(-1).view(torch.uint8).numpy().tobytes()
+        header[name] = {"dtype": names[str(tensor.dtype).split(".")[-1]], "shape": list(tensor.shape),
+                        "data_offsets": [offset, offset + len(blob)]}
+        blobs.append(blob)
+        offset += len(blob)
+    raw_header = json.dumps(header).encode("utf-8")
+    raw_header += b" " * (-len(raw_header) % 8)  # keep tensor data 8-byte aligned
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(raw_header)) + raw_header + b"".join(blobs))
+
+
+def _mapped_file(address):
+    """Path of the file mapped at a virtual address of this process (Linux), else None."""
+    with open("/proc/self/maps") as f:
+        for line in f:
+            fields = line.split()
+            start, end = (int(x, 16) for x in fields[0].split("-"))
+            if start <= address < end:
+                return fields[5] if len(fields) > 5 else None
+    return None
+
+
+def test_mmap_weights():
+    """
+    Weights attached to a meta-device model live in the snapshot file's mapping.
+
+    Usage: python -m src.model_store --test
+    """
+    import tempfile
+
+    import torch
+
+    print("\n" + "="*70)
+    print("TEST: Memory-mapped weights")
+    print("="*70)
+
+    def build():
+        return torch.nn.Sequential(torch.nn.Linear(64, 32), torch.nn.ReLU(), torch.nn.Linear(32, 8))
+
+    torch.manual_seed(0)
+    reference = build()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.safetensors")
+        _write_safetensors(path, reference.state_dict())
+
+        with torch.device("meta"):
+            model = build()
+        shared_bytes = _attach_mmap_weights(model, tmp)
+
+        x = torch.randn(4, 64)
+        with torch.no_grad():
+            assert torch.equal(model(x), reference(x))
+        # Every parameter points into the file's page-cache pages, not a private copy
+        for name, param in model.named_parameters():
+            assert _mapped_file(param.data_ptr()) == os.path.realpath(path), name
+
+        with torch.device("meta"):
+            incomplete = torch.nn.Sequential(build(), torch.nn.Linear(8, 2))
+        try:
+            _attach_mmap_weights(incomplete, tmp)
+            raise AssertionError("missing tensors not reported")
+        except ValueError:
+            pass
+    print(f"✅ {shared_bytes} bytes of weights served from the mapping, outputs unchanged")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-bake a local model snapshot")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="HF hub model id")
+    parser.add_argument("--output", default=DEFAULT_SNAPSHOT_DIR, help="Snapshot directory")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "bfloat16", "float16"])
+    parser.add_argument("--quantize", default=None, choices=["int8"])
+    parser.add_argument("--test", action="store_true", help="Run the memory-mapping self-test")
+    args = parser.parse_args()
+
+    if args.test:
+        test_mmap_weights()
+        return
+
+    prebake_model(args.model, args.output, dtype=args.dtype, quantize=args.quantize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+🔎 MODULE: OCR FALLBACK
+=======================
+
+Recovers text from scanned (image-only) PDF pages.
+
+KEY CONCEPTS:
+- Only pages with no extractable text but with embedded images are OCR'd;
+  text-native pages never pay for rasterization
+- Local binaries: pdftoppm (poppler) rasterizes one page, tesseract reads it;
+  missing binaries simply disable the stage
+- Process pool: pages are OCR'd in parallel, outside the extracting thread;
+  inside a batch-extraction worker (already one process per file) pages are
+  OCR'd in that process instead of starting a nested pool
+- Time budget per document: each page's subprocesses may only use the time
+  left in it, and pages still pending when it runs out are skipped
+- Page-hash cache: OCR text is stored under a hash of the page's content and
+  image streams, so the same page is never OCR'd twice
+
+Configuration:
+- RPS_OCR=0: disable OCR
+- RPS_OCR_WORKERS: pool size (default: half the CPUs)
+- RPS_OCR_BUDGET_S: seconds per document (default 60)
+- RPS_OCR_DPI / RPS_OCR_LANG: rasterization resolution (300) / tesseract language (eng)
+- RPS_OCR_CACHE_DIR: cache directory (default: data/ocr_cache)
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from src.metrics import counter, histogram
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CACHE_DIR = os.path.join("data", "ocr_cache")
+DEFAULT_BUDGET_SECONDS = 60.0
+
+OCR_PAGES = counter("rps_ocr_pages_total", "Pages sent through OCR", labelnames=("result",))
+OCR_PAGE_SECONDS = histogram("rps_ocr_page_seconds", "Rasterize + OCR time per page")
+
+
+def ocr_available():
+    """True if OCR is enabled and pdftoppm + tesseract are installed."""
+    if os.environ.get("RPS_OCR", "1") == "0":
+        return False
+    return bool(shutil.which("pdftoppm") and shutil.which("tesseract"))
+
+
+def page_has_images(page):
+    """True if a PyPDF2 page draws at least one image XObject."""
+    try:
+        xobjects = page["/Resources"].get("/XObject")
+        if xobjects is None:
+            return False
+        xobjects = xobjects.get_object()
+        return any(xobjects[name].get_object().get("/Subtype") == "/Image" for name in xobjects)
+    except (KeyError, AttributeError, TypeError):
+        return False
+
+
+def _stream_bytes(stream):
+    """Data of a PDF stream object (b'' if it can't be read)."""
+    try:
+        return stream.get_data() or b""
+    except Exception:  # unsupported filter or broken stream: hash what we can
+        return b""
+
+
+def page_hash(page):
+    """Hash of a page's content and image streams."""
+    digest = hashlib.sha256()
+    try:
+        contents = page.get_contents()
+        if contents is not None:
+            digest.update(_stream_bytes(contents))
+        xobjects = page["/Resources"].get("/XObject")
+        if xobjects is not None:
+            xobjects = xobjects.get_object()
+            for name in sorted(xobjects):
+                digest.update(_stream_bytes(xobjects[name].get_object()))
+    except (KeyError, AttributeError, TypeError):
+        pass
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """Directory of <page hash>.txt files."""
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get("RPS_OCR_CACHE_DIR", DEFAULT_CACHE_DIR)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, text):
+        tmp = self._path(key) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, self._path(key))  # atomic: readers never see half a file
+
+
+def _time_left(deadline):
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise TimeoutError("OCR budget exhausted")
+    return remaining
+
+
+def _ocr_page(pdf_path, page_number, dpi, lang, deadline):
+    """Rasterize one page (1-based) and OCR it, by the document's deadline (time.time())."""
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        image_root = os.path.join(tmp, "page")
+        subprocess.run(
+            ["pdftoppm", "-f", str(page_number), "-l", str(page_number), "-r", str(dpi),
+             "-gray", "-png", "-singlefile", pdf_path, image_root],
+            check=True, capture_output=True, timeout=_time_left(deadline)
+        )
+        result = subprocess.run(
+            ["tesseract", image_root + ".png", "stdout", "-l", lang],
+            check=True, capture_output=True, timeout=_time_left(deadline)
+        )
+    return result.stdout.decode("utf-8", errors="replace"), time.perf_counter() - start
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.environ.get("RPS_OCR_WORKERS", max((os.cpu_count() or 2) // 2, 1)))
+            _pool = ProcessPoolExecutor(max_workers=workers)
+        return _pool
+
+
+def ocr_pages(pdf_file, pages, budget_s=None, cache=None, in_process=None, ocr_page=_ocr_page):
+    """
+    OCR the given pages of one document within a time budget.
+
+    Args:
+        pdf_file: Path or binary file object of the PDF.
+        pages (dict): page index (0-based) -> PyPDF2 page object.
+        budget_s (float): Seconds for the whole document (default RPS_OCR_BUDGET_S).
+        cache (OCRCache): Page-hash cache (default: RPS_OCR_CACHE_DIR).
+        in_process (bool): OCR pages one by one in this process instead of the
+            pool; default: when this already is a worker process.
+        ocr_page: Picklable callable(pdf_path, page_number, dpi, lang, deadline)
+            -> (text, seconds); the tesseract stage unless testing.
+
+    Returns:
+        dict: page index -> OCR text, for the pages that finished in time.
+    """
+    if not pages or (ocr_page is _ocr_page and not ocr_available()):
+        return {}
+    budget_s = budget_s or float(os.environ.get("RPS_OCR_BUDGET_S", DEFAULT_BUDGET_SECONDS))
+    dpi = int(os.environ.get("RPS_OCR_DPI", 300))
+    lang = os.environ.get("RPS_OCR_LANG", "eng")
+    cache = cache or OCRCache()
+    if in_process is None:
+        in_process = multiprocessing.parent_process() is not None
+    # Wall clock, not monotonic: the deadline is checked in pool processes too
+    deadline = time.time() + budget_s
+
+    texts, keys = {}, {}
+    for index, page in pages.items():
+        keys[index] = page_hash(page)
+        cached = cache.get(keys[index])
+        if cached is not None:
+            texts[index] = cached
+            OCR_PAGES.inc(result="cached")
+    todo = [index for index in pages if index not in texts]
+    if not todo:
+        return texts
+
+    def record(index, run):
+        try:
+            text, seconds = run()
+        except TimeoutError:
+            return False
+        except Exception as e:
+            OCR_PAGES.inc(result="failed")
+            logger.warning(f"⚠️ OCR failed on page {index + 1}: {e}")
+            return True
+        OCR_PAGE_SECONDS.observe(seconds)
+        OCR_PAGES.inc(result="ocr")
+        texts[index] = text
+        cache.put(keys[index], text)
+        return True
+
+    # pdftoppm needs a real file
+    temp_path = None
+    if isinstance(pdf_file, (str, os.PathLike)):
+        pdf_path = os.fspath(pdf_file)
+    else:
+        pdf_file.seek(0)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            shutil.copyfileobj(pdf_file, tmp)
+            temp_path = pdf_path = tmp.name
+        pdf_file.seek(0)
+
+    skipped = 0
+    try:
+        logger.info(f"🔎 OCR for {len(todo)} image-only page(s), budget {budget_s:.0f}s")
+        if in_process:
+            for n, index in enumerate(todo):
+                if time.time() >= deadline or not record(
+                        index, lambda: ocr_page(pdf_path, index + 1, dpi, lang, deadline)):
+                    skipped = len(todo) - n
+                    break
+        else:
+            pool = _get_pool()
+            futures = {pool.submit(ocr_page, pdf_path, index + 1, dpi, lang, deadline): index
+                       for index in todo}
+            pending = set(futures)
+            while pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if not record(futures[future], future.result):
+                        skipped += 1
+            for future in pending:
+                future.cancel()  # queued pages are dropped; a running one stops at the deadline
+            skipped += len(pending)
+        if skipped:
+            OCR_PAGES.inc(skipped, result="timeout")
+            logger.warning(f"⏰ OCR budget exhausted, skipped {skipped} page(s)")
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+    return texts
+
+
+class _FakeStream:
+    def __init__(self, data):
+        self.data = data
+
+    def get_data(self):
+        return self.data
+
+    def get_object(self):
+        return self
+
+
+class _FakePage(dict):
+    """Just enough of a PyPDF2 page for page_hash()."""
+
+    def __init__(self, content):
+        super().__init__({"/Resources": {"/XObject": _FakeStream({"/Im0": _FakeStream(b"img")})}})
+        self.content = _FakeStream(content)
+
+    def get_contents(self):
+        return self.content
+
+
+def _fake_ocr_page(pdf_path, page_number, dpi, lang, deadline):
+    """Test stand-in for _ocr_page: page n takes n * 0.2s."""
+    start = time.perf_counter()
+    seconds = page_number * 0.2
+    if seconds > _time_left(deadline):
+        time.sleep(_time_left(deadline))
+        raise TimeoutError("OCR budget exhausted")
+    time.sleep(seconds)
+    return f"text of page {page_number}", time.perf_counter() - start
+
+
+def test_ocr():
+    """
+    Budget, cache and page hashing of the OCR stage, with a stand-in for tesseract.
+
+    Usage: python -m src.ocr
+    """
+    from io import BytesIO
+
+    print("\n" + "="*70)
+    print("TEST: OCR fallback")
+    print("="*70)
+
+    assert page_hash(_FakePage(b"BT (a) Tj ET")) == page_hash(_FakePage(b"BT (a) Tj ET"))
+    assert page_hash(_FakePage(b"BT (a) Tj ET")) != page_hash(_FakePage(b"BT (b) Tj ET"))
+
+    pages = {i: _FakePage(f"page {i}".encode()) for i in range(4)}
+    for in_process in (True, False):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = OCRCache(tmp)
+            start = time.perf_counter()
+            texts = ocr_pages(BytesIO(b"%PDF-1.4"), pages, budget_s=0.7, cache=cache,
+                              in_process=in_process, ocr_page=_fake_ocr_page)
+            seconds = time.perf_counter() - start
+            # One page never gets the whole budget: slow pages stop at the deadline
+            assert seconds < 1.5, seconds
+            assert texts.get(0) == "text of page 1" and 3 not in texts
+            again = ocr_pages(BytesIO(b"%PDF-1.4"), {0: pages[0]}, budget_s=0.01, cache=cache,
+                              in_process=in_process, ocr_page=_fake_ocr_page)
+            assert again == {0: "text of page 1"}  # served from the page-hash cache
+            print(f"✅ {'in-process' if in_process else 'pool'}: {len(texts)}/4 pages within "
+                  f"the 0.7s budget ({seconds:.2f}s), cached page reused")
+
+
+if __name__ == "__main__":
+    test_ocr()
@@ -6,11 +6,15 @@ arXiv , semantic scholar, Combined
 
 Concepts: API interaction , HTTP requests , JSON parsing (Data format API return), Error handling
 """
-import arxiv
-from semanticscholar import SemanticScholar
 import logging
 import os
-import requests
+import queue
+import threading
+
+from src.http_client import get_http_client
+from src.local_index import LOCAL_SOURCE, get_index, index_papers, paper_key
+from src.metrics import SEARCH_LATENCY, SEARCH_RESULTS, SEARCH_ERRORS, timed
+from src.semantic_scholar import get_client
 
 
 #setup for logging and debugging
@@ -21,8 +25,19 @@ logger = logging.getLogger(__name__)
 class PaperRetriever:
     """Wrapper class for paper retrieval functionality."""
     
-    def __init__(self):
-        """Initialize paper retriever."""
+    def __init__(self, categories=None):
+        """
+        Initialize paper retriever.
+        
+        Args:
+            categories (list): arXiv categories to search (e.g. ['cs.CL', 'cs.LG']);
+                default: RPS_ARXIV_CATEGORIES (comma separated), else all.
+                Categories ingested from a dump (src.ingest_arxiv) are served
+                locally, with arXiv only asked for newer papers.
+        """
+        if categories is None:
+            categories = [c.strip() for c in os.environ.get("RPS_ARXIV_CATEGORIES", "").split(",") if c.strip()]
+        self.categories = categories or None
         logger.info("✅ Paper retriever initialized")
     
     def search(self, query, max_results=5):
@@ -36,20 +51,65 @@ class PaperRetriever:
         Returns:
             list: List of paper dictionaries
         """
-        return search_papers(query, max_results)
+        return search_papers(query, max_results, categories=self.categories)
+    
+    def iter_search(self, query, page_size=10, cursor=None):
+        """
+        Stream one page of results per source (see iter_search_papers).
+        
+        Args:
+            query (str): Search query
+            page_size (int): Papers per source per page
+            cursor (SearchCursor): From the previous page, or None for a new search
+        
+        Yields:
+            dict: Paper dictionaries as they arrive
+        """
+        return iter_search_papers(query, page_size, cursor, categories=self.categories)
+    
+    def lookup(self, paper_ids):
+        """
+        Fetch paper details for many Semantic Scholar ids (batched, 500 per call).
+        
+        Args:
+            paper_ids (list): S2 paper ids or prefixed ids (DOI:..., ARXIV:...)
+        
+        Returns:
+            list: Paper dictionaries (None for unknown ids)
+        """
+        return get_client().get_papers(paper_ids)
+
+
+def _dump_coverage(categories):
+    """Date up to which the local index holds all of `categories` (None: not covered)."""
+    index = get_index()
+    if index is None or not categories:
+        return None
+    try:
+        return index.dump_coverage(categories)
+    except Exception as e:
+        logger.error(f"❌ Error reading local index coverage: {e}")
+        return None
 
 
-def search_papers(query, max_results=5):
+def search_papers(query, max_results=5, categories=None):
     """
     Search for research papers using Semantic Scholar API and arXiv API.
     
-    First : searches the arXiv (reliable and free)
+    First : searches the local index (papers seen before, no network);
+            if enough of them match every query word, that is the answer
+    Then : searches the arXiv (reliable and free)
     Then : searches Semantic Scholar for additional papers.
-    returns combined of all as results
+    Last : local papers matching any query word fill the remaining slots.
+    returns combined of all as results; new papers are added to the local index
+    
+    When `categories` were bulk-ingested from an arXiv dump, arXiv is only
+    asked for papers submitted after the dump and Semantic Scholar is skipped.
     
     Args:
         query (str): The search query. (keywords, topics, authors, etc.)
         max_results = default:5 (could be fewer if not found more)
+        categories (list): Restrict to these arXiv categories (None: all)
         
     Returns:
         list: A list of dictionaries containing paper details.list of dict
@@ -61,71 +121,286 @@ def search_papers(query, max_results=5):
             'year': int,            # Publication year
             'pdf_url': str,         # Direct link to PDF
             'paper_url': str,       # Link to paper page
-            'source': str           # 'arXiv' or 'Semantic Scholar'
+            'source': str           # 'Local index', 'arXiv' or 'Semantic Scholar'
         }        
     """
-    papers = []
-    #search arXiv first
+    since = _dump_coverage(categories)
+    papers = _search_local_page(query, max_results, categories=categories)
+    if len(papers) >= max_results:
+        #answered from the local index (all words matched), no network I/O
+        logger.info(f"Total papers retrieved: {len(papers)} (local index)")
+        return papers
+    seen = {paper_key(paper) for paper in papers}
+    
+    def add(paper):
+        key = paper_key(paper)
+        if key in seen:
+            return False
+        seen.add(key)
+        papers.append(paper)
+        return True
+    
+    #search arXiv next
     try:
         logger.info(f"Searching arXiv for: '{query}'")
-        #create search object : query, max_results,sort by relevance
-        search = arxiv.Search(query=query, max_results=max_results, sort_by=arxiv.SortCriterion.Relevance)
-        
-        #iterate through results
-        for result in search.results():
-            paper = {
-                'title': result.title,
-                'authors': [author.name for author in result.authors],
-                'abstract': result.summary,
-                'year': result.published.year,
-                'pdf_url': result.pdf_url,
-                'paper_url': result.entry_id,
-                'source': 'arXiv' #track src for debugging
-            }
-            papers.append(paper)
-            logger.info(f"✅ Found: {paper['title'][:60]}...")
+        with timed(SEARCH_LATENCY, source='arXiv'):
+            found = get_http_client().call(
+                "export.arxiv.org", _search_arxiv_page, query, max_results, categories=categories, since=since
+            )
+        index_papers(found)
+        for paper in found:
+            if len(papers) < max_results and add(paper):
+                SEARCH_RESULTS.inc(source='arXiv')
+                logger.info(f"✅ Found: {paper['title'][:60]}...")
     except Exception as e:
         #log any errors during arXiv search
         #try semantic scholar next
+        SEARCH_ERRORS.inc(source='arXiv')
         logger.error(f"❌ Error searching arXiv: {e}")
         #do not return yet, try semantic scholar next
         
-    if len(papers) < max_results:
+    if len(papers) < max_results and since is None:
         try:
             logger.info(f"Searching Semantic Scholar for additional papers: ")
             
-            #initialize semantic scholar client
-            #no api key needed for basic usage
-            sch = SemanticScholar()
+            #shared semantic scholar client: one rate limit for all sessions
+            #no api key needed for basic usage (S2_API_KEY raises the rate limit)
+            sch = get_client()
             
             #cal how many more papers needed
             remaining = max_results - len(papers)
             
-            #search semantic scholar
-            search_results = sch.search_paper(query, limit=remaining)
+            #search semantic scholar: one request, only the fields we map
+            with timed(SEARCH_LATENCY, source='Semantic Scholar'):
+                search_results, _ = sch.search(query, limit=remaining)
+            index_papers(search_results)
             
-            #iterate through results
-            for result in search_results:
-                paper = {
-                    'title': result.title,
-                    'authors': [author['name'] for author in result.authors] if result.authors else [],
-                    'abstract': result.abstract if result.abstract else 'No abstract available',
-                    'year': result.year if result.year else 'N/A',
-                    'pdf_url': result.openAccessPdf['url'] if result.openAccessPdf else None,
-                    'paper_url': result.url if result.url else None,
-                    'source': 'Semantic Scholar'
-                }
-                papers.append(paper)
-                logger.info(f"✅ Found: {paper['title'][:60]}...")
+            for paper in search_results:
+                if add(paper):
+                    SEARCH_RESULTS.inc(source='Semantic Scholar')
+                    logger.info(f"✅ Found: {paper['title'][:60]}...")
         except Exception as e:
+            SEARCH_ERRORS.inc(source='Semantic Scholar')
             logger.error(f"❌ Error searching Semantic Scholar: {e}")
             #not to crash, just return what we have
     
+    #weaker local matches (any query word) only fill what the sources left
+    if len(papers) < max_results:
+        for paper in _search_local_page(query, max_results, categories=categories, any_term=True):
+            if len(papers) >= max_results:
+                break
+            add(paper)
+    
     final_papers = papers[:max_results]  #ensure we do not exceed max_results
     logger.info(f"Total papers retrieved: {len(final_papers)}")
     return final_papers
 
 
+def _search_local_page(query, limit, offset=0, categories=None, any_term=False):
+    """
+    Fetch one page from the local full-text index (empty if it is disabled).
+    
+    All query words must match unless `any_term`.
+    
+    Returns:
+        list: Paper dictionaries with source 'Local index'
+    """
+    index = get_index()
+    if index is None:
+        return []
+    try:
+        with timed(SEARCH_LATENCY, source=LOCAL_SOURCE):
+            papers = index.search(query, limit=limit, offset=offset, categories=categories,
+                                  any_term=any_term)
+        SEARCH_RESULTS.inc(len(papers), source=LOCAL_SOURCE)
+        return papers
+    except Exception as e:
+        SEARCH_ERRORS.inc(source=LOCAL_SOURCE)
+        logger.error(f"❌ Error searching local index: {e}")
+        return []
+
+
+def _arxiv_query(query, categories=None, since=None):
+    """Add category and submitted-after filters to an arXiv API query."""
+    parts = [f"({query})"]
+    if categories:
+        cats = [f"cat:{c}" if '.' in c else f"cat:{c}.*" for c in categories]
+        parts.append(f"({' OR '.join(cats)})")
+    if since:
+        parts.append(f"submittedDate:[{since.replace('-', '')}0000 TO 299912312359]")
+    return ' AND '.join(parts) if len(parts) > 1 else query
+
+
+# One arxiv.Client per process: its delay between requests (arXiv asks for 3s)
+# only holds if every search goes through the same client, one at a time
+_arxiv_client = None
+_arxiv_client_key = None
+_arxiv_lock = threading.Lock()
+
+
+def _get_arxiv_client():
+    """Shared arxiv.Client (call with _arxiv_lock held); rebuilt when its settings change."""
+    global _arxiv_client, _arxiv_client_key
+    import arxiv
+    
+    # ARXIV_API_URL points the client at a stand-in serving recorded feeds (load tests)
+    api_url = os.environ.get("ARXIV_API_URL")
+    delay = float(os.environ.get("RPS_ARXIV_DELAY_S", 3.0))
+    if _arxiv_client is None or _arxiv_client_key != (api_url, delay):
+        # No retries of its own: HttpClient.call retries under the host's breaker
+        _arxiv_client = arxiv.Client(delay_seconds=delay, num_retries=0)
+        if api_url:
+            _arxiv_client.query_url_format = api_url.rstrip("/") + "/api/query?{}"
+        _arxiv_client_key = (api_url, delay)
+    return _arxiv_client
+
+
+def _search_arxiv_page(query, limit, offset=0, categories=None, since=None):
+    """
+    Fetch one page of arXiv results.
+    
+    Args:
+        categories (list): Restrict to these categories.
+        since (str): 'YYYY-MM-DD'; only papers submitted on/after it (freshness
+            query on top of an ingested dump).
+    
+    Returns:
+        list: Paper dictionaries (fewer than `limit` means no more results)
+    """
+    # Imported here, not at module top: arxiv is slow to import and app.py
+    # loads this module on every cold start, even before any search
+    import arxiv
+    
+    #create search object : query, max_results (offset + page), sort by relevance
+    search = arxiv.Search(query=_arxiv_query(query, categories, since),
+                          max_results=offset + limit, sort_by=arxiv.SortCriterion.Relevance)
+    
+    with _arxiv_lock:
+        client = _get_arxiv_client()
+        client.page_size = limit  #one request for this page, no over-fetch
+        #results are fetched lazily, starting at `offset`; drained under the lock
+        results = list(client.results(search, offset=offset))
+    
+    papers = []
+    for result in results:
+        papers.append({
+            'title': result.title,
+            'authors': [author.name for author in result.authors],
+            'abstract': result.summary,
+            'year': result.published.year,
+            'pdf_url': result.pdf_url,
+            'paper_url': result.entry_id,
+            'categories': ' '.join(result.categories),  #lets category searches use the local index
+            'source': 'arXiv' #track src for debugging
+        })
+    return papers
+
+
+class SearchCursor:
+    """Where each source stopped; pass it back to iter_search_papers to load more."""
+    
+    def __init__(self, query, categories=None):
+        self.query = query
+        self.categories = categories
+        # Categories covered by an ingested dump: remote search is freshness-only
+        self.since = _dump_coverage(categories)
+        self.offsets = {LOCAL_SOURCE: 0, 'arXiv': 0, 'Semantic Scholar': 0}
+        self.done = {LOCAL_SOURCE: get_index() is None, 'arXiv': False,
+                     'Semantic Scholar': self.since is not None}
+        self.seen = set()  # paper keys already yielded (sources overlap)
+    
+    @property
+    def exhausted(self):
+        """True when no source has more results."""
+        return all(self.done.values())
+
+
+def iter_search_papers(query, page_size=10, cursor=None, categories=None):
+    """
+    Search the local index, then arXiv and Semantic Scholar concurrently,
+    yielding papers as they arrive.
+    
+    The local index is paged first: while it fills whole pages no network
+    request is made. After that, each call fetches one page (up to page_size
+    papers) from every remote source that still has results. The first remote
+    papers are yielded after a single round-trip to the fastest source; the
+    cursor is updated in place so the next call continues where this one
+    stopped ("load more"). Papers already yielded are skipped, and remote
+    results are added to the local index. For categories covered by an
+    ingested dump only arXiv is queried, for papers newer than the dump.
+    
+    Args:
+        query (str): The search query.
+        page_size (int): Papers per source per call.
+        cursor (SearchCursor): Continuation state (None starts a new search).
+        categories (list): Restrict to these arXiv categories (new searches only).
+    
+    Yields:
+        dict: Paper dictionaries (same keys as search_papers)
+    """
+    cursor = cursor or SearchCursor(query, categories)
+    
+    def unseen(paper):
+        key = paper_key(paper)
+        if key in cursor.seen:
+            return False
+        cursor.seen.add(key)
+        return True
+    
+    if not cursor.done[LOCAL_SOURCE]:
+        papers = _search_local_page(query, page_size, cursor.offsets[LOCAL_SOURCE], cursor.categories)
+        cursor.offsets[LOCAL_SOURCE] += len(papers)
+        cursor.done[LOCAL_SOURCE] = len(papers) < page_size
+        for paper in papers:
+            if unseen(paper):
+                yield paper
+        if not cursor.done[LOCAL_SOURCE]:
+            return  # a full local page: remote sources wait for "load more"
+    
+    arrivals = queue.Queue()
+    
+    def fetch(source, fetch_page):
+        try:
+            with timed(SEARCH_LATENCY, source=source):
+                papers, exhausted = fetch_page(cursor.offsets[source])
+            cursor.offsets[source] += len(papers)
+            cursor.done[source] = exhausted
+            SEARCH_RESULTS.inc(len(papers), source=source)
+            index_papers(papers)
+            for paper in papers:
+                arrivals.put(paper)
+        except Exception as e:
+            SEARCH_ERRORS.inc(source=source)
+            logger.error(f"❌ Error searching {source}: {e}")
+            cursor.done[source] = True
+        finally:
+            arrivals.put(None)  # this source is finished for this page
+    
+    def arxiv_page(offset):
+        papers = get_http_client().call(
+            "export.arxiv.org", _search_arxiv_page, query, page_size, offset, cursor.categories, cursor.since
+        )
+        return papers, len(papers) < page_size
+    
+    def s2_page(offset):
+        papers, next_offset = get_client().search(query, limit=page_size, offset=offset)
+        return papers, next_offset is None
+    
+    sources = [(name, page) for name, page in (('arXiv', arxiv_page), ('Semantic Scholar', s2_page))
+               if not cursor.done[name]]
+    for name, page in sources:
+        threading.Thread(target=fetch, args=(name, page), name=f"search-{name}", daemon=True).start()
+    
+    pending = len(sources)
+    while pending:
+        paper = arrivals.get()
+        if paper is None:
+            pending -= 1
+            continue
+        if unseen(paper):
+            yield paper
+
+
 #test function
 def test_search():
     """
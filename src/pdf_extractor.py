@@ -6,74 +6,104 @@ Extracts text from PDF files fetched from URLs.
 
 KEY CONCEPTS:
 - HTTP requests to fetch the PDF from the URL
+- Streaming download: Content-Type and the %PDF magic bytes are checked on the
+  first chunk, a size limit is enforced while streaming, and large files spool
+  to a temporary file instead of memory
+- OCR fallback (src.ocr) for scanned pages that have no text layer
+- Boilerplate (src.boilerplate) and normalization (src.utils) in one pass
 - PyPDF2: for extracting text from the PDF
 - Error Handling: for handling errors during PDF fetching and text extraction
 """
 
-import requests
-import PyPDF2
-from io import BytesIO
 import logging
+import os
+import tempfile
+
+from src.boilerplate import detect_boilerplate
+from src.http_client import CircuitOpenError, DownloadRejected, arxiv_mirrors, get_http_client
+from src.local_index import index_text
+from src.metrics import DOWNLOAD_BYTES, DOWNLOAD_SECONDS, PAGE_EXTRACT_SECONDS, counter, timed
+from src.ocr import ocr_pages, page_has_images
+from src.profiling import profile_request, stage
+from src.utils import normalize_text
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def extract_text_from_pdf_url(pdf_url, timeout=30):
+# Downloads larger than this are aborted (RPS_MAX_PDF_BYTES overrides)
+MAX_PDF_BYTES = int(os.environ.get("RPS_MAX_PDF_BYTES", 50 * 1024 * 1024))
+# PDFs up to this size stay in memory; bigger ones spool to a temp file
+SPOOL_THRESHOLD_BYTES = 8 * 1024 * 1024
+# The PDF header may follow a little junk; readers look in the first 1 KB
+PDF_MAGIC = b"%PDF-"
+PDF_MAGIC_WINDOW = 1024
+
+DOWNLOAD_REJECTED = counter(
+    "rps_download_rejected_total", "PDF downloads aborted before extraction", labelnames=("reason",))
+
+
+def _check_pdf_response(response, first_chunk):
+    """Reject HTML/JSON error pages and anything not starting like a PDF."""
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type.startswith("text/") or any(t in content_type for t in ("html", "json", "xml")):
+        raise DownloadRejected(f"not a PDF (Content-Type: {content_type})", "content_type")
+    if PDF_MAGIC not in first_chunk[:PDF_MAGIC_WINDOW]:
+        raise DownloadRejected("not a PDF (no %PDF header)", "magic")
+
+
+def extract_text_from_pdf_url(pdf_url, timeout=30, progress=None):
     """
     Fetches a PDF from the given URL and extracts its text content.
     
     Args:
         pdf_url (str): The URL of the PDF to fetch.
         timeout (int): Timeout for the HTTP request in seconds (how long to wait for download).
+        progress: Optional callable(pages_done, total_pages), see extract_text_from_pdf_file.
         
     Returns:
         str: Extracted text from the PDF.
         or None if extraction fails.
     """
+    # Profiled only when RPS_PROFILE / the sidebar toggle is on
+    with profile_request("extract", url=pdf_url):
+        text = _extract_text_from_pdf_url(pdf_url, timeout, progress)
+    # Full text becomes searchable locally (see src.local_index)
+    index_text(pdf_url, text)
+    return text
+
+
+def _extract_text_from_pdf_url(pdf_url, timeout, progress=None):
+    """Download and extract one PDF (see extract_text_from_pdf_url)."""
+    # Heavy imports deferred until a PDF is actually processed (fast app cold start)
+    import requests
+    
+    pdf_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_THRESHOLD_BYTES)
     try:
         logger.info(f"📥 Fetching PDF from URL: {pdf_url}")
-        response = requests.get(pdf_url, timeout=timeout)
-        response.raise_for_status()  # Raise an error for bad responses
+        with timed(DOWNLOAD_SECONDS), stage("download"):
+            # Pooled connection, retries, arXiv mirror hedging, range-resume,
+            # abort early on non-PDF content or oversized files
+            get_http_client().download(
+                pdf_url, mirrors=arxiv_mirrors(pdf_url), into=pdf_file, timeout=timeout,
+                max_bytes=MAX_PDF_BYTES, validate=_check_pdf_response
+            )
+        pdf_file.seek(0, os.SEEK_END)
+        DOWNLOAD_BYTES.observe(pdf_file.tell())
+        pdf_file.seek(0)
         
         logger.info(f"✅ PDF downloaded successfully")
         
-        pdf_file = BytesIO(response.content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        
-        # Extract text from all pages
-        text = ""
-        total_pages = len(pdf_reader.pages)
-        logger.info(f"📖 Extracting text from {total_pages} pages...")
-        
-        # FIX: Iterate over pdf_reader.pages, not total_pages (which is an int)
-        for i, page in enumerate(pdf_reader.pages):
-            try:
-                page_text = page.extract_text()
-                
-                if page_text:
-                    text += page_text + "\n"
-                
-                # Log progress every 10 pages
-                if (i + 1) % 10 == 0:
-                    logger.info(f"  ... extracted page {i+1}/{total_pages}")
-            
-            except Exception as page_error:
-                logger.warning(f"⚠️ Could not extract page {i + 1}: {page_error}")
-                continue
-        
-        # FIX: Clean text AFTER loop, not inside
-        text = text.replace('\n', ' ').strip()
-        text = ' '.join(text.split())  # Remove extra whitespace
-        
-        if not text:
-            logger.warning(f"⚠️ No text extracted from PDF: {pdf_url}")
-            return None
-        
-        logger.info(f"✅ Successfully extracted {len(text)} characters from {total_pages} pages")
-        return text
+        return extract_text_from_pdf_file(pdf_file, source=pdf_url, progress=progress)
     
+    except DownloadRejected as e:
+        DOWNLOAD_REJECTED.inc(reason=e.reason)
+        logger.error(f"🚫 PDF download aborted: {e}")
+        return None
+    except CircuitOpenError as e:
+        logger.error(f"🚧 Skipping PDF download: {e}")
+        return None
     except requests.exceptions.Timeout:
         logger.error("⏰ PDF download timed out.")
         return None
@@ -83,6 +113,75 @@ def extract_text_from_pdf_url(pdf_url, timeout=30):
     except Exception as e:
         logger.error(f"❌ Error extracting text from PDF: {e}")
         return None
+    finally:
+        pdf_file.close()
+
+
+def extract_text_from_pdf_file(pdf_file, source="PDF", progress=None):
+    """
+    Extracts the text of an already available PDF (upload, download, disk).
+    
+    Pages without extractable text that contain images (scans) are sent to
+    the OCR stage (src.ocr) when it is available.
+    
+    Args:
+        pdf_file: Path or binary file object.
+        source (str): Name used in log messages.
+        progress: Optional callable(pages_done, total_pages), called after each page.
+        
+    Returns:
+        str: Extracted text, or None if nothing could be extracted.
+    """
+    import PyPDF2
+    
+    pdf_reader = PyPDF2.PdfReader(pdf_file)
+    
+    # Extract text from all pages
+    page_texts = []
+    total_pages = len(pdf_reader.pages)
+    logger.info(f"📖 Extracting text from {total_pages} pages...")
+    
+    # FIX: Iterate over pdf_reader.pages, not total_pages (which is an int)
+    for i, page in enumerate(pdf_reader.pages):
+        page_text = ""
+        try:
+            with timed(PAGE_EXTRACT_SECONDS), stage("extract_page", page=i + 1):
+                page_text = page.extract_text() or ""
+            
+            # Log progress every 10 pages
+            if (i + 1) % 10 == 0:
+                logger.info(f"  ... extracted page {i+1}/{total_pages}")
+        
+        except Exception as page_error:
+            logger.warning(f"⚠️ Could not extract page {i + 1}: {page_error}")
+        page_texts.append(page_text)
+        if progress is not None:
+            progress(i + 1, total_pages)
+    
+    # Scanned pages: no text layer but images -> OCR only those
+    scanned = {i: pdf_reader.pages[i] for i, t in enumerate(page_texts)
+               if not t.strip() and page_has_images(pdf_reader.pages[i])}
+    if scanned:
+        with stage("ocr", pages=len(scanned)):
+            for i, ocr_text in ocr_pages(pdf_file, scanned).items():
+                page_texts[i] = ocr_text
+    
+    # Running heads, footers and stamps repeated across pages waste model input
+    boilerplate = detect_boilerplate(page_texts)
+    
+    # One streaming pass: Unicode, de-hyphenation, page numbers, boilerplate, whitespace
+    text = normalize_text(page_texts, drop_line=boilerplate.matches)
+    boilerplate.record()
+    if boilerplate.stats['lines_removed']:
+        logger.info(f"🧾 Removed {boilerplate.stats['lines_removed']} boilerplate lines "
+                    f"(~{boilerplate.stats['tokens_saved']} tokens)")
+    
+    if not text:
+        logger.warning(f"⚠️ No text extracted from PDF: {source}")
+        return None
+    
+    logger.info(f"✅ Successfully extracted {len(text)} characters from {total_pages} pages")
+    return text
 
 
 # FIX: Function name was typo'd
@@ -112,7 +211,7 @@ def truncate_text(text, max_tokens=1024):
 
 def clean_text(text):
     """
-    Cleans the extracted text by removing excessive whitespace.
+    Cleans the extracted text (see src.utils.normalize_text).
     
     Args:
         text (str): The extracted text from the PDF.
@@ -120,8 +219,7 @@ def clean_text(text):
     Returns:
         str: Cleaned text.
     """
-    text = ' '.join(text.split())  # Remove excessive whitespace
-    return text
+    return normalize_text(text)
 
 
 # Test function
@@ -0,0 +1,276 @@
+"""
+🔬 MODULE: PROFILING
+====================
+
+Opt-in profiling of a single request (one summary, one PDF extraction).
+
+KEY CONCEPTS:
+- profile_request(): wraps one request, writes its traces to disk
+- stage(): marks a named stage (tokenization, encoder, decoding...) inside it
+- Chrome trace JSON (open in chrome://tracing or https://ui.perfetto.dev)
+- Optional cProfile (.prof), torch.profiler and py-spy outputs next to it
+
+Switching on (no restart needed, read on every request):
+- env var:  RPS_PROFILE=trace,cprofile   (or 1/on/true for the same)
+- sidebar:  set_profiling(...) for the current Streamlit session thread
+- RPS_PROFILE_DIR sets the output directory (default: profiles/)
+"""
+import cProfile
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+PROFILE_MODES = ("trace", "cprofile", "torch", "pyspy")
+DEFAULT_PROFILE_DIR = "profiles"
+
+_local = threading.local()
+
+
+def set_profiling(mode):
+    """
+    Override the profiling mode for the current thread (one Streamlit session).
+
+    Args:
+        mode (str or None): e.g. "trace,cprofile", "off", or None to fall back to RPS_PROFILE.
+    """
+    _local.override = mode
+
+
+def profiling_modes():
+    """
+    Return the active profiling modes as a set (empty when profiling is off).
+
+    The thread override wins over RPS_PROFILE; both are read on every call.
+    """
+    raw = getattr(_local, "override", None)
+    if raw is None:
+        raw = os.environ.get("RPS_PROFILE", "")
+    raw = raw.strip().lower()
+
+    if raw in ("", "0", "off", "false", "no"):
+        return set()
+    if raw in ("1", "on", "true", "yes"):
+        return {"trace", "cprofile"}
+
+    modes = {m.strip() for m in raw.split(",") if m.strip() in PROFILE_MODES}
+    if modes:
+        modes.add("trace")  # stage timeline is always written when profiling
+    return modes
+
+
+def current_trace():
+    """Return the RequestTrace of the request running on this thread, or None."""
+    return getattr(_local, "trace", None)
+
+
+class RequestTrace:
+    """Collects Chrome-trace events for one request."""
+
+    def __init__(self, name):
+        self.name = name
+        self.events = []
+        self.torch_active = False
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def now_us():
+        return time.perf_counter_ns() // 1000
+
+    def add_span(self, name, start_us, end_us, **args):
+        """Record a complete ("X") event."""
+        with self._lock:
+            self.events.append({
+                "name": name, "ph": "X", "ts": start_us, "dur": max(end_us - start_us, 0),
+                "pid": self._pid, "tid": threading.get_ident(), "args": args,
+            })
+
+    @contextmanager
+    def span(self, name, **args):
+        start = self.now_us()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, self.now_us(), **args)
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+@contextmanager
+def stage(name, **args):
+    """
+    Mark a named stage of the current request (no-op when nothing is profiled).
+
+    Usage:
+        with stage("tokenization"):
+            inputs = tokenizer(text)
+    """
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+
+    record = nullcontext()
+    if trace.torch_active:
+        import torch
+        record = torch.profiler.record_function(name)
+
+    with trace.span(name, **args), record:
+        yield
+
+
+class GenerationTracer:
+    """
+    Times the encoder pass and each decoding (beam) step of model.generate.
+
+    Pass logits_processor() into generate and call attach(model) before it;
+    detach() removes the hooks again.
+    """
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.step = 0
+        self._last = None
+        self._encoder_start = None
+        self._handles = []
+
+    def attach(self, model):
+        encoder = model.get_encoder()
+        self._handles.append(encoder.register_forward_pre_hook(self._encoder_pre))
+        self._handles.append(encoder.register_forward_hook(self._encoder_post))
+
+    def detach(self):
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+
+    def _encoder_pre(self, module, inputs):
+        self._encoder_start = self.trace.now_us()
+
+    def _encoder_post(self, module, inputs, output):
+        end = self.trace.now_us()
+        self.trace.add_span("encoder", self._encoder_start, end)
+        self._last = end
+
+    def __call__(self, input_ids, scores):
+        # Called once per decoding step, after the decoder forward for that step
+        now = self.trace.now_us()
+        if self._last is not None:
+            self.trace.add_span("beam_step", self._last, now, step=self.step)
+        self.step += 1
+        self._last = now
+        return scores
+
+
+def _profile_dir():
+    path = os.environ.get("RPS_PROFILE_DIR", DEFAULT_PROFILE_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _start_pyspy(output_path):
+    """Attach py-spy to this process (if installed) and return the subprocess."""
+    if shutil.which("py-spy") is None:
+        logger.warning("⚠️ py-spy profiling requested but py-spy is not on PATH")
+        return None
+    try:
+        return subprocess.Popen(
+            ["py-spy", "record", "--pid", str(os.getpid()), "--format", "chrometrace",
+             "--rate", "200", "--nonblocking", "-o", output_path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    except OSError as e:
+        logger.warning(f"⚠️ Could not start py-spy: {e}")
+        return None
+
+
+@contextmanager
+def profile_request(name, **args):
+    """
+    Profile one request if profiling is enabled; otherwise do nothing.
+
+    Nested calls (summarize inside summarize_multiple) become a stage of the
+    outer request instead of writing a second set of files.
+
+    Args:
+        name (str): Request kind, used in file names (e.g. "summarize").
+        **args: Extra details stored on the top-level trace event.
+
+    Yields:
+        RequestTrace or None
+    """
+    outer = current_trace()
+    if outer is not None:
+        with stage(name, **args):
+            yield outer
+        return
+
+    modes = profiling_modes()
+    if not modes:
+        yield None
+        return
+
+    out_dir = _profile_dir()
+    request_id = f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    base = os.path.join(out_dir, request_id)
+    trace = RequestTrace(name)
+
+    cprofiler = cProfile.Profile() if "cprofile" in modes else None
+    pyspy = _start_pyspy(base + ".pyspy.json") if "pyspy" in modes else None
+    torch_prof = None
+    if "torch" in modes:
+        try:
+            import torch
+            torch_prof = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU], with_stack=True
+            )
+        except ImportError:
+            logger.warning("⚠️ torch profiling requested but torch is not installed")
+
+    _local.trace = trace
+    try:
+        if torch_prof is not None:
+            torch_prof.__enter__()
+            trace.torch_active = True
+        if cprofiler is not None:
+            cprofiler.enable()
+        with trace.span(name, **args):
+            yield trace
+    finally:
+        if cprofiler is not None:
+            cprofiler.disable()
+            cprofiler.dump_stats(base + ".prof")
+        if torch_prof is not None:
+            torch_prof.__exit__(None, None, None)
+            torch_prof.export_chrome_trace(base + ".torch.json")
+        if pyspy is not None:
+            pyspy.send_signal(signal.SIGINT)
+            try:
+                pyspy.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pyspy.kill()
+        _local.trace = None
+        trace.write(base + ".trace.json")
+        logger.info(f"🔬 Profile written: {base}.* ({', '.join(sorted(modes))})")
+
+
+if __name__ == "__main__":
+    set_profiling("trace,cprofile")
+    with profile_request("demo"):
+        with stage("work"):
+            sum(i * i for i in range(100000))
+    print(f"Traces written to {_profile_dir()}/")
@@ -0,0 +1,323 @@
+"""
+🎓 MODULE: SEMANTIC SCHOLAR CLIENT
+==================================
+
+Lean client for the Semantic Scholar Graph API.
+
+KEY CONCEPTS:
+- Field projection: only the fields we map (title, authors, abstract, year,
+  openAccessPdf, url) are requested, so responses are a fraction of the default
+- One request per page: search() asks for exactly `limit` results at `offset`
+- Batch lookup: get_papers() enriches up to 500 ids per POST /paper/batch
+- TokenBucket rate limiter that also honours 429 / Retry-After and
+  X-RateLimit-* response headers
+- S2_API_URL points the client at a local stand-in server (tests, load tests)
+- get_client(): one client (one rate limiter) per API root for the whole
+  process, so pages, lookups and Streamlit sessions share the budget
+- Requests go through the shared src.http_client pool (5xx retries, circuit breaker)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_API_URL = "https://api.semanticscholar.org/graph/v1"
+PAPER_FIELDS = "title,authors,abstract,year,openAccessPdf,url"
+BATCH_LIMIT = 500       # ids per /paper/batch request (API maximum)
+SEARCH_PAGE_LIMIT = 100  # results per /paper/search request (API maximum)
+MAX_RETRIES = 3
+# Longest back-off honoured from a response header (seconds)
+MAX_BLOCK_SECONDS = 300
+# X-RateLimit-Reset above this is an epoch timestamp, not a delay
+_EPOCH_THRESHOLD = 1e9
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second, bursts up to `capacity`."""
+
+    def __init__(self, rate=1.0, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def block_for(self, seconds):
+        """Stop handing out tokens for `seconds` (server asked us to back off; capped)."""
+        seconds = min(max(seconds, 0.0), MAX_BLOCK_SECONDS)
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+    def update_from_headers(self, headers):
+        """Apply Retry-After and X-RateLimit-Remaining/Reset hints from a response."""
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            try:
+                self.block_for(float(retry_after))
+            except ValueError:
+                pass  # HTTP-date form: fall back to the bucket rate
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset is not None:
+            try:
+                if int(remaining) <= 0:
+                    reset = float(reset)
+                    if reset > _EPOCH_THRESHOLD:
+                        reset -= time.time()  # some servers send the reset time itself
+                    self.block_for(reset)
+            except ValueError:
+                pass
+
+
+def to_paper(data):
+    """Map a Graph API paper object onto our paper dictionary."""
+    return {
+        'title': data.get('title'),
+        'authors': [author['name'] for author in data.get('authors') or []],
+        'abstract': data.get('abstract') or 'No abstract available',
+        'year': data.get('year') or 'N/A',
+        'pdf_url': (data.get('openAccessPdf') or {}).get('url'),
+        'paper_url': data.get('url'),
+        'source': 'Semantic Scholar'
+    }
+
+
+class SemanticScholarClient:
+    """Semantic Scholar Graph API client with field projection and rate limiting."""
+
+    def __init__(self, base_url=None, api_key=None, rate=None, timeout=30, session=None):
+        """
+        Args:
+            base_url (str): API root (default: S2_API_URL env var or the public API).
+            api_key (str): Optional key (default: S2_API_KEY env var).
+            rate (float): Requests per second (default 1, the public limit).
+            timeout (int): Per-request timeout in seconds.
+            session: requests-compatible session (default: the shared HttpClient).
+        """
+        from src.http_client import get_http_client
+
+        self.base_url = (base_url or os.environ.get("S2_API_URL", DEFAULT_API_URL)).rstrip("/")
+        self.timeout = timeout
+        self.session = session or get_http_client()
+        # Per-request header: the pooled session is shared with other hosts
+        self.headers = {}
+        api_key = api_key or os.environ.get("S2_API_KEY")
+        if api_key:
+            self.headers["x-api-key"] = api_key
+        self.limiter = TokenBucket(rate=rate or float(os.environ.get("S2_RATE_LIMIT", 1.0)))
+        self.stats = {'calls': 0, 'bytes': 0}
+        self._stats_lock = threading.Lock()
+
+    def _request(self, method, path, **kwargs):
+        for attempt in range(MAX_RETRIES + 1):
+            self.limiter.acquire()
+            response = self.session.request(
+                method, f"{self.base_url}{path}", timeout=self.timeout, headers=self.headers, **kwargs
+            )
+            with self._stats_lock:
+                self.stats['calls'] += 1
+                self.stats['bytes'] += len(response.content)
+            self.limiter.update_from_headers(response.headers)
+
+            if response.status_code == 429 and attempt < MAX_RETRIES:
+                if "Retry-After" not in response.headers:
+                    self.limiter.block_for(2 ** attempt)
+                logger.warning(f"⚠️ Semantic Scholar rate limited, retry {attempt + 1}/{MAX_RETRIES}")
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def search(self, query, limit=10, offset=0):
+        """
+        Fetch one page of search results.
+
+        Returns:
+            tuple: (list of paper dicts, next offset or None when exhausted)
+        """
+        data = self._request("GET", "/paper/search", params={
+            'query': query,
+            'fields': PAPER_FIELDS,
+            'limit': min(limit, SEARCH_PAGE_LIMIT),
+            'offset': offset,
+        })
+        papers = [to_paper(item) for item in data.get('data') or []]
+        return papers, data.get('next')
+
+    def get_papers(self, paper_ids):
+        """
+        Look up many papers by id (S2 id, DOI:..., ARXIV:..., ...) in batches.
+
+        Returns:
+            list: Paper dicts in input order; None for unknown ids.
+        """
+        papers = []
+        paper_ids = list(paper_ids)
+        for start in range(0, len(paper_ids), BATCH_LIMIT):
+            chunk = paper_ids[start:start + BATCH_LIMIT]
+            data = self._request(
+                "POST", "/paper/batch", params={'fields': PAPER_FIELDS}, json={'ids': chunk}
+            )
+            papers.extend(to_paper(item) if item else None for item in data)
+        return papers
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide client for the configured API root (S2_API_URL), shared rate limit."""
+    base_url = os.environ.get("S2_API_URL", DEFAULT_API_URL).rstrip("/")
+    with _clients_lock:
+        if base_url not in _clients:
+            _clients[base_url] = SemanticScholarClient(base_url=base_url)
+        return _clients[base_url]
+
+
+# ------------------------------------------------------------------------------
+# Local stand-in server (tests, load tests): serves canned papers, no network
+# ------------------------------------------------------------------------------
+class StandInServer:
+    """
+    Minimal local imitation of /paper/search and /paper/batch.
+
+    Usage:
+        with StandInServer(papers) as server:
+            client = SemanticScholarClient(base_url=server.url)
+    """
+
+    def __init__(self, papers, port=0):
+        self.papers = papers  # Graph API shaped dicts with a 'paperId'
+        self.requests = []
+        handler = self._make_handler()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _make_handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            @staticmethod
+            def _project(paper, fields):
+                return {k: v for k, v in paper.items() if k in fields or k == 'paperId'}
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                stand_in.requests.append(("GET", url.path, params))
+                fields = params.get('fields', PAPER_FIELDS).split(",")
+                words = params.get('query', '').lower().split()
+                hits = [p for p in stand_in.papers
+                        if all(w in (p.get('title', '') + ' ' + (p.get('abstract') or '')).lower()
+                               for w in words)]
+                offset, limit = int(params.get('offset', 0)), int(params.get('limit', 10))
+                page = hits[offset:offset + limit]
+                payload = {'total': len(hits), 'offset': offset,
+                           'data': [self._project(p, fields) for p in page]}
+                if offset + limit < len(hits):
+                    payload['next'] = offset + limit
+                self._send(payload)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stand_in.requests.append(("POST", url.path, params))
+                fields = params.get('fields', PAPER_FIELDS).split(",")
+                by_id = {p['paperId']: p for p in stand_in.papers}
+                self._send([self._project(by_id[i], fields) if i in by_id else None
+                            for i in body['ids']])
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def test_semantic_scholar_client():
+    """
+    Exercise search pagination and batch lookup against the stand-in server.
+
+    Usage: python -m src.semantic_scholar
+    """
+    print("\n" + "="*70)
+    print("TEST: Semantic Scholar client (local stand-in server)")
+    print("="*70)
+
+    papers = [{
+        'paperId': f"p{i}",
+        'title': f"Neural network paper {i}",
+        'authors': [{'authorId': str(i), 'name': f"Author {i}"}],
+        'abstract': "We study neural networks. " * 20,
+        'year': 2020 + i % 5,
+        'openAccessPdf': {'url': f"https://example.org/{i}.pdf", 'status': 'GREEN'},
+        'url': f"https://www.semanticscholar.org/paper/p{i}",
+        'citationCount': i,
+        'referenceCount': i,
+        'venue': "Stand-in Conference",
+    } for i in range(250)]
+
+    with StandInServer(papers) as server:
+        client = SemanticScholarClient(base_url=server.url, rate=1000)
+
+        found, next_offset = client.search("neural network", limit=5)
+        assert len(found) == 5 and next_offset == 5
+        assert set(found[0]) == {'title', 'authors', 'abstract', 'year', 'pdf_url', 'paper_url', 'source'}
+
+        enriched = client.get_papers([f"p{i}" for i in range(120)] + ["missing"])
+        assert len(enriched) == 121 and enriched[-1] is None
+        assert client.stats['calls'] == 2
+
+    # One shared client per API root; an epoch-style reset is a delay, capped
+    assert get_client() is get_client()
+    limiter = TokenBucket()
+    limiter.update_from_headers({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 2)})
+    assert 1 < limiter._blocked_until - time.monotonic() <= 2
+    limiter.update_from_headers({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 1e6)})
+    assert limiter._blocked_until - time.monotonic() <= MAX_BLOCK_SECONDS
+
+    print(f"✅ {client.stats['calls']} calls, {client.stats['bytes']} bytes "
+          f"for 5 search hits + 120 batch lookups")
+
+
+if __name__ == "__main__":
+    test_semantic_scholar_client()
@@ -0,0 +1,327 @@
+"""
+🧠 MODULE: SESSION TEXT STORE
+=============================
+
+Keeps extracted paper texts out of st.session_state, under a memory budget.
+
+KEY CONCEPTS:
+- Session state holds only a small key per paper ('text_key'); the texts
+  live in one process-wide store shared by all browser sessions
+- Content-addressed: the same PDF uploaded by two users is stored once
+- Two budgets: bytes per session and bytes for the whole process; the least
+  recently used texts are evicted first (a session over its own budget only
+  evicts its own texts)
+- Evicted texts are spilled to a shared disk store (gzip) and rehydrated on
+  the next get(); without a disk store they are dropped
+- A text no session holds any more is dropped, spill file included; sessions
+  idle longer than the TTL (closed tabs) are released, and spill files no
+  entry refers to (e.g. from an earlier run) are deleted once that old
+- usage() feeds the sidebar, gauges feed /metrics
+
+Configuration:
+- RPS_SESSION_TEXT_MB: per-session budget (default 64)
+- RPS_GLOBAL_TEXT_MB: process budget (default 512)
+- RPS_TEXT_STORE_DIR: spill directory (default data/text_store; empty disables spilling)
+- RPS_TEXT_STORE_TTL_H: idle hours before a session's texts are released (default 24)
+"""
+import gzip
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from src.metrics import counter, gauge
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_STORE_DIR = os.path.join("data", "text_store")
+_MB = 1024 * 1024
+# How often put() sweeps idle sessions and stale spill files (seconds)
+SWEEP_INTERVAL = 600
+
+TEXT_STORE_BYTES = gauge("rps_text_store_bytes", "Paper text bytes held in memory")
+TEXT_STORE_EVICTIONS = counter(
+    "rps_text_store_evictions_total", "Paper texts evicted from memory", labelnames=("action",))
+TEXT_STORE_REHYDRATIONS = counter("rps_text_store_rehydrations_total", "Paper texts read back from disk")
+
+
+class _Entry:
+    __slots__ = ("text", "size", "owners", "on_disk")
+
+    def __init__(self, size):
+        self.text = None
+        self.size = size
+        self.owners = set()
+        self.on_disk = False
+
+
+class SessionTextStore:
+    """LRU text store with per-session and global byte budgets and disk spill."""
+
+    def __init__(self, session_budget=None, global_budget=None, spill_dir=None, ttl_s=None):
+        """
+        Args:
+            session_budget (int): Bytes per session (default RPS_SESSION_TEXT_MB).
+            global_budget (int): Bytes for all sessions (default RPS_GLOBAL_TEXT_MB).
+            spill_dir (str): Disk store; '' disables spilling (default RPS_TEXT_STORE_DIR).
+            ttl_s (float): Idle seconds before a session is released (default RPS_TEXT_STORE_TTL_H).
+        """
+        self.session_budget = session_budget or int(os.environ.get("RPS_SESSION_TEXT_MB", 64)) * _MB
+        self.global_budget = global_budget or int(os.environ.get("RPS_GLOBAL_TEXT_MB", 512)) * _MB
+        self.spill_dir = os.environ.get("RPS_TEXT_STORE_DIR", DEFAULT_STORE_DIR) if spill_dir is None else spill_dir
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        self._entries = {}           # key -> _Entry (in memory or spilled)
+        self._lru = OrderedDict()    # keys whose text is in memory, oldest first
+        self._session_bytes = {}     # session id -> bytes of its in-memory texts
+        self._memory_bytes = 0
+        self.ttl_s = ttl_s if ttl_s is not None else float(os.environ.get("RPS_TEXT_STORE_TTL_H", 24)) * 3600
+        self._last_seen = {}         # session id -> time.time() of its last put/get
+        self._last_sweep = 0.0       # first put() sweeps leftovers from earlier runs
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------------- internals
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"{key}.txt.gz")
+
+    def _charge(self, entry, sign):
+        for owner in entry.owners:
+            self._session_bytes[owner] = self._session_bytes.get(owner, 0) + sign * entry.size
+        self._memory_bytes += sign * entry.size
+        TEXT_STORE_BYTES.set(self._memory_bytes)
+
+    def _evict(self, key):
+        entry = self._entries[key]
+        if self.spill_dir and not entry.on_disk:
+            try:
+                tmp = self._spill_path(key) + ".tmp"
+                with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=1) as f:
+                    f.write(entry.text)
+                os.replace(tmp, self._spill_path(key))
+                entry.on_disk = True
+            except OSError as e:
+                logger.warning(f"⚠️ Could not spill text {key[:8]}: {e}")
+        self._charge(entry, -1)
+        entry.text = None
+        del self._lru[key]
+        TEXT_STORE_EVICTIONS.inc(action="spilled" if entry.on_disk else "dropped")
+        if not entry.on_disk:
+            del self._entries[key]
+
+    def _drop(self, key):
+        """Forget a text no session holds any more, including its spill file."""
+        entry = self._entries.pop(key)
+        if entry.text is not None:
+            self._charge(entry, -1)
+            del self._lru[key]
+            entry.text = None
+        if entry.on_disk:
+            try:
+                os.remove(self._spill_path(key))
+            except OSError:
+                pass
+
+    def _enforce(self, session_id):
+        """Evict LRU texts until the session and the process are within budget."""
+        while self._session_bytes.get(session_id, 0) > self.session_budget:
+            victim = next((k for k in self._lru if session_id in self._entries[k].owners), None)
+            if victim is None:
+                break
+            self._evict(victim)
+        while self._memory_bytes > self.global_budget and self._lru:
+            self._evict(next(iter(self._lru)))
+
+    # ------------------------------------------------------------------- public
+    def put(self, session_id, text):
+        """
+        Store a text for a session.
+
+        Returns:
+            str: Key to keep in session state (pass it to get()).
+        """
+        key = hashlib.sha1(text.encode("utf-8", errors="replace")).hexdigest()
+        if time.time() - self._last_sweep > SWEEP_INTERVAL:
+            self.sweep()
+        with self._lock:
+            self._last_seen[session_id] = time.time()
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(sys.getsizeof(text))
+            if entry.text is None:
+                entry.text = text
+                self._lru[key] = True
+                self._charge(entry, +1)
+            if session_id not in entry.owners:
+                entry.owners.add(session_id)
+                self._session_bytes[session_id] = self._session_bytes.get(session_id, 0) + entry.size
+            self._lru.move_to_end(key)
+            self._enforce(session_id)
+        return key
+
+    def get(self, session_id, key):
+        """
+        Text for a key, rehydrated from disk if it was evicted.
+
+        Returns:
+            str: The text, or None if it was dropped (re-upload needed).
+        """
+        with self._lock:
+            self._last_seen[session_id] = time.time()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.text is not None:
+                self._lru.move_to_end(key)
+                if session_id not in entry.owners:
+                    entry.owners.add(session_id)
+                    self._session_bytes[session_id] = self._session_bytes.get(session_id, 0) + entry.size
+                    self._enforce(session_id)
+                return entry.text
+        # Read outside the lock: other sessions aren't blocked on disk I/O
+        try:
+            with gzip.open(self._spill_path(key), "rt", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return None
+        TEXT_STORE_REHYDRATIONS.inc()
+        self.put(session_id, text)
+        return text
+
+    def retain(self, session_id, keys):
+        """Release a session's texts that are not in `keys` (e.g. after a new upload)."""
+        keys = set(keys)
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if session_id not in entry.owners or key in keys:
+                    continue
+                entry.owners.discard(session_id)
+                if entry.text is not None:
+                    self._session_bytes[session_id] -= entry.size
+                if not entry.owners:
+                    self._drop(key)
+            if not keys:
+                self._session_bytes.pop(session_id, None)
+                self._last_seen.pop(session_id, None)
+
+    def sweep(self, max_idle_s=None):
+        """
+        Release sessions idle for longer than max_idle_s (default: the TTL) and
+        delete spill files that no entry refers to and that are at least as old.
+
+        Returns:
+            tuple: (sessions released, spill files deleted)
+        """
+        max_idle_s = self.ttl_s if max_idle_s is None else max_idle_s
+        now = self._last_sweep = time.time()
+        with self._lock:
+            idle = [s for s, seen in self._last_seen.items() if now - seen >= max_idle_s]
+        for session_id in idle:
+            self.retain(session_id, [])
+
+        deleted = 0
+        if self.spill_dir:
+            with self._lock:
+                referenced = {f"{key}.txt.gz" for key, entry in self._entries.items() if entry.on_disk}
+            for name in os.listdir(self.spill_dir):
+                path = os.path.join(self.spill_dir, name)
+                try:
+                    if name not in referenced and now - os.path.getmtime(path) >= max_idle_s:
+                        os.remove(path)
+                        deleted += 1
+                except OSError:
+                    pass
+        if idle or deleted:
+            logger.info(f"🧹 Text store sweep: {len(idle)} idle session(s) released, "
+                        f"{deleted} spill file(s) deleted")
+        return len(idle), deleted
+
+    def usage(self, session_id):
+        """Memory use for the sidebar."""
+        with self._lock:
+            return {
+                'session_bytes': self._session_bytes.get(session_id, 0),
+                'session_budget': self.session_budget,
+                'global_bytes': self._memory_bytes,
+                'global_budget': self.global_budget,
+                'texts_in_memory': len(self._lru),
+                'texts_spilled': sum(1 for e in self._entries.values() if e.text is None and e.on_disk),
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_text_store():
+    """Process-wide store shared by all Streamlit sessions."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionTextStore()
+        return _store
+
+
+def paper_text(paper, session_id):
+    """
+    Text to summarize for a paper dict: stored full text, inline text, or abstract.
+
+    Returns:
+        str: The text, or None if none is available.
+    """
+    if paper.get('text_key'):
+        text = get_text_store().get(session_id, paper['text_key'])
+        if text is not None:
+            return text
+    return paper.get('text') or paper.get('abstract')
+
+
+def test_session_store():
+    """
+    Fill two sessions past their budgets and read everything back.
+
+    Usage: python -m src.session_store
+    """
+    import tempfile
+
+    print("\n" + "="*70)
+    print("TEST: Session text store")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionTextStore(session_budget=3 * _MB, global_budget=5 * _MB, spill_dir=tmp)
+        texts = {f"s{s}-{i}": f"paper {s}-{i} " + "x" * _MB for s in range(2) for i in range(4)}
+        keys = {name: store.put(name[:2], text) for name, text in texts.items()}
+
+        usage = store.usage("s0")
+        assert usage['session_bytes'] <= store.session_budget
+        assert usage['global_bytes'] <= store.global_budget
+        assert usage['texts_spilled'] > 0
+        for name, key in keys.items():
+            assert store.get(name[:2], key) == texts[name]  # rehydrated if spilled
+
+        store.retain("s1", [])
+        assert store.usage("s1")['session_bytes'] == 0
+        # s1's texts are gone from disk too; an idle s0 is released by the sweep
+        assert not any(f.startswith(keys["s1-0"]) for f in os.listdir(tmp))
+        with open(os.path.join(tmp, "orphan.txt.gz"), "wb") as f:
+            f.write(b"from an earlier run")
+        assert store.sweep(max_idle_s=0) == (1, 1)
+        assert os.listdir(tmp) == [] and store.usage("s0")['texts_spilled'] == 0
+
+        dropping = SessionTextStore(session_budget=_MB, global_budget=_MB, spill_dir="")
+        first = dropping.put("s", "a" * _MB)
+        dropping.put("s", "b" * _MB)
+        assert dropping.get("s", first) is None
+
+    print(f"✅ Budgets held ({usage['texts_in_memory']} in memory, "
+          f"{usage['texts_spilled']} spilled); spilled texts rehydrated")
+
+
+if __name__ == "__main__":
+    test_session_store()
@@ -0,0 +1,142 @@
+"""
+🚀 MODULE: STARTUP
+==================
+
+Cold-start tracing and the import-time budget for app.py.
+
+KEY CONCEPTS:
+- StartupTrace: timestamps of startup phases (imports, CSS, first render)
+- HEAVY_MODULES: dependencies that must only be imported on demand
+- check_import_budget(): imports the app modules in a fresh interpreter and
+  fails if they are too slow or pull in a heavy dependency
+
+Usage: python -m src.startup
+"""
+import json
+import logging
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from src.metrics import histogram
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Must never be imported just by loading the landing page
+HEAVY_MODULES = ("transformers", "torch", "PyPDF2", "arxiv", "semanticscholar")
+
+# Modules app.py imports at top level (streamlit itself is excluded: it is
+# already loaded by the time `streamlit run` executes the script)
+APP_MODULES = (
+    "src.paper_retrieval",
+    "src.pdf_extractor",
+    "src.summarizer",
+    "src.semantic_scholar",
+    "src.metrics",
+    "src.profiling",
+    "src.local_index",
+    "src.http_client",
+    "src.ocr",
+    "src.utils",
+    "src.boilerplate",
+    "src.sections",
+    "src.session_store",
+    "src.batch_extract",
+    "src.export",
+    "src.meta_summary",
+)
+
+# Seconds allowed for importing APP_MODULES in a cold interpreter
+IMPORT_BUDGET_SECONDS = 0.5
+
+STARTUP_SECONDS = histogram(
+    "rps_startup_seconds", "Time from the start of the first app.py run to each startup phase", ("phase",))
+
+# Set when this module is first imported - app.py imports it before anything else
+_process_start = time.perf_counter()
+
+
+class StartupTrace:
+    """Records startup phases of the first script run of this process."""
+
+    def __init__(self):
+        self.phases = []
+        self.finished = False
+
+    def mark(self, phase):
+        """Record that a phase has completed (ignored after finish())."""
+        if self.finished:
+            return
+        elapsed = time.perf_counter() - _process_start
+        self.phases.append((phase, elapsed))
+        STARTUP_SECONDS.observe(elapsed, phase=phase)
+
+    def finish(self):
+        """Log the trace once; later reruns of the script are not cold starts."""
+        if self.finished:
+            return
+        self.mark("first_render")
+        self.finished = True
+        steps = ", ".join(f"{phase} {elapsed:.3f}s" for phase, elapsed in self.phases)
+        logger.info(f"🚀 Cold start: {steps}")
+
+
+# One trace per process (Streamlit re-executes app.py but keeps imported modules)
+startup_trace = StartupTrace()
+
+
+def check_import_budget(modules=APP_MODULES, budget=IMPORT_BUDGET_SECONDS):
+    """
+    Import `modules` in a fresh interpreter and check time and heavy imports.
+
+    Args:
+        modules (tuple): Module names to import.
+        budget (float): Allowed import time in seconds.
+
+    Returns:
+        dict: {'seconds': float, 'heavy_loaded': list, 'ok': bool}
+    """
+    heavy = json.dumps(list(HEAVY_MODULES))
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"for name in {list(modules)!r}:\n"
+        "    __import__(name)\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [m for m in {heavy} if m in sys.modules]\n"
+        "print(json.dumps({'seconds': elapsed, 'heavy_loaded': heavy}))\n"
+    )
+    repo_root = Path(__file__).resolve().parent.parent
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=repo_root, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['ok'] = result['seconds'] <= budget and not result['heavy_loaded']
+    return result
+
+
+def test_import_budget():
+    """
+    Check that the app's modules import fast and without heavy dependencies.
+
+    Usage: python -m src.startup
+    For a per-module breakdown: python -X importtime -c "import src.summarizer"
+    """
+    print("\n" + "="*70)
+    print("TEST: Import-time budget")
+    print("="*70)
+
+    result = check_import_budget()
+    print(f"\n⏱️ Import time: {result['seconds']:.3f}s (budget {IMPORT_BUDGET_SECONDS}s)")
+    if result['heavy_loaded']:
+        print(f"❌ Heavy modules imported eagerly: {', '.join(result['heavy_loaded'])}")
+    print("✅ Within budget" if result['ok'] else "❌ Over budget")
+    assert result['ok'], result
+
+
+if __name__ == "__main__":
+    test_import_budget()
@@ -1,14 +1,58 @@
 """
 Custom UI Components for Streamlit
 Beautiful, reusable UI elements with modern styling
+
+Every widget interaction reruns app.py from the top, so rendering is kept cheap:
+- The stylesheet is built once and memoized; paper cards are plain string
+  formatting (cheaper than hashing them for st.cache_data)
+- Results and summarize panels in app.py are fragments (timed_fragment): a
+  widget inside them reruns only that panel, not the whole page
+- Rerun times are recorded on rps_ui_rerun_seconds (scope="app" or the panel name)
 """
+import functools
+import time
+
 import streamlit as st
 from datetime import datetime
 
+from src.metrics import histogram
+
+
+RERUN_SECONDS = histogram(
+    "rps_ui_rerun_seconds", "Streamlit rerun time (whole script or one fragment)", ("scope",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+
+
+def timed_fragment(name):
+    """
+    st.fragment that also records its rerun time under scope=name.
+
+    Usage:
+        @timed_fragment("results")
+        def results_panel(...):
+            ...
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                RERUN_SECONDS.observe(time.perf_counter() - start, scope=name)
+        return st.fragment(wrapper)
+    return decorator
+
 
 def load_custom_css():
     """Load custom CSS for beautiful styling."""
-    st.markdown("""
+    st.markdown(_custom_css(), unsafe_allow_html=True)
+
+
+@st.cache_resource
+def _custom_css():
+    # Built once per process, shared by every session and rerun
+    return """
     <style>
     /* Main Theme */
     :root {
@@ -310,7 +354,7 @@ def load_custom_css():
         .main { padding: 1rem; }
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
 
 
 def header_with_icon(title, icon, subtitle=""):
@@ -392,3 +436,107 @@ def summary_box(title, summary_text, words):
         </div>
     </div>
     """, unsafe_allow_html=True)
+
+
+def paper_result(index, paper, expanded=False):
+    """Render one search result as an expander card."""
+    authors = paper.get('authors', 'N/A')
+    if isinstance(authors, list):
+        authors = ', '.join(authors[:3])
+    with st.expander(f"**{index}. {paper['title'][:70]}...**", expanded=expanded):
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown(f"**👥 Authors:**  \n{authors}")
+            st.markdown(f"**📅 Year:** {paper.get('year', 'N/A')}")
+        with col2:
+            st.markdown(f"**🏢 Source:** {paper.get('source', 'N/A')}")
+        
+        st.markdown(f"**Abstract:**  \n{(paper.get('abstract') or 'N/A')[:400]}...")
+        if paper.get('pdf_url'):
+            st.markdown(f"[📥 Download PDF]({paper['pdf_url']})")
+
+
+def summaries_panel(papers, summaries, meta_summary, provenance=None):
+    """Render stored summaries (one paper or many + meta-summary) with export downloads."""
+    from src.export import EXPORT_FORMATS, export_records, iter_export
+    
+    if not summaries:
+        return
+    
+    if len(summaries) == 1 and not meta_summary:
+        st.markdown("### 📋 Paper Summary")
+        summary_box("Summary", summaries[0], len(summaries[0].split()))
+    else:
+        # Individual Summaries
+        st.markdown("### 📄 Individual Paper Summaries")
+        for i, (paper, summary) in enumerate(zip(papers, summaries), 1):
+            paper_name = paper.get('filename', paper.get('title', f'Paper {i}'))
+            with st.expander(f"**Paper {i}: {paper_name[:60]}...**", expanded=(i == 1)):
+                summary_box(f"Summary #{i}", summary, len(summary.split()))
+        
+        # Meta Summary
+        if meta_summary:
+            st.markdown("### 🎯 Meta-Summary (All Papers Combined)")
+            summary_box("Combined Analysis", meta_summary, len(meta_summary.split()))
+    
+    # Download (summaries + metadata + provenance, see src.export)
+    st.markdown("---")
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        fmt = st.selectbox("Export format", list(EXPORT_FORMATS), format_func=str.upper,
+                           label_visibility="collapsed")
+    _, mime, extension = EXPORT_FORMATS[fmt]
+    with col2:
+        # Generated only for the selected format
+        st.download_button(
+            label=f"📥 Download {'Summary' if len(summaries) == 1 else 'All Summaries'} ({fmt.upper()})",
+            data=''.join(iter_export(export_records(papers, summaries, meta_summary, provenance), fmt)),
+            file_name=f"{'paper_summary' if len(summaries) == 1 else 'all_summaries'}.{extension}",
+            mime=mime,
+            use_container_width=True
+        )
+
+
+def metrics_panel(rows):
+    """Show per-stage timings and counters (from src.metrics.summary_rows)."""
+    if not rows:
+        st.caption("No measurements yet - run a search, extraction or summary.")
+        return
+    
+    timings = [r for r in rows if r['mean'] is not None and r['count']]
+    counters = [r for r in rows if r['mean'] is None]
+    
+    for row in timings:
+        label = row['metric'].replace('rps_', '')
+        if row['labels']:
+            label += f" ({row['labels']})"
+        st.markdown(
+            f"<p style='color: #cbd5e1; font-size: 0.85rem; margin: 0.25rem 0'>"
+            f"<strong>{label}</strong><br>"
+            f"n={row['count']} · avg {row['mean']} · p95 ≤ {row['p95']}</p>",
+            unsafe_allow_html=True
+        )
+    for row in counters:
+        label = row['metric'].replace('rps_', '')
+        st.markdown(
+            f"<p style='color: #94a3b8; font-size: 0.85rem; margin: 0.25rem 0'>"
+            f"{label} [{row['labels']}]: {row['count']}</p>",
+            unsafe_allow_html=True
+        )
+
+
+def memory_panel(usage):
+    """Show this session's and the server's paper-text memory (from SessionTextStore.usage)."""
+    mb = 1024 * 1024
+    session_share = min(usage['session_bytes'] / usage['session_budget'], 1.0)
+    global_share = min(usage['global_bytes'] / usage['global_budget'], 1.0)
+    
+    st.progress(session_share, text=f"This session: {usage['session_bytes'] / mb:.1f} / "
+                                    f"{usage['session_budget'] / mb:.0f} MB")
+    st.progress(global_share, text=f"Server: {usage['global_bytes'] / mb:.1f} / "
+                                   f"{usage['global_budget'] / mb:.0f} MB")
+    st.markdown(
+        f"<p style='color: #94a3b8; font-size: 0.85rem; margin: 0.25rem 0'>"
+        f"{usage['texts_in_memory']} texts in memory · {usage['texts_spilled']} on disk</p>",
+        unsafe_allow_html=True
+    )
@@ -0,0 +1,154 @@
+"""
+🧹 MODULE: TEXT NORMALIZATION
+=============================
+
+Single-pass cleanup of extracted page texts.
+
+KEY CONCEPTS:
+- Streaming: pages are processed line by line and emitted as pieces; the
+  document is assembled once at the end (no replace/split/join round-trips
+  over the whole text)
+- Unicode: NFKC folds ligatures (ﬁ → fi) and compatibility forms; soft
+  hyphens and zero-width characters are dropped
+- De-hyphenation: "trans-" at the end of a line followed by "formers" on the
+  next one (also across pages) becomes "transformers"; common compound
+  prefixes keep their hyphen ("self-attention")
+- Page furniture: bare page numbers ("3", "- 3 -", "Page 3 of 12") are removed
+  when they are the first or last line of a page (a number alone on a line
+  inside the page is a table cell or a wrapped value and stays); running
+  heads and footers are left to drop_line (see src.boilerplate)
+- Whitespace is collapsed to single spaces
+- SENTENCE_SPLIT / STOPWORDS: shared by the extractive summary
+  (src.latency_budget) and the meta-summary input (src.meta_summary)
+"""
+import re
+import unicodedata
+
+
+# Removed or mapped before NFKC (which leaves these alone)
+_TRANSLATE = str.maketrans({
+    '\u00ad': None,  # soft hyphen
+    '\u200b': None,  # zero-width space
+    '\u200c': None,  # zero-width non-joiner
+    '\u200d': None,  # zero-width joiner
+    '\ufeff': None,  # byte order mark
+    '\u2010': '-',   # hyphen
+    '\u2011': '-',   # non-breaking hyphen
+})
+
+# "self-" + "attention" stays "self-attention", not "selfattention"
+_COMPOUND_PREFIXES = frozenset(
+    "self non cross multi semi co pre post end fine large small low high long short zero few one two "
+    "state-of-the well data task".split()
+)
+
+# Split after . ! ? when the next sentence starts with a capital or a digit
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9])')
+# Function words ignored when scoring or embedding sentences
+STOPWORDS = frozenset(
+    "the a an and or of to in on for with by from as at is are was were be been this that these "
+    "those we our it its their which can has have not also using used use such into than".split()
+)
+
+_PAGE_NUMBER = re.compile(r'^(?:page\s+)?[-–—]?\s*\d{1,4}\s*[-–—]?(?:\s+of\s+\d{1,4})?$', re.IGNORECASE)
+
+
+def normalize_line(line):
+    """NFKC, drop invisible characters, collapse whitespace (one line)."""
+    return ' '.join(unicodedata.normalize('NFKC', line.translate(_TRANSLATE)).split())
+
+
+def _joins_hyphenated(previous, line):
+    """True if `previous` ends in a word broken by a line-end hyphen continued by `line`."""
+    return (len(previous) > 1 and previous[-1] == '-' and previous[-2].isalpha()
+            and line[0].islower())
+
+
+def _keeps_hyphen(previous):
+    """True if the broken word is a hyphenated compound ("self-attention")."""
+    return previous[:-1].rsplit(' ', 1)[-1].lower() in _COMPOUND_PREFIXES
+
+
+def iter_normalized(pages, drop_line=None):
+    """
+    Normalize page texts in one streaming pass.
+
+    Args:
+        pages: Iterable of page strings (lines separated by newlines).
+        drop_line: Optional callable(normalized_line) -> bool; True removes the line.
+
+    Yields:
+        str: Pieces of the normalized document; ''.join() them.
+    """
+    pending = ""  # last kept line, held back until we know whether it is hyphenated
+    for page in pages:
+        if not page:
+            continue
+        lines = [line for line in map(normalize_line, page.splitlines()) if line]
+        last = len(lines) - 1
+        for i, line in enumerate(lines):
+            if (i == 0 or i == last) and _PAGE_NUMBER.match(line):
+                continue
+            if drop_line is not None and drop_line(line):
+                continue
+            if pending:
+                if _joins_hyphenated(pending, line):
+                    line = (pending if _keeps_hyphen(pending) else pending[:-1]) + line
+                else:
+                    yield pending
+                    yield ' '
+            pending = line
+    if pending:
+        yield pending
+
+
+def normalize_text(pages, drop_line=None):
+    """
+    Normalize page texts into one clean string (see iter_normalized).
+
+    Args:
+        pages: Iterable of page strings, or a single string.
+        drop_line: Optional callable(normalized_line) -> bool.
+
+    Returns:
+        str: Normalized text.
+    """
+    if isinstance(pages, str):
+        pages = (pages,)
+    return ''.join(iter_normalized(pages, drop_line))
+
+
+def test_normalize_text():
+    """
+    Ligatures, de-hyphenation and page-number stripping on synthetic pages.
+
+    Usage: python -m src.utils
+    """
+    print("\n" + "="*70)
+    print("TEST: Text normalization")
+    print("="*70)
+
+    # Ligatures, soft hyphens and zero-width characters
+    assert normalize_text("e\ufb03cient \ufb01ne-tuning of trans\u00adformers\u200b") == \
+        "efficient fine-tuning of transformers"
+
+    # Line-end hyphens are joined, also across pages; compounds keep theirs
+    assert normalize_text(["we train trans-\nformers with self-\nattention and multi-",
+                           "head layers"]) == \
+        "we train transformers with self-attention and multi-head layers"
+    assert normalize_text("see Section 3-\n4 for details") == "see Section 3- 4 for details"
+
+    # Page numbers only go at the edges of a page
+    pages = ["1\nWe use 12 layers and\n128\nhidden units.\n- 1 -",
+             "Page 2 of 3\nTable: 2019\n2020\n2"]
+    assert normalize_text(pages) == "We use 12 layers and 128 hidden units. Table: 2019 2020"
+    assert normalize_text('We use 12 layers and\n128\nhidden units') == \
+        "We use 12 layers and 128 hidden units"
+
+    # drop_line sees every kept line once
+    assert normalize_text("Header\nbody text\nHeader", drop_line=lambda l: l == "Header") == "body text"
+    print("✅ Ligatures, hyphenation and page numbers handled")
+
+
+if __name__ == "__main__":
+    test_normalize_text()
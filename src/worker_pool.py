@@ -0,0 +1,321 @@
+"""
+🏭 MODULE: WORKER POOL
+======================
+
+Multi-process summarization behind the PaperSummarizer interface.
+
+KEY CONCEPTS:
+- Pre-started workers: each process runs its own model, so CPU generation
+  is no longer serialized behind one GIL-holding Streamlit thread
+- Spawned, never forked: the Streamlit parent is threaded (and may hold
+  torch/OpenMP or logging locks), so workers start fresh interpreters, also
+  when a dead worker is replaced from the dispatcher thread
+- Shared model memory: every worker memory-maps the same pre-baked snapshot
+  (src.model_store); without one, the pool bakes it once before starting
+- Thread pinning: each worker gets its own slice of CPUs and sets
+  OMP_NUM_THREADS (before torch is imported) and torch's intra-op threads
+  to match, so workers don't oversubscribe cores
+- IPC: one multiprocessing task queue + one result queue; a dispatcher
+  thread in the parent routes results back to per-request futures
+- Results carry the worker's generate() timings, which feed the parent's
+  latency-budget cost model; deadline requests are told how many requests
+  are queued ahead of them per worker
+
+Usage:
+    pool = SummarizerPool(num_workers=4)
+    summary = pool.summarize(text)       # same signature as PaperSummarizer
+    pool.close()
+"""
+import atexit
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, TimeoutError
+
+from src.latency_budget import COST_MODEL
+from src.metrics import IN_FLIGHT
+from src.model_store import DEFAULT_SNAPSHOT_DIR, prebake_model, resolve_snapshot_dir
+from src.summarizer import summarize_meta
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Longest a caller waits for one result (RPS_SUMMARY_TIMEOUT_S overrides); a task
+# whose worker died before reporting it had started would otherwise never resolve
+RESULT_TIMEOUT_SECONDS = float(os.environ.get("RPS_SUMMARY_TIMEOUT_S", 600))
+# Dead workers are looked for at least this often, busy or not (seconds)
+REAP_INTERVAL = 1.0
+
+
+def _worker_main(worker_id, task_queue, result_queue, model_path, cpus, summarizer_factory=None):
+    """Worker process: pin CPUs, map the snapshot, serve tasks."""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    threads = max(len(cpus), 1) if cpus else 1
+    # A spawned worker has not imported torch yet, so OpenMP still reads this
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+
+    if summarizer_factory is None:
+        import torch
+        torch.set_num_threads(threads)
+
+        from src.summarizer import PaperSummarizer
+        summarizer = PaperSummarizer(model_path)
+    else:
+        summarizer = summarizer_factory()
+    result_queue.put(("ready", worker_id, None, None, None))
+
+    while True:
+        message = task_queue.get()
+        if message is None:
+            break
+        task_id, method, args, kwargs = message
+        result_queue.put(("started", worker_id, task_id, None, None))
+        try:
+            result = getattr(summarizer, method)(*args, **kwargs)
+            # generate() timings travel back so the parent's cost model learns too
+            result_queue.put(("done", worker_id, task_id, result, COST_MODEL.drain()))
+        except Exception as e:
+            result_queue.put(("failed", worker_id, task_id, repr(e), COST_MODEL.drain()))
+
+
+def _cpu_slices(num_workers):
+    """Split the CPUs this process may use into one contiguous slice per worker."""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    per_worker = max(len(cpus) // num_workers, 1)
+    return [
+        set(cpus[(i * per_worker) % len(cpus):(i * per_worker) % len(cpus) + per_worker])
+        for i in range(num_workers)
+    ]
+
+
+class SummarizerPool:
+    """Pool of summarization worker processes with PaperSummarizer's interface."""
+
+    def __init__(self, num_workers=None, model_path=None, summarizer_factory=None):
+        """
+        Start the workers.
+
+        Args:
+            num_workers (int): Worker processes (default: RPS_SUMMARY_WORKERS or 2).
+            model_path (str): Snapshot directory; see src.model_store. Without
+                one, the default model is baked to RPS_MODEL_DIR or models/pegasus-arxiv.
+            summarizer_factory: Picklable callable building the workers'
+                summarizer instead of PaperSummarizer (self-test stubs).
+        """
+        self.num_workers = num_workers or int(os.environ.get("RPS_SUMMARY_WORKERS", 2))
+        self.summarizer_factory = summarizer_factory
+        self.model_path = resolve_snapshot_dir(model_path)
+        if self.model_path is None and summarizer_factory is None:
+            # Workers share weights only through a mapped snapshot: bake it once
+            self.model_path = prebake_model(output_dir=os.environ.get("RPS_MODEL_DIR") or DEFAULT_SNAPSHOT_DIR)
+        self._futures = {}
+        self._in_flight = {}  # worker_id -> task_id
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Workers map the snapshot themselves; spawn never forks the threaded parent
+        self._ctx = multiprocessing.get_context("spawn")
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._cpus = _cpu_slices(self.num_workers)
+        self._workers = [self._start_worker(i) for i in range(self.num_workers)]
+
+        self._dispatcher = threading.Thread(target=self._dispatch, name="summarizer-pool", daemon=True)
+        self._dispatcher.start()
+        atexit.register(self.close)
+        logger.info(f"🏭 Summarizer pool started: {self.num_workers} workers "
+                    f"(snapshot {self.model_path or 'n/a'})")
+
+    @property
+    def routes_long_texts(self):
+        """Whether workers may chunk or hand long texts to a long-context model (same env)."""
+        return bool(os.environ.get("RPS_LONG_MODEL")) or int(os.environ.get("RPS_MAX_CHUNKS", 1)) > 1
+
+    def _start_worker(self, worker_id):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._tasks, self._results, self.model_path, self._cpus[worker_id],
+                  self.summarizer_factory),
+            name=f"summarizer-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def _dispatch(self):
+        """Route worker results to futures; replace workers that died."""
+        last_reap = time.monotonic()
+        while not self._closed:
+            # Under steady traffic get() never times out: reap on a clock, not on idleness
+            if time.monotonic() - last_reap >= REAP_INTERVAL:
+                self._reap_dead_workers()
+                last_reap = time.monotonic()
+            try:
+                kind, worker_id, task_id, payload, timings = self._results.get(timeout=REAP_INTERVAL)
+            except queue.Empty:
+                continue
+            for timing in timings or ():
+                COST_MODEL.observe(*timing)
+
+            with self._lock:
+                if kind == "started":
+                    self._in_flight[worker_id] = task_id
+                    continue
+                if kind == "ready":
+                    continue
+                self._in_flight.pop(worker_id, None)
+                future = self._futures.pop(task_id, None)
+
+            if future is None:
+                continue
+            try:
+                if kind == "done":
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(f"Summarizer worker {worker_id} failed: {payload}"))
+            except InvalidStateError:
+                pass  # the caller stopped waiting (timeout)
+
+    def _reap_dead_workers(self):
+        for worker_id, process in enumerate(self._workers):
+            if process.is_alive() or self._closed:
+                continue
+            logger.error(f"❌ Summarizer worker {worker_id} exited ({process.exitcode}), restarting")
+            with self._lock:
+                task_id = self._in_flight.pop(worker_id, None)
+                future = self._futures.pop(task_id, None) if task_id is not None else None
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError(f"Summarizer worker {worker_id} crashed"))
+            self._workers[worker_id] = self._start_worker(worker_id)
+
+    def submit(self, method, *args, **kwargs):
+        """
+        Queue a PaperSummarizer method call on the pool.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the method's return value.
+        """
+        if self._closed:
+            raise RuntimeError("Summarizer pool is closed")
+        future = Future()
+        with self._lock:
+            task_id = next(self._ids)
+            if method == "summarize" and kwargs.get('deadline_ms') is not None:
+                # Requests ahead of this one, per worker (the worker only knows its own)
+                kwargs['queue_depth'] = len(self._futures) // self.num_workers
+            self._futures[task_id] = future
+        IN_FLIGHT.inc()
+        future.add_done_callback(lambda _: IN_FLIGHT.dec())
+        self._tasks.put((task_id, method, args, kwargs))
+        return future
+
+    def result(self, future, timeout=RESULT_TIMEOUT_SECONDS):
+        """
+        Wait for a submitted call.
+
+        Raises:
+            RuntimeError: The worker failed, crashed or gave no answer within `timeout`.
+        """
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            with self._lock:
+                for task_id, pending in list(self._futures.items()):
+                    if pending is future:
+                        del self._futures[task_id]
+            future.cancel()
+            raise RuntimeError(f"Summarizer pool gave no result within {timeout:g}s") from None
+
+    def summarize(self, text, max_length=200, min_length=80, deadline_ms=None):
+        """Summarize one text on a worker (blocks the caller, not the pool)."""
+        return self.result(self.submit(
+            "summarize", text, max_length=max_length, min_length=min_length, deadline_ms=deadline_ms
+        ))
+
+    def summarize_batch(self, texts, max_length=200, min_length=80, num_beams=None):
+        """Run one padded batch on a worker (used by src.batching)."""
+        return self.result(self.submit(
+            "summarize_batch", texts, max_length=max_length, min_length=min_length, num_beams=num_beams
+        ))
+
+    def summarize_multiple(self, texts, deadline_ms=None):
+        """Summarize papers in parallel across workers, then build the meta-summary."""
+        futures = [self.submit("summarize", text, deadline_ms=deadline_ms) for text in texts]
+        summaries = [self.result(future) for future in futures]
+        return summaries, summarize_meta(self.summarize, summaries, deadline_ms)
+
+    def close(self):
+        """Stop all workers."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            self._tasks.put(None)
+        for process in self._workers:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        with self._lock:
+            for future in self._futures.values():
+                future.set_exception(RuntimeError("Summarizer pool closed"))
+            self._futures.clear()
+        logger.info("🏭 Summarizer pool stopped")
+
+
+class _EchoSummarizer:
+    """Stub worker summarizer for test_worker_pool (no model)."""
+
+    def summarize(self, text, max_length=200, min_length=80, deadline_ms=None, queue_depth=None):
+        if text == "crash":
+            time.sleep(0.5)  # let the queue's feeder thread send "started" first
+            os._exit(1)
+        return f"{os.getpid()}:{text.upper()}"
+
+    def summarize_batch(self, texts, max_length=200, min_length=80, num_beams=None):
+        return [text.upper() for text in texts]
+
+
+def test_worker_pool():
+    """
+    Serve stub summaries from two spawned workers, survive a worker crash.
+
+    Usage: python -m src.worker_pool
+    """
+    print("\n" + "="*70)
+    print("TEST: Summarizer worker pool")
+    print("="*70)
+
+    pool = SummarizerPool(num_workers=2, summarizer_factory=_EchoSummarizer)
+    try:
+        futures = [pool.submit("summarize", f"text {i}") for i in range(8)]
+        summaries = [pool.result(future, timeout=60) for future in futures]
+        assert [s.split(":", 1)[1] for s in summaries] == [f"TEXT {i}" for i in range(8)]
+        assert pool.summarize_batch(["a", "b"]) == ["A", "B"]
+
+        # A worker dying mid-task fails that task only; it is replaced
+        crashed = pool.submit("summarize", "crash")
+        try:
+            pool.result(crashed, timeout=30)
+            raise AssertionError("crashed task resolved")
+        except RuntimeError as e:
+            assert "crashed" in str(e)
+        assert pool.summarize("after").endswith(":AFTER")
+        assert all(process.is_alive() for process in pool._workers)
+    finally:
+        pool.close()
+    print(f"✅ {len(summaries)} summaries from {pool.num_workers} workers, crashed worker replaced")
+
+
+if __name__ == "__main__":
+    test_worker_pool()